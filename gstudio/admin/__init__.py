@@ -39,6 +39,8 @@ from gstudio.models import AttributeIPAddressField
 
 #Admin imports
 
+from gstudio.admin.filterspecs import ClusterFilterSpec
+
 from gstudio.admin.objecttype import ObjecttypeAdmin
 from gstudio.admin.metatype import MetatypeAdmin
 from gstudio.admin.relationtype import RelationtypeAdmin
@@ -8,6 +8,8 @@ from gstudio.models import *
 import reversion
 
 class AttributeAdmin(reversion.VersionAdmin):
+    list_filter = ('attributetype', 'component', 'community')
+
     class Media:
         js = ("gstudio/js/gstudiojs.js",)
     
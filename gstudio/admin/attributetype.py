@@ -53,7 +53,8 @@ types','dataType','verbose_name','null','blank','help_text','max_digits','decima
     list_filter = ('parent','metatypes', 'authors', 'status', 'featured',
                    'login_required', 'comment_enabled', 'pingback_enabled',
                    'creation_date', 'start_publication',
-                   'end_publication', 'sites')
+                   'end_publication', 'sites', 'component',
+                   'community')
     list_display = ('get_title', 'get_authors', 'get_metatypes',
                     'get_tags', 'get_sites',
                     'get_comments_are_open', 'pingback_enabled',
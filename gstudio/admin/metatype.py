@@ -13,7 +13,7 @@ class MetatypeAdmin(reversion.VersionAdmin):
     list_display = ('title', 'slug', 'get_tree_path', 'description')
     prepopulated_fields = {'slug': ('title', )}
     search_fields = ('title', 'description')
-    list_filter = ('parent',)
+    list_filter = ('parent', 'component', 'community')
 
     def __init__(self, model, admin_site):
         self.form.admin_site = admin_site
@@ -7,6 +7,8 @@ from gstudio.admin.forms import RelationAdminForm
 import reversion
 
 class RelationAdmin(reversion.VersionAdmin):
+    list_filter = ('relationtype', 'component', 'community')
+
     def save_model(self, request, relation, form, change):
         relation.title = relation.composed_sentence
         relation.save()
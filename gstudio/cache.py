@@ -0,0 +1,332 @@
+"""Caches of Gstudio"""
+import time
+from hashlib import md5
+
+from django.core.cache import get_cache
+
+from gstudio.settings import NBH_CACHE_BACKEND
+from gstudio.settings import NBH_CACHE_TIMEOUT
+from gstudio.settings import SCHEMA_CACHE_BACKEND
+from gstudio.settings import SCHEMA_CACHE_TIMEOUT
+from gstudio.settings import GENERATION_CHECK_INTERVAL
+
+NBH_CACHE_KEY = 'gstudio:nbh:%s'
+SCHEMA_CACHE_KEY = 'gstudio:schema:%s:%s:%s'
+SCHEMA_GENERATION_KEY = 'gstudio:schema:generation'
+DATA_GENERATION_KEY = 'gstudio:schema:data:generation'
+TYPES_GENERATION_KEY = 'gstudio:schema:types:generation'
+LAYOUT_CACHE_KEY = 'gstudio:layout:%s:%s:%s'
+STATISTICS_CACHE_KEY = 'gstudio:statistics:%s'
+DEPENDENCIES_GENERATION_KEY = 'gstudio:dependencies:generation'
+MEMBERS_CACHE_KEY = 'gstudio:members:%s:%s:%s:%s'
+MEMBERS_GENERATION_KEY = 'gstudio:members:generation'
+TYPE_MEMBERS_GENERATION_KEY = 'gstudio:members:generation:%s'
+ALL_MEMBERS = 0
+NAMES_GENERATION_KEY = 'gstudio:names:generation'
+NAME_GENERATION_KEY = 'gstudio:names:generation:%s'
+FACETS_CACHE_KEY = 'gstudio:facets:%s:%s:%s:%s:%s:%s'
+FACETS_GENERATION_KEY = 'gstudio:facets:generation'
+TYPE_FACETS_GENERATION_KEY = 'gstudio:facets:generation:%s'
+
+nbh_cache = get_cache(NBH_CACHE_BACKEND)
+schema_cache = get_cache(SCHEMA_CACHE_BACKEND)
+local_generations = []
+
+
+def nbh_cache_key(nid):
+    """Return the key of a neighbourhood in the cache"""
+    return NBH_CACHE_KEY % nid
+
+
+def get_cached_nbh(node):
+    """Return the neighbourhood of a node from the cache,
+    built with its build_nbh method and cached on miss"""
+    key = nbh_cache_key(node.pk)
+    nbh = nbh_cache.get(key)
+    if nbh is None:
+        nbh = node.build_nbh()
+        nbh_cache.set(key, nbh, NBH_CACHE_TIMEOUT)
+    return nbh
+
+
+def cache_nbhs(nbhs):
+    """Store many neighbourhoods given by NID"""
+    data = {}
+    for nid, nbh in nbhs.items():
+        data[nbh_cache_key(nid)] = nbh
+    nbh_cache.set_many(data, NBH_CACHE_TIMEOUT)
+
+
+def invalidate_nbhs(nids, cascade=False):
+    """Remove the neighbourhoods of the given NIDs from the cache,
+    with the neighbourhoods of their neighbours if cascade"""
+    from gstudio.neighbourhood import neighbour_ids
+
+    nids = set([nid for nid in nids if nid])
+    if cascade and nids:
+        nids.update(neighbour_ids(list(nids)))
+    if nids:
+        nbh_cache.delete_many([nbh_cache_key(nid) for nid in nids])
+
+
+def layout_cache_key(nid, version, digest):
+    """Return the key of the layout of the graph of a node in the
+    cache, for a version of the graph and a digest of its shape"""
+    return LAYOUT_CACHE_KEY % (nid, version, digest)
+
+
+def generation(key):
+    """Return the generation counter stored under a key of the schema
+    cache, started from a clock reading in milliseconds so a lost
+    counter never comes back to an old generation"""
+    current = schema_cache.get(key)
+    if current is None:
+        current = int(time.time() * 1000)
+        if not schema_cache.add(key, current, SCHEMA_CACHE_TIMEOUT):
+            current = schema_cache.get(key) or current
+    return current
+
+
+def next_generation(key):
+    """Start a new generation under a key of the schema cache
+    and return it, seen at once by the process"""
+    current = max(int(time.time() * 1000),
+                  (schema_cache.get(key) or 0) + 1)
+    schema_cache.set(key, current, SCHEMA_CACHE_TIMEOUT)
+    for local in local_generations:
+        if local.key == key:
+            local.expire()
+    return current
+
+
+class LocalGeneration(object):
+    """Generation counter under a key of the schema cache as seen by
+    the process, read again from the shared cache at the start of each
+    request and at most every GENERATION_CHECK_INTERVAL seconds"""
+
+    def __init__(self, key):
+        self.key = key
+        self.value = None
+        self.checked = None
+        local_generations.append(self)
+
+    def current(self):
+        """Return the generation, read again if it expired"""
+        now = time.time()
+        if self.checked is None or \
+               now - self.checked >= GENERATION_CHECK_INTERVAL:
+            self.value = generation(self.key)
+            self.checked = now
+        return self.value
+
+    def expire(self):
+        """Read the generation again on the next use"""
+        self.checked = None
+
+
+def expire_local_generations():
+    """Make the process read again all its generations on their
+    next use"""
+    for local in local_generations:
+        local.expire()
+
+
+def schema_generation():
+    """Return the current generation of the cached schemas"""
+    return generation(SCHEMA_GENERATION_KEY)
+
+
+def schema_cache_key(kind, nid, generation=None):
+    """Return the key of a kind of schema of a type in the cache"""
+    if generation is None:
+        generation = schema_generation()
+    return SCHEMA_CACHE_KEY % (generation, kind, nid)
+
+
+def invalidate_schemas():
+    """Invalidate all the cached schemas at once
+    by starting a new generation"""
+    next_generation(SCHEMA_GENERATION_KEY)
+
+
+def data_generation():
+    """Return the current generation of the cached
+    attributes and relations of the types"""
+    return generation(DATA_GENERATION_KEY)
+
+
+def invalidate_data():
+    """Invalidate all the cached attributes and relations of the types
+    at once, leaving the cached schemas of the types valid"""
+    next_generation(DATA_GENERATION_KEY)
+
+
+def statistics_cache_key():
+    """Return the key of the statistics of the triples in the cache,
+    for the generation of the attributes and relations"""
+    return STATISTICS_CACHE_KEY % data_generation()
+
+
+def types_generation():
+    """Return the current generation of the relation
+    types and attribute types"""
+    return generation(TYPES_GENERATION_KEY)
+
+
+def invalidate_types():
+    """Make every process reload its relation types and attribute types"""
+    next_generation(TYPES_GENERATION_KEY)
+
+
+def dependencies_generation():
+    """Return the current generation of the dependency graph"""
+    return generation(DEPENDENCIES_GENERATION_KEY)
+
+
+def invalidate_dependencies():
+    """Make every process reload its dependency graph
+    and return the new generation"""
+    return next_generation(DEPENDENCIES_GENERATION_KEY)
+
+
+def members_generation():
+    """Return the current generation of the cached members of the classes"""
+    return generation(MEMBERS_GENERATION_KEY)
+
+
+def type_members_generation(pk):
+    """Return the current generation of the cached members of a type,
+    ALL_MEMBERS standing for all the gbobjects"""
+    return generation(TYPE_MEMBERS_GENERATION_KEY % pk)
+
+
+def members_cache_key(kind, pk):
+    """Return the key of the bitset of the members of a class
+    in the cache"""
+    return MEMBERS_CACHE_KEY % (members_generation(),
+                                type_members_generation(pk), kind, pk)
+
+
+def invalidate_members(pks=None):
+    """Invalidate the cached members of the types pks, or
+    of all the classes at once"""
+    if pks is None:
+        next_generation(MEMBERS_GENERATION_KEY)
+        return
+    for pk in set(pks):
+        next_generation(TYPE_MEMBERS_GENERATION_KEY % pk)
+
+
+def names_generation():
+    """Return the current generation of the names of the nodes"""
+    return generation(NAMES_GENERATION_KEY)
+
+
+def name_generation_key(name):
+    """Return the key of the generation of a name in the cache"""
+    return NAME_GENERATION_KEY % md5(name.encode('utf-8')).hexdigest()
+
+
+def name_generations(names):
+    """Return a {name: generation} dict of the current generations
+    of the names, read with a single request to the cache"""
+    keys = dict([(name_generation_key(name), name) for name in names])
+    found = schema_cache.get_many(keys.keys())
+    generations = {}
+    for key, name in keys.items():
+        if key in found:
+            generations[name] = found[key]
+        else:
+            generations[name] = generation(key)
+    return generations
+
+
+def invalidate_names(names=None):
+    """Make every process forget the nodes it resolved for the names,
+    or for all the names at once"""
+    if names is None:
+        next_generation(NAMES_GENERATION_KEY)
+        return
+    keys = [name_generation_key(name) for name in set(names)]
+    if not keys:
+        return
+    now = int(time.time() * 1000)
+    found = schema_cache.get_many(keys)
+    schema_cache.set_many(dict([(key, max(now, found.get(key, 0) + 1))
+                                for key in keys]), SCHEMA_CACHE_TIMEOUT)
+
+
+def facets_generation():
+    """Return the current generation of the attributes
+    and relations counted by the facets"""
+    return generation(FACETS_GENERATION_KEY)
+
+
+def type_facets_generation(pk):
+    """Return the current generation of the attributes and relations
+    counted by the facets of a type"""
+    return generation(TYPE_FACETS_GENERATION_KEY % pk)
+
+
+def facets_cache_key(pk, digest):
+    """Return the key of the facets of the members of a type in the
+    cache, for a digest of the facets selected, stamped with the
+    generations of the members and of the facets of the type"""
+    return FACETS_CACHE_KEY % (members_generation(),
+                               type_members_generation(pk),
+                               facets_generation(),
+                               type_facets_generation(pk), pk, digest)
+
+
+def invalidate_facets(pks=None):
+    """Invalidate the cached facets of the types pks,
+    or of all the types at once"""
+    if pks is None:
+        next_generation(FACETS_GENERATION_KEY)
+        return
+    for pk in set(pks):
+        next_generation(TYPE_FACETS_GENERATION_KEY % pk)
+
+
+class LRUCache(object):
+    """Dictionary of a process keeping its size most recently
+    used items, the least recently used quarter being dropped
+    at once when it is full"""
+
+    def __init__(self, size):
+        self.size = max(size, 1)
+        self.items = {}
+        self.uses = {}
+        self.clock = 0
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, key, default=None):
+        """Return the item of key, default if it is missing"""
+        if key not in self.items:
+            return default
+        self.clock += 1
+        self.uses[key] = self.clock
+        return self.items[key]
+
+    def set(self, key, value):
+        """Store the item of key, dropping the least recently used
+        items if the cache is full"""
+        self.clock += 1
+        self.items[key] = value
+        self.uses[key] = self.clock
+        if len(self.items) > self.size:
+            dropped = sorted([(use, stored) for stored, use
+                              in self.uses.items()])
+            for use, stored in dropped[:len(dropped) - self.size * 3 // 4]:
+                del self.items[stored]
+                del self.uses[stored]
+
+    def clear(self):
+        """Drop all the items"""
+        self.items = {}
+        self.uses = {}
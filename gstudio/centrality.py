@@ -0,0 +1,176 @@
+"""Importance of the nodes in the graph of Gstudio
+
+PageRank, in and out degrees and an approximation of the betweenness
+are computed offline over the relations, the memberships and the
+dependencies of the nodes, with sparse vectorized iterations over NumPy
+arrays of edges, and stored in the NodeScore table."""
+from django.db import connection
+from django.db import transaction
+from django.db.models import get_model
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import numpy
+except ImportError:
+    raise ImproperlyConfigured('numpy module is not available')
+
+from gstudio.models import Nodetype
+from gstudio.models import NodeScore
+from gstudio.models import Dependency
+from gstudio.triples import triples
+from gstudio.settings import PAGERANK_DAMPING
+from gstudio.settings import BETWEENNESS_SAMPLES
+
+PAGERANK_ITERATIONS = 100
+PAGERANK_TOLERANCE = 1e-8
+CHUNK_SIZE = 500
+
+
+def score_edges():
+    """Yield the (source, target) edges of the graph scored: relations
+    from their left to their right subject, memberships from the member
+    to its type and dependencies from the node to its prior node"""
+    for left, relationtype, right in triples().iterator():
+        yield left, right
+    members = [(Nodetype, 'metatypes')]
+    gbobject = get_model('objectapp', 'gbobject')
+    if gbobject is not None:
+        members.append((gbobject, 'objecttypes'))
+    for model, name in members:
+        field = model._meta.get_field(name)
+        for edge in field.rel.through.objects.order_by().values_list(
+            field.m2m_field_name(), field.m2m_reverse_field_name()
+            ).iterator():
+            yield edge
+    for edge in Dependency.objects.order_by().values_list(
+        'node', 'prior').iterator():
+        yield edge
+
+
+def edge_arrays(edges):
+    """Return the sorted array of the ids of the nodes and the arrays
+    of the indexes of the sources and targets of the edges, without
+    the loops and the duplicated edges"""
+    edges = numpy.array(list(edges), dtype=numpy.int64).reshape(-1, 2)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    ids = numpy.unique(edges)
+    keys = numpy.unique(numpy.searchsorted(ids, edges[:, 0]) * len(ids) +
+                        numpy.searchsorted(ids, edges[:, 1]))
+    return ids, keys // len(ids), keys % len(ids)
+
+
+def pagerank(size, sources, targets, damping=PAGERANK_DAMPING,
+             iterations=PAGERANK_ITERATIONS, tolerance=PAGERANK_TOLERANCE):
+    """Return the PageRank of the nodes by power iteration, the rank
+    of the nodes without out edges being spread over all the nodes"""
+    if not size:
+        return numpy.zeros(0)
+    out_degree = numpy.bincount(sources, minlength=size).astype(float)
+    dangling = out_degree == 0
+    weights = 1.0 / out_degree[sources]
+    rank = numpy.ones(size) / size
+    for iteration in range(iterations):
+        spread = (1.0 - damping + damping * rank[dangling].sum()) / size
+        new_rank = spread + damping * numpy.bincount(
+            targets, rank[sources] * weights, minlength=size)
+        change = numpy.abs(new_rank - rank).sum()
+        rank = new_rank
+        if change < tolerance:
+            break
+    return rank
+
+
+def betweenness(size, sources, targets, samples=BETWEENNESS_SAMPLES,
+                seed=0):
+    """Return the betweenness of the nodes, by Brandes' algorithm from
+    a sample of the nodes extrapolated to all, each breadth first search
+    expanding a whole level of the graph at once"""
+    scores = numpy.zeros(size)
+    if not size:
+        return scores
+    order = numpy.argsort(sources, kind='mergesort')
+    adjacent = targets[order]
+    offsets = numpy.zeros(size + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(sources, minlength=size), out=offsets[1:])
+
+    if samples >= size:
+        pivots = numpy.arange(size)
+    else:
+        pivots = numpy.random.RandomState(seed).permutation(
+            size)[:samples]
+    for pivot in pivots:
+        distance = numpy.empty(size, dtype=numpy.int64)
+        distance.fill(-1)
+        distance[pivot] = 0
+        paths = numpy.zeros(size)
+        paths[pivot] = 1
+        levels = []
+        frontier = numpy.array([pivot])
+        depth = 0
+        while len(frontier):
+            starts = offsets[frontier]
+            counts = offsets[frontier + 1] - starts
+            total = counts.sum()
+            if not total:
+                break
+            edge_indexes = numpy.repeat(
+                starts - numpy.cumsum(counts) + counts, counts) + \
+                numpy.arange(total)
+            heads = numpy.repeat(frontier, counts)
+            tails = adjacent[edge_indexes]
+            frontier = numpy.unique(tails[distance[tails] == -1])
+            distance[frontier] = depth + 1
+            shortest = distance[tails] == depth + 1
+            heads = heads[shortest]
+            tails = tails[shortest]
+            paths += numpy.bincount(tails, paths[heads], minlength=size)
+            levels.append((heads, tails))
+            depth += 1
+
+        dependency = numpy.zeros(size)
+        for heads, tails in reversed(levels):
+            dependency += numpy.bincount(
+                heads, paths[heads] / paths[tails] * (1 + dependency[tails]),
+                minlength=size)
+        dependency[pivot] = 0
+        scores += dependency
+    return scores * size / float(len(pivots))
+
+
+def compute_scores(edges):
+    """Return the (id, pagerank, in degree, out degree, betweenness)
+    rows of the scores of the nodes of the (source, target) edges"""
+    ids, sources, targets = edge_arrays(edges)
+    size = len(ids)
+    in_degree = numpy.bincount(targets, minlength=size)
+    out_degree = numpy.bincount(sources, minlength=size)
+    ranks = pagerank(size, sources, targets)
+    between = betweenness(size, sources, targets)
+    return [(int(ids[i]), float(ranks[i]), int(in_degree[i]),
+             int(out_degree[i]), float(between[i])) for i in range(size)]
+
+
+@transaction.commit_on_success
+def store_scores(rows):
+    """Replace the scores of the NodeScore table by the rows"""
+    qn = connection.ops.quote_name
+    opts = NodeScore._meta
+    columns = [qn(opts.get_field(name).column) for name in
+               ('nid', 'pagerank', 'in_degree', 'out_degree',
+                'betweenness')]
+    query = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        qn(opts.db_table), ', '.join(columns),
+        ', '.join(['%s'] * len(columns)))
+
+    NodeScore.objects.all().delete()
+    cursor = connection.cursor()
+    for i in range(0, len(rows), CHUNK_SIZE):
+        cursor.executemany(query, rows[i:i + CHUNK_SIZE])
+
+
+def update_scores():
+    """Compute the scores of the nodes of the graph, store them
+    and return their number"""
+    rows = compute_scores(score_edges())
+    store_scores(rows)
+    return len(rows)
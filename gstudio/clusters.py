@@ -0,0 +1,162 @@
+"""Connected components and communities of the graph of Gstudio
+
+The nodes are joined by their relations, attributes, parents,
+memberships and prior and posterior nodes. The connected components
+are found with a union-find in a single pass over the edges, the
+communities by label propagation in a few passes over the nodes.
+Both are identified by their smallest NID and stored on the NIDs."""
+from random import Random
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models import get_model
+
+from gstudio.models import NID
+from gstudio.models import Metatype
+from gstudio.models import Nodetype
+from gstudio.models import Relation
+from gstudio.models import Attribute
+
+PROPAGATION_PASSES = 10
+CHUNK_SIZE = 250
+
+
+def m2m_links(model, name):
+    """Yield the (from, to) rows of the table of a many to many field"""
+    field = model._meta.get_field(name)
+    for link in field.rel.through.objects.order_by().values_list(
+        field.m2m_field_name(), field.m2m_reverse_field_name()).iterator():
+        yield link
+
+
+def cluster_edges():
+    """Yield the (one, other) edges joining the nodes, a relation
+    joining its subjects and itself to its left subject,
+    an attribute joining itself to its subject"""
+    for pk, left, right in Relation.objects.order_by().values_list(
+        'pk', 'left_subject', 'right_subject').iterator():
+        yield left, right
+        yield pk, left
+    for pk, subject in Attribute.objects.order_by().values_list(
+        'pk', 'subject').iterator():
+        yield pk, subject
+    for model in (Metatype, Nodetype):
+        for edge in model.objects.filter(parent__isnull=False).order_by(
+            ).values_list('pk', 'parent').iterator():
+            yield edge
+
+    fields = [(Nodetype, 'metatypes'), (Nodetype, 'prior_nodes'),
+              (Nodetype, 'posterior_nodes')]
+    gbobject = get_model('objectapp', 'gbobject')
+    if gbobject is not None:
+        fields.extend([(gbobject, 'objecttypes'), (gbobject, 'prior_nodes'),
+                       (gbobject, 'posterior_nodes')])
+    for model, name in fields:
+        for edge in m2m_links(model, name):
+            yield edge
+
+
+class UnionFind(object):
+    """Disjoint sets of nodes, each named by its smallest node"""
+
+    def __init__(self):
+        self.parents = {}
+
+    def find(self, node):
+        """Return the smallest node of the set of node"""
+        parents = self.parents
+        parents.setdefault(node, node)
+        while parents[node] != node:
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
+
+    def union(self, one, other):
+        """Merge the sets of two nodes"""
+        one = self.find(one)
+        other = self.find(other)
+        if one < other:
+            self.parents[other] = one
+        elif other < one:
+            self.parents[one] = other
+
+    def sets(self):
+        """Return a {node: smallest node of its set} dict"""
+        return dict([(node, self.find(node)) for node in self.parents])
+
+
+def components(edges):
+    """Return a {node: component} dict of the nodes of the edges"""
+    sets = UnionFind()
+    for one, other in edges:
+        sets.union(one, other)
+    return sets.sets()
+
+
+def communities(edges, passes=PROPAGATION_PASSES, seed=0):
+    """Return a {node: community} dict of the nodes of the edges,
+    found by label propagation: each node takes in turn, in a shuffled
+    order, the label the most frequent among its neighbours, keeping
+    its own or drawing one on ties, until no label changes. The
+    communities are then named by their smallest node, as their
+    parts left apart by the propagation"""
+    neighbours = {}
+    for one, other in edges:
+        if one != other:
+            neighbours.setdefault(one, []).append(other)
+            neighbours.setdefault(other, []).append(one)
+    labels = dict([(node, node) for node in neighbours])
+    nodes = sorted(neighbours)
+    random = Random(seed)
+    for i in range(passes):
+        changed = False
+        order = nodes[:]
+        random.shuffle(order)
+        for node in order:
+            counts = {}
+            for other in neighbours[node]:
+                label = labels[other]
+                counts[label] = counts.get(label, 0) + 1
+            best = max(counts.values())
+            if counts.get(labels[node]) == best:
+                continue
+            labels[node] = random.choice(sorted([
+                candidate for candidate, count in counts.items()
+                if count == best]))
+            changed = True
+        if not changed:
+            break
+
+    return components([(node, other) for node, others in
+                       neighbours.items() for other in others
+                       if labels[node] == labels[other]] +
+                      [(node, node) for node in nodes])
+
+
+@transaction.commit_on_success
+def store_clusters(component_of, community_of):
+    """Store the component and community of the NIDs, the NIDs
+    without edges being alone in theirs, in a single transaction"""
+    NID.objects.update(component=F('id'), community=F('id'))
+    for field, clusters in (('component', component_of),
+                            ('community', community_of)):
+        members = {}
+        for node, cluster in clusters.items():
+            if node != cluster:
+                members.setdefault(cluster, []).append(node)
+        for cluster, nodes in members.items():
+            for i in range(0, len(nodes), CHUNK_SIZE):
+                NID.objects.filter(pk__in=nodes[i:i + CHUNK_SIZE]).update(
+                    **{field: cluster})
+
+
+def update_clusters():
+    """Compute and store the components and communities of the graph,
+    return the numbers of components and communities of the nodes
+    having edges"""
+    edges = list(cluster_edges())
+    component_of = components(edges)
+    community_of = communities(edges)
+    store_clusters(component_of, community_of)
+    return (len(set(component_of.values())),
+            len(set(community_of.values())))
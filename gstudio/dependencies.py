@@ -0,0 +1,280 @@
+"""Dependency engine of the nodes of Gstudio
+
+The prior nodes of a node are the nodes its meaning depends on. As the
+prior_nodes and posterior_nodes fields are symmetrical, the direction
+of their links is recorded in the Dependency table when they are made.
+The dependency graph is loaded once per process and updated in place
+with the changes made by the process, the other processes reloading it
+when the generation counter of the shared cache changes. The closures,
+orders and cycles computed on it are memoized until a change reaches
+them."""
+import heapq
+
+from django.db.models import get_model
+
+from gstudio.models import NID
+from gstudio.models import Nodetype
+from gstudio.models import Dependency
+from gstudio.cache import dependencies_generation
+from gstudio.cache import invalidate_dependencies
+
+CHUNK_SIZE = 250
+
+
+def reach(node, edges):
+    """Return the set of the nodes reached from node
+    by following the {node: set of nodes} edges"""
+    reached = set()
+    stack = list(edges.get(node, ()))
+    while stack:
+        other = stack.pop()
+        if other not in reached:
+            reached.add(other)
+            stack.extend(edges.get(other, ()))
+    return reached
+
+
+class DependencyGraph(object):
+    """Dependencies between the nodes, loaded once per process"""
+
+    def __init__(self):
+        self.generation = None
+        self.priors = {}
+        self.posteriors = {}
+        self.forget()
+
+    def forget(self):
+        """Forget all the memoized results"""
+        self._prerequisites = {}
+        self._dependents = {}
+        self._order = None
+        self._cycles = None
+
+    def load(self):
+        """Load the dependencies if another generation started"""
+        generation = dependencies_generation()
+        if generation != self.generation:
+            self.priors = {}
+            self.posteriors = {}
+            for node, prior in Dependency.objects.values_list(
+                'node', 'prior'):
+                self.priors.setdefault(node, set()).add(prior)
+                self.posteriors.setdefault(prior, set()).add(node)
+            self.forget()
+            self.generation = generation
+
+    def clear(self):
+        """Forget the dependencies loaded by the process"""
+        self.generation = None
+        self.priors = {}
+        self.posteriors = {}
+        self.forget()
+
+    def update(self, added=(), removed=()):
+        """Apply the (node, prior) dependencies added to and removed
+        from the table, forgetting only the results they reach,
+        and make the other processes reload the graph"""
+        added = list(added)
+        removed = list(removed)
+        if not added and not removed:
+            return
+        current = self.generation is not None and \
+                  self.generation == dependencies_generation()
+        if current:
+            for node, prior in added + removed:
+                for other in reach(node, self.posteriors) | set([node]):
+                    self._prerequisites.pop(other, None)
+                for other in reach(prior, self.priors) | set([prior]):
+                    self._dependents.pop(other, None)
+            self._order = None
+            self._cycles = None
+            for node, prior in removed:
+                self.priors.get(node, set()).discard(prior)
+                self.posteriors.get(prior, set()).discard(node)
+            for node, prior in added:
+                self.priors.setdefault(node, set()).add(prior)
+                self.posteriors.setdefault(prior, set()).add(node)
+
+        generation = invalidate_dependencies()
+        if current:
+            self.generation = generation
+
+    def nodes(self):
+        """Return the set of the nodes having dependencies
+        or depended on"""
+        self.load()
+        return set([node for node, priors in self.priors.items()
+                    if priors] +
+                   [node for node, posteriors in self.posteriors.items()
+                    if posteriors])
+
+    def prerequisites(self, nid):
+        """Return the frozenset of the nodes nid depends on,
+        directly or not"""
+        self.load()
+        if nid not in self._prerequisites:
+            self._prerequisites[nid] = frozenset(reach(nid, self.priors))
+        return self._prerequisites[nid]
+
+    def dependents(self, nid):
+        """Return the frozenset of the nodes depending on nid,
+        directly or not"""
+        self.load()
+        if nid not in self._dependents:
+            self._dependents[nid] = frozenset(reach(nid, self.posteriors))
+        return self._dependents[nid]
+
+    def order(self, nodes):
+        """Return the list of the nodes, each after the nodes
+        it depends on among them, the ties ordered by id.
+        The nodes depending on a cycle come last, by id"""
+        nodes = set(nodes)
+        indegree = dict([(node, len(self.priors.get(node, set()) & nodes))
+                         for node in nodes])
+        heap = [node for node, degree in indegree.items() if not degree]
+        heapq.heapify(heap)
+        order = []
+        while heap:
+            node = heapq.heappop(heap)
+            order.append(node)
+            for other in self.posteriors.get(node, ()):
+                if other in indegree:
+                    indegree[other] -= 1
+                    if not indegree[other]:
+                        heapq.heappush(heap, other)
+        order.extend(sorted(nodes - set(order)))
+        return order
+
+    def topological_order(self, nodes=None):
+        """Return the nodes given, all the nodes of the graph by
+        default, in topological order"""
+        self.load()
+        if nodes is not None:
+            return self.order(nodes)
+        if self._order is None:
+            self._order = tuple(self.order(self.nodes()))
+        return list(self._order)
+
+    def cycles(self):
+        """Return the sorted lists of the nodes of each cycle of
+        dependencies, its strongly connected components"""
+        self.load()
+        if self._cycles is None:
+            self._cycles = tuple(self.components())
+        return [list(component) for component in self._cycles]
+
+    def components(self):
+        """Return the strongly connected components of more than one
+        node or depending on themselves, by Tarjan's algorithm"""
+        index = {}
+        lowlink = {}
+        stack = []
+        on_stack = set()
+        components = []
+        for root in sorted(self.nodes()):
+            if root in index:
+                continue
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(sorted(self.priors.get(root, ()))))]
+            while work:
+                node, priors = work[-1]
+                for other in priors:
+                    if other not in index:
+                        index[other] = lowlink[other] = len(index)
+                        stack.append(other)
+                        on_stack.add(other)
+                        work.append((other, iter(sorted(
+                            self.priors.get(other, ())))))
+                        break
+                    elif other in on_stack:
+                        lowlink[node] = min(lowlink[node], index[other])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent],
+                                              lowlink[node])
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            other = stack.pop()
+                            on_stack.discard(other)
+                            component.append(other)
+                            if other == node:
+                                break
+                        if len(component) > 1 or \
+                               node in self.priors.get(node, ()):
+                            components.append(tuple(sorted(component)))
+        return sorted(components)
+
+    def learning_path(self, target, known=()):
+        """Return the shortest ordered list of the nodes to learn
+        to reach target, the known nodes and their prerequisites
+        being left out"""
+        needed = set(self.prerequisites(target)) | set([target])
+        for node in known:
+            needed.discard(node)
+            needed -= self.prerequisites(node)
+        return self.topological_order(needed)
+
+
+dependencies = DependencyGraph()
+
+
+def dependency_models():
+    """Return the models of the nodes having prior and posterior nodes"""
+    models = [Nodetype]
+    gbobject = get_model('objectapp', 'gbobject')
+    if gbobject is not None:
+        models.append(gbobject)
+    return models
+
+
+def stored_links(model, field):
+    """Return the set of the (from, to) rows of the table of a field"""
+    field = model._meta.get_field(field)
+    return set(field.rel.through.objects.values_list(
+        field.m2m_field_name(), field.m2m_reverse_field_name()))
+
+
+def rebuild():
+    """Fill again the Dependency table from the links of the prior and
+    posterior nodes and return the number of dependencies. A link
+    stored in a single direction gives the direction of the dependency,
+    else the node created first is taken as the prior one"""
+    pairs = set()
+    undirected = set()
+    for model in dependency_models():
+        for field in ('prior_nodes', 'posterior_nodes'):
+            links = stored_links(model, field)
+            for source, target in links:
+                if (target, source) in links:
+                    undirected.add((min(source, target),
+                                    max(source, target)))
+                elif field == 'prior_nodes':
+                    pairs.add((source, target))
+                else:
+                    pairs.add((target, source))
+    undirected = [(one, other) for one, other in undirected
+                  if (one, other) not in pairs and
+                  (other, one) not in pairs]
+
+    nodes = list(set([one for one, other in undirected] +
+                     [other for one, other in undirected]))
+    dates = {}
+    for i in range(0, len(nodes), CHUNK_SIZE):
+        dates.update(NID.objects.filter(
+            id__in=nodes[i:i + CHUNK_SIZE]).values_list(
+            'id', 'creation_date'))
+    for one, other in undirected:
+        if (dates.get(one), one) <= (dates.get(other), other):
+            pairs.add((other, one))
+        else:
+            pairs.add((one, other))
+
+    Dependency.objects.all().delete()
+    Dependency.objects.add(pairs)
+    invalidate_dependencies()
+    return len(pairs)
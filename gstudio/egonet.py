@@ -0,0 +1,156 @@
+"""Ego networks of the nodes of Gstudio
+
+The graph around a node is expanded breadth first. The edges touching
+a whole level of the expansion, relations, parents and prior and
+posterior nodes, are fetched with a single query."""
+import json
+
+from django.db import connection
+from django.db.models import get_model
+
+from gstudio.models import NID
+from gstudio.models import Metatype
+from gstudio.models import Nodetype
+from gstudio.models import Relation
+from gstudio.models import GraphChange
+from gstudio.registry import registry
+from gstudio.neighbourhood import NODE_FIELDS
+from gstudio.neighbourhood import NeighbourhoodLoader
+from gstudio.settings import EGONET_RADIUS
+from gstudio.settings import EGONET_MAX_NODES
+
+PREDICATES = {GraphChange.PARENT: 'parent',
+              GraphChange.PRIOR: 'prior_nodes',
+              GraphChange.POSTERIOR: 'posterior_nodes'}
+
+
+def edge_tables():
+    """Return the (table, source, edgetype, target) SQL expressions
+    of the tables of the edges, edgetype being a column or a constant"""
+    qn = connection.ops.quote_name
+
+    def column(model, name):
+        return qn(model._meta.get_field(name).column)
+
+    tables = [(qn(Relation._meta.db_table),
+               column(Relation, 'left_subject'),
+               column(Relation, 'relationtype'),
+               column(Relation, 'right_subject'))]
+    for model in (Metatype, Nodetype):
+        tables.append((qn(model._meta.db_table), qn(model._meta.pk.column),
+                       str(GraphChange.PARENT), column(model, 'parent')))
+
+    models = [Nodetype]
+    gbobject = get_model('objectapp', 'gbobject')
+    if gbobject is not None:
+        models.append(gbobject)
+    for model in models:
+        for name, edgetype in (('prior_nodes', GraphChange.PRIOR),
+                               ('posterior_nodes', GraphChange.POSTERIOR)):
+            field = model._meta.get_field(name)
+            through = field.rel.through
+            tables.append((qn(through._meta.db_table),
+                           column(through, field.m2m_field_name()),
+                           str(edgetype),
+                           column(through, field.m2m_reverse_field_name())))
+    return tables
+
+
+def level_edges(nodes):
+    """Return the set of the (source, edgetype, target)
+    edges touching the nodes, fetched with a single query,
+    the roots without parent being left out"""
+    ids = ','.join([str(int(nid)) for nid in nodes])
+    selects = []
+    for table, source, edgetype, target in edge_tables():
+        selects.append('SELECT %s, %s, %s FROM %s WHERE (%s IN (%s) '
+                       'OR %s IN (%s)) AND %s IS NOT NULL' % (
+            source, edgetype, target, table, source, ids, target, ids,
+            target))
+    cursor = connection.cursor()
+    cursor.execute(' UNION ALL '.join(selects))
+    return set([(int(source), int(edgetype), int(target))
+                for source, edgetype, target in cursor.fetchall()])
+
+
+def ego_network(nid, radius=EGONET_RADIUS, max_nodes=EGONET_MAX_NODES):
+    """Return the {nid: depth} nodes and the set of edges of the
+    ego network of nid, at most radius hops away and max_nodes large.
+
+    When the new nodes of a level do not all fit, the ones with the most
+    edges to the network are kept, so a hub reached by a single edge
+    does not crowd out the nodes tightly bound to the ego."""
+    depths = {nid: 0}
+    edges = set()
+    frontier = [nid]
+    depth = 0
+    while frontier:
+        depth += 1
+        closing = depth > radius or len(depths) >= max_nodes
+        candidates = {}
+        level = level_edges(frontier)
+        for source, edgetype, target in level:
+            if source in depths and target in depths:
+                edges.add((source, edgetype, target))
+            elif not closing:
+                if source in depths:
+                    other = target
+                else:
+                    other = source
+                candidates[other] = candidates.get(other, 0) + 1
+        if closing:
+            break
+
+        ranked = sorted(candidates.items(),
+                        key=lambda item: (-item[1], item[0]))
+        frontier = [pk for pk, degree in
+                    ranked[:max_nodes - len(depths)]]
+        for other in frontier:
+            depths[other] = depth
+        for source, edgetype, target in level:
+            if source in depths and target in depths:
+                edges.add((source, edgetype, target))
+    return depths, edges
+
+
+def predicate(edgetype):
+    """Return the name of the edges of a type"""
+    if edgetype in PREDICATES:
+        return PREDICATES[edgetype]
+    return registry.relationtype(edgetype).slug
+
+
+def stream_ego_network(depths, edges, positions=None):
+    """Yield the chunks of the JSON of an ego network in the format
+    of the graph JSON, the 'node_metadata' of the nodes with their depth
+    and the x and y found in the {id: (x, y)} positions, the names of
+    the predicates and the edges as [from, predicate id, to] triples"""
+    rows = list(NID.objects.filter(id__in=depths.keys()).order_by(
+        'id').values_list(*NODE_FIELDS))
+    urls = NeighbourhoodLoader(None).nid_urls(rows)
+
+    yield '{"node_metadata": ['
+    separator = ''
+    for pk, title, slug, creation_date in rows:
+        metadata = {'_id': str(pk), 'title': title, 'screen_name': title,
+                    'url': urls[pk], 'depth': depths[pk]}
+        if positions and pk in positions:
+            metadata['x'], metadata['y'] = positions[pk]
+        yield separator + json.dumps(metadata)
+        separator = ', '
+
+    edges = sorted(edges)
+    predicate_ids = {}
+    for source, edgetype, target in edges:
+        if edgetype not in predicate_ids:
+            predicate_ids[edgetype] = len(predicate_ids) + 1
+    yield '], "predicates": %s, "edges": [' % json.dumps(dict(
+        [(str(pid), predicate(edgetype))
+         for edgetype, pid in predicate_ids.items()]))
+
+    separator = ''
+    for source, edgetype, target in edges:
+        yield '%s[%i, %i, %i]' % (separator, source,
+                                  predicate_ids[edgetype], target)
+        separator = ', '
+    yield ']}'
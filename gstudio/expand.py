@@ -0,0 +1,98 @@
+"""Paginated expansion of the neighbours of the nodes of Gstudio
+
+The neighbours of a node through a predicate are paged by increasing id,
+the id of the last neighbour of a page being the cursor of the next one,
+so each page is a single indexed query whatever the degree of the node."""
+from operator import or_
+
+from django.db.models import Q
+from django.db.models import get_model
+
+from gstudio.models import NID
+from gstudio.models import Metatype
+from gstudio.models import Nodetype
+from gstudio.models import Relation
+from gstudio.models import Relationtype
+from gstudio.registry import registry
+from gstudio.neighbourhood import NODE_FIELDS
+from gstudio.neighbourhood import NeighbourhoodLoader
+from gstudio.settings import GRAPH_PAGE_SIZE
+
+RELATION_DIRECTIONS = {'relation': ('left_subject', 'right_subject'),
+                       'inverse': ('right_subject', 'left_subject')}
+
+
+def neighbour_ids(pk, predicate):
+    """Return the subqueries of the ids of the neighbours
+    of the node pk through predicate, a key of the neighbourhoods,
+    'relation:<id>' for the right subjects of the relations of the
+    relation type id or 'inverse:<id>' for their left subjects"""
+    gbobject = get_model('objectapp', 'gbobject')
+    nodes = [Nodetype]
+    if gbobject is not None:
+        nodes.append(gbobject)
+
+    if predicate == 'type_of':
+        return [Metatype.objects.filter(children=pk).values('pk'),
+                Nodetype.objects.filter(children=pk).values('pk')]
+    if predicate == 'contains_subtypes':
+        return [Metatype.objects.filter(parent=pk).values('pk'),
+                Nodetype.objects.filter(parent=pk).values('pk')]
+    if predicate == 'member_of_metatype':
+        return [Metatype.objects.filter(member_types=pk).values('pk')]
+    if predicate == 'contains_members':
+        members = [Nodetype.objects.filter(metatypes=pk).values('pk')]
+        if gbobject is not None:
+            members.append(gbobject.objects.filter(
+                objecttypes=pk).values('pk'))
+        return members
+    if predicate == 'member_of' and gbobject is not None:
+        return [Nodetype.objects.filter(member_objects=pk).values('pk')]
+    if predicate in ('prior_nodes', 'posterior_nodes'):
+        return [model.objects.filter(**{predicate: pk}).values('pk')
+                for model in nodes]
+
+    direction, separator, pk_string = predicate.partition(':')
+    if direction in RELATION_DIRECTIONS and pk_string.isdigit():
+        try:
+            relationtype = registry.relationtype(int(pk_string))
+        except Relationtype.DoesNotExist:
+            raise ValueError('Unknown relation type %s' % pk_string)
+        subject, other = RELATION_DIRECTIONS[direction]
+        return [Relation.objects.filter(
+            relationtype=relationtype.pk, **{subject: pk}).values(other)]
+    raise ValueError('Unknown predicate %s' % predicate)
+
+
+def expand(pk, predicate, cursor=None, limit=GRAPH_PAGE_SIZE):
+    """Return the rows of a page of the neighbours of the node pk
+    through predicate, following the cursor, and the cursor
+    of the next page, None for the last page"""
+    queryset = NID.objects.filter(reduce(or_, [
+        Q(id__in=ids) for ids in neighbour_ids(pk, predicate)]))
+    if cursor is not None:
+        queryset = queryset.filter(id__gt=cursor)
+    rows = list(queryset.order_by('id').values_list(
+        *NODE_FIELDS)[:limit + 1])
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1][0]
+    return rows, next_cursor
+
+
+def serialize_page(node_id, predicate, rows, cursor, known=()):
+    """Serialize a page of neighbours in the format of the graph views,
+    the 'node_metadata' of the nodes already known by the client
+    being left out"""
+    new_rows = [row for row in rows if row[0] not in known]
+    urls = NeighbourhoodLoader(None).nid_urls(new_rows)
+
+    metadata = []
+    for pk, title, slug, creation_date in new_rows:
+        metadata.append({'_id': str(pk), 'title': title,
+                         'screen_name': title, 'url': urls[pk]})
+    return {'node_metadata': metadata,
+            predicate: [{'from': node_id, 'to': row[0]} for row in rows],
+            'cursor': cursor is not None and str(cursor) or None}
@@ -0,0 +1,133 @@
+"""Facets of the members of the types of Gstudio
+
+The facets of a type count its gbobjects, or the gbobjects of its
+subtypes, by the values of their attributes, by the objects of their
+relations and by the subjects of the relations to them, each with one
+GROUP BY query joining the members as a subquery. The members are
+drilled down by the facets selected, and the counts cached for each
+type and selection, stamped with the generations of the members and of
+the facets of the type, so that a changed attribute or relation only
+invalidates the facets of the types of its nodes. Only the
+FACET_VALUES values most counted of each predicate are kept, the
+others counted together in an OTHER value."""
+from hashlib import md5
+
+from django.db.models import Count
+from django.utils.encoding import force_unicode
+
+from gstudio.models import Relation
+from gstudio.models import Attribute
+from gstudio.cache import schema_cache
+from gstudio.cache import facets_cache_key
+from gstudio.setalgebra import membership
+from gstudio.setalgebra import member_types
+from gstudio.settings import FACET_VALUES
+from gstudio.settings import SCHEMA_CACHE_TIMEOUT
+
+ATTRIBUTE = 'attribute'
+RELATION = 'relation'
+INVERSE = 'inverse'
+OTHER = None
+
+FACETS = {ATTRIBUTE: (Attribute, 'subject', 'attributetype', 'svalue'),
+          RELATION: (Relation, 'left_subject', 'relationtype',
+                     'right_subject'),
+          INVERSE: (Relation, 'right_subject', 'relationtype',
+                    'left_subject')}
+
+
+def normalize(selected):
+    """Return the sorted tuple of the (kind, predicate, value)
+    facets selected, raise ValueError on an unknown kind"""
+    facets = set()
+    for kind, predicate, value in selected:
+        if kind not in FACETS:
+            raise ValueError('Unknown facet %s' % kind)
+        if kind == ATTRIBUTE:
+            value = force_unicode(value)
+        else:
+            value = int(value)
+        facets.add((kind, int(predicate), value))
+    return tuple(sorted(facets))
+
+
+def facet_types(nids):
+    """Return the ids of the nodetypes whose facets count the
+    attributes and relations of the nodes nids: the types of the
+    nodes and their ancestors"""
+    through = membership()
+    if through is None or not nids:
+        return []
+    through, gbobject_field, nodetype_field = through
+    return member_types(through.objects.filter(**{
+        '%s__in' % gbobject_field: list(nids)}).values_list(
+        nodetype_field, flat=True))
+
+
+def top_values(values, size=FACET_VALUES):
+    """Return the size (value, count) values most counted, the values
+    most counted first, followed by the sum of the counts of the
+    others as the count of the OTHER value"""
+    values.sort(key=lambda item: (-item[1], item[0]))
+    if len(values) <= size:
+        return values
+    return values[:size] + [(OTHER, sum([count for value, count
+                                         in values[size:]]))]
+
+
+def members(nodetype, selected=()):
+    """Return the ids of the gbobjects of a nodetype or of its subtypes
+    having all the facets selected, as a subquery, None without
+    objectapp. The tree of the nodetype is read again from the
+    database, the instance given may predate the saves of its
+    subtypes"""
+    through = membership()
+    if through is None:
+        return None
+    through, gbobject_field, nodetype_field = through
+    nodetype = nodetype.__class__.objects.get(pk=nodetype.pk)
+    queryset = through.objects.filter(**{
+        '%s__in' % nodetype_field:
+        nodetype.get_descendants(include_self=True).values('pk')})
+    for kind, predicate, value in selected:
+        model, subject, field, object = FACETS[kind]
+        queryset = queryset.filter(**{
+            '%s__in' % gbobject_field: model.objects.filter(**{
+                field: predicate, object: value}).values(subject)})
+    return queryset.order_by().values(gbobject_field)
+
+
+def count_facets(nodetype, selected=()):
+    """Return the number of the members of a nodetype having the facets
+    selected, and for each kind of facet a {predicate: [(value, count),
+    ...]} dict of their counts, the values most counted first and the
+    others counted together as OTHER"""
+    facets = {'count': 0}
+    for kind in FACETS:
+        facets[kind] = {}
+    subjects = members(nodetype, selected)
+    if subjects is None:
+        return facets
+
+    facets['count'] = subjects.distinct().count()
+    for kind, (model, subject, field, object) in FACETS.items():
+        rows = model.objects.filter(**{'%s__in' % subject: subjects}).values(
+            field, object).annotate(count=Count(subject, distinct=True))
+        for row in rows.order_by():
+            facets[kind].setdefault(row[field], []).append(
+                (row[object], row['count']))
+        for predicate, values in facets[kind].items():
+            facets[kind][predicate] = top_values(values)
+    return facets
+
+
+def get_facets(nodetype, selected=()):
+    """Return the facets of the members of a nodetype having the
+    facets selected, from the cache, counted and cached on miss"""
+    selected = normalize(selected)
+    key = facets_cache_key(nodetype.pk, md5(repr(selected)).hexdigest())
+    facets = schema_cache.get(key)
+    if facets is None:
+        facets = count_facets(nodetype, selected)
+        schema_cache.set(key, facets, SCHEMA_CACHE_TIMEOUT)
+    return facets
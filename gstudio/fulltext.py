@@ -0,0 +1,154 @@
+"""Full-text index of the nodetypes of Gstudio
+
+The words of the title, the excerpt and the content of a nodetype are
+casefolded into terms, the short words and the STOP_WORDS left out,
+and the number of occurrences of each term is stored in the
+SearchPosting table when the nodetype is saved, with the number of its
+terms in the SearchDocument table. A word is then found with an indexed
+lookup on its term instead of scanning the texts of every nodetype, and
+the nodetypes found are ranked by their BM25 score."""
+import re
+from math import log
+
+from django.db.models import Sum
+from django.db.models import Count
+from django.utils.html import strip_tags
+from django.utils.encoding import force_unicode
+
+from gstudio.models import Nodetype
+from gstudio.models import SearchPosting
+from gstudio.models import SearchDocument
+from gstudio.managers import insert_rows
+from gstudio.settings import STOP_WORDS
+
+WORD = re.compile(r'\w+', re.UNICODE)
+TERM_LENGTH = 50
+K1 = 1.2
+B = 0.75
+LOOKUPS = {None: 'exact', 'END': 'startswith',
+           'START': 'endswith', 'BOTH': 'contains'}
+CHUNK_SIZE = 250
+
+
+def is_term(word):
+    """Return True if a casefolded word is indexed, neither
+    a short word, except a number, nor a stop word"""
+    return (len(word) >= 3 or word.isdigit()) and word not in STOP_WORDS
+
+
+def tokenize(text):
+    """Return the list of the terms of a text"""
+    return [word[:TERM_LENGTH] for word in
+            WORD.findall(force_unicode(text or '').lower())
+            if is_term(word)]
+
+
+def frequencies_of(title, excerpt, content):
+    """Return the {term: occurrences} dict of the terms of the texts
+    of a nodetype, and their number"""
+    frequencies = {}
+    terms = tokenize(title) + tokenize(strip_tags(excerpt or '')) + \
+            tokenize(strip_tags(content or ''))
+    for term in terms:
+        frequencies[term] = frequencies.get(term, 0) + 1
+    return frequencies, len(terms)
+
+
+def store(pk, frequencies, length):
+    """Store the postings of the terms of a nodetype, updating
+    only the postings changed, and the number of its terms"""
+    stored = dict(SearchPosting.objects.filter(nid=pk).values_list(
+        'term', 'frequency'))
+    stale = [term for term in stored if term not in frequencies]
+    for i in range(0, len(stale), CHUNK_SIZE):
+        SearchPosting.objects.filter(
+            nid=pk, term__in=stale[i:i + CHUNK_SIZE]).delete()
+    insert_rows(SearchPosting, ('term', 'nid', 'frequency'),
+                [(term, pk, frequency)
+                 for term, frequency in frequencies.items()
+                 if term not in stored])
+    for term, frequency in frequencies.items():
+        if term in stored and stored[term] != frequency:
+            SearchPosting.objects.filter(nid=pk, term=term).update(
+                frequency=frequency)
+
+    updated = SearchDocument.objects.filter(nid=pk).update(length=length)
+    if not updated:
+        SearchDocument.objects.create(nid=pk, length=length)
+
+
+def index_node(node):
+    """Store the postings of the terms of a nodetype"""
+    frequencies, length = frequencies_of(node.title, node.excerpt,
+                                         node.content)
+    store(node.pk, frequencies, length)
+
+
+def unindex_node(pk):
+    """Remove the postings of a deleted nodetype"""
+    SearchPosting.objects.filter(nid=pk).delete()
+    SearchDocument.objects.filter(nid=pk).delete()
+
+
+def rebuild():
+    """Store again the postings of all the nodetypes, inserted by
+    chunks of CHUNK_SIZE rows, and return their number"""
+    SearchPosting.objects.all().delete()
+    SearchDocument.objects.all().delete()
+    postings = []
+    documents = []
+    count = 0
+    for pk, title, excerpt, content in Nodetype.objects.order_by(
+        'pk').values_list('pk', 'title', 'excerpt', 'content').iterator():
+        frequencies, length = frequencies_of(title, excerpt, content)
+        postings.extend([(term, pk, frequency)
+                         for term, frequency in frequencies.items()])
+        documents.append((pk, length))
+        count += 1
+        if len(postings) >= CHUNK_SIZE:
+            insert_rows(SearchPosting, ('term', 'nid', 'frequency'),
+                        postings)
+            insert_rows(SearchDocument, ('nid', 'length'), documents)
+            postings = []
+            documents = []
+    insert_rows(SearchPosting, ('term', 'nid', 'frequency'), postings)
+    insert_rows(SearchDocument, ('nid', 'length'), documents)
+    return count
+
+
+def term_nodes(term, wildcards=None):
+    """Return the ids of the nodetypes having a term, or a term
+    starting, ending or containing it with wildcards, as a subquery"""
+    return SearchPosting.objects.nodes(term[:TERM_LENGTH],
+                                       LOOKUPS[wildcards])
+
+
+def any_term_nodes(terms):
+    """Return the ids of the nodetypes having any of the terms,
+    as a subquery"""
+    return SearchPosting.objects.nodes(
+        [term[:TERM_LENGTH] for term in terms], 'in')
+
+
+def rank(queryset, terms):
+    """Order a queryset of nodetypes by their BM25 score for the terms,
+    the rarest terms weighing the most, and the occurrences in the
+    longest nodetypes the least"""
+    terms = set([term[:TERM_LENGTH] for term in terms])
+    if not terms:
+        return queryset
+    documents = SearchDocument.objects.aggregate(
+        count=Count('pk'), length=Sum('length'))
+    if not documents['count'] or not documents['length']:
+        return queryset
+    average = float(documents['length']) / documents['count']
+
+    weights = {}
+    for term, frequency in SearchPosting.objects.filter(
+        term__in=terms).values_list('term').annotate(
+        Count('nid')).order_by():
+        idf = log(1 + (documents['count'] - frequency + 0.5) /
+                  (frequency + 0.5))
+        weights[term] = idf * (K1 + 1)
+    return SearchPosting.objects.rank(queryset, weights, K1 * (1 - B),
+                                      K1 * B / average)
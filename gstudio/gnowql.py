@@ -1,6 +1,62 @@
-from gstudio.models import *
-from objectapp.models import *
-from reversion.models import Version
+"""GnowQL, the query language of the graph of Gstudio
+
+A query joins triple patterns over the relations, the attributes and
+the memberships of the nodes, binding its ?variables, and filters the
+values of the attributes bound:
+
+    SELECT ?city ?size WHERE {
+        ?city a City .
+        ?city "located in" India .
+        ?city population ?size .
+        FILTER (?size > 100000)
+    } LIMIT 10
+
+The subjects and objects are ?variables, #ids of nodes, titles of
+nodes or values of attributes, bare or quoted. The predicates are the
+titles of relation types, their inverse names, the titles of attribute
+types or 'a' for the membership of a gbobject to a nodetype or its
+subtypes. The queries are compiled once into plans joining their
+patterns in the order of their estimated selectivity, the comparisons
+of the values being run as range scans of their typed values, and the
+rows matching stream back from a generator."""
+import operator
+
+from pyparsing import Word
+from pyparsing import nums
+from pyparsing import Regex
+from pyparsing import Group
+from pyparsing import oneOf
+from pyparsing import Literal
+from pyparsing import Combine
+from pyparsing import Suppress
+from pyparsing import Optional
+from pyparsing import alphanums
+from pyparsing import OneOrMore
+from pyparsing import StringEnd
+from pyparsing import ZeroOrMore
+from pyparsing import QuotedString
+from pyparsing import ParseException
+from pyparsing import CaselessKeyword
+
+from gstudio.models import NID
+from gstudio.models import Nodetype
+from gstudio.models import Relation
+from gstudio.models import Attribute
+from gstudio.models import AttributeValue
+from gstudio.names import resolve_node
+from gstudio.names import resolve_names
+from gstudio.registry import registry
+from gstudio.planner import chunks
+from gstudio.planner import CHUNK_SIZE
+from gstudio.planner import statistics
+from gstudio.setalgebra import membership
+from gstudio.values import compare
+from gstudio.values import convert
+from gstudio.values import datatype_of
+from gstudio.values import LOOKUPS
+from gstudio.cache import LRUCache
+from gstudio.cache import types_generation
+from gstudio.settings import GNOWQL_PLAN_CACHE_SIZE
 
 MAP = (
     ('objecttype','Objecttype'),
@@ -13,39 +69,22 @@ def get_slug(name):
     returns the uri of the node. 
     """    
     try:
-        """ 
-        note: its very good to use only the meta information given for Version data, 
-        individual object information is best retrieved from the main table. 
-        # Also Version.object.meta contains a lot of valuable information about the model.
-        """
-        node = NID.objects.get(title=str(name))
-        # Retrieving only the relevant tupleset for the versioned objects
-        vrs = Version.objects.filter(type=0 , object_id=node.id) 
-        vrs =  vrs[0]
-
-    except:
+        node = resolve_node(name)
+    except NID.DoesNotExist:
         return "The item was not found."
 
-    return vrs.object.get_absolute_url()
+    return node.get_absolute_url()
 
 def get_nodetype(name):
     """
     returns the model the id belongs to.  
     """    
     try:
-        """ 
-        ALGO:     get object id, go to version model, return for the given id.
-        """
-        node = NID.objects.get(title=str(name))
-        # Retrieving only the relevant tupleset for the versioned objects
-        vrs = Version.objects.filter(type=0 , object_id=node.id) 
-        # Returned value is a list, so splice it .
-        vrs =  vrs[0]
-
-    except:
+        node = resolve_node(name)
+    except NID.DoesNotExist:
         return "The item was not found."
         
-    return vrs.object._meta.module_name   
+    return (node.nodemodel or node.ref.nodemodel).split('.')[1]
     
 
 
@@ -53,16 +92,494 @@ def get_node(name):
     """
     returns a reference to the model object 
     """
-    nt = get_nodetype(name)
-    node = NID.objects.get(title=str(name))
-    this_id = node.id
-    if (nt == 'gbobject'):
-        return Gbobject.objects.get(id=this_id)
-    
-    if (nt == 'objecttype'):
-        return Objecttype.objects.get(id=this_id)
+    return resolve_node(name)
 
-    if (nt == 'metatype'):
-        return Metatype.objects.get(id=this_id)
 
-    
+VARIABLE = 'variable'
+NODE_ID = 'id'
+TEXT = 'text'
+RELATION = 'relation'
+ATTRIBUTE = 'attribute'
+MEMBERSHIP = 'membership'
+
+FILTER_SELECTIVITY = 3
+OPERATORS = {'=': operator.eq, '!=': operator.ne,
+             '<': operator.lt, '<=': operator.le,
+             '>': operator.gt, '>=': operator.ge,
+             '~': lambda value, other: unicode(other).lower() in
+                                       unicode(value).lower()}
+
+plans = LRUCache(GNOWQL_PLAN_CACHE_SIZE)
+
+
+class GnowQLError(ValueError):
+    """Error in the text or in the names of a GnowQL query"""
+
+
+class Term(object):
+    """Variable, node or value of a pattern"""
+
+    def __init__(self, kind, value):
+        self.kind = kind
+        self.value = value
+
+    def __repr__(self):
+        return '<Term %s %r>' % (self.kind, self.value)
+
+
+class Pattern(object):
+    """Subject, predicate and object of a query"""
+
+    def __init__(self, subject, predicate, object):
+        self.subject = subject
+        self.predicate = predicate
+        self.object = object
+
+
+class Filter(object):
+    """Comparison of the values of a variable to a constant"""
+
+    def __init__(self, variable, operator, value):
+        self.variable = variable
+        self.operator = operator
+        self.value = value
+
+    def matches(self, value, datatype):
+        """Return True if the value, compared as the values
+        of the datatype, satisfies the filter"""
+        if self.operator == '~':
+            return OPERATORS[self.operator](value, self.value)
+        value = convert(value, datatype)
+        other = convert(self.value, datatype)
+        if value is None or other is None:
+            return False
+        return OPERATORS[self.operator](value, other)
+
+    def is_indexed(self, datatype):
+        """Return True if the filter is run by the indexed
+        typed values of the attributes of the datatype"""
+        return (self.operator in LOOKUPS or self.operator == '!=') and \
+               convert(self.value, datatype) is not None
+
+
+class Query(object):
+    """Parsed GnowQL query"""
+
+    def __init__(self, patterns, filters, select=None, limit=None):
+        self.patterns = patterns
+        self.filters = filters
+        self.select = select
+        self.limit = limit
+
+
+def build_query(tokens):
+    """Build the Query of the tokens of a parsed text"""
+    select = tokens.get('select')
+    if select is not None:
+        select = [term.value for term in select]
+    limit = tokens.get('limit')
+    if limit is not None:
+        limit = int(limit)
+    return Query([token for token in tokens if isinstance(token, Pattern)],
+                 [token for token in tokens if isinstance(token, Filter)],
+                 select, limit)
+
+
+QUOTED = QuotedString('"', escChar='\\') | QuotedString("'", escChar='\\')
+NUMBER = Regex(r'-?\d+(\.\d+)?(?![\w-])')
+NAME = Word(alphanums + '_-')
+
+VARIABLE_TERM = Combine(Literal('?') + Word(alphanums + '_'))
+VARIABLE_TERM.setParseAction(lambda tokens: Term(VARIABLE, tokens[0][1:]))
+ID_TERM = Combine(Literal('#') + Word(nums))
+ID_TERM.setParseAction(lambda tokens: Term(NODE_ID, int(tokens[0][1:])))
+TEXT_TERM = QUOTED | NUMBER | NAME
+TEXT_TERM.setParseAction(lambda tokens: Term(TEXT, tokens[0]))
+TERM = VARIABLE_TERM | ID_TERM | TEXT_TERM
+
+MEMBERSHIP_PREDICATE = CaselessKeyword('a')
+MEMBERSHIP_PREDICATE.setParseAction(lambda tokens: Term(MEMBERSHIP, None))
+PREDICATE = MEMBERSHIP_PREDICATE | (QUOTED | NAME).setParseAction(
+    lambda tokens: Term(TEXT, tokens[0]))
+
+PATTERN = TERM + PREDICATE + TERM + Optional(Suppress('.'))
+PATTERN.setParseAction(lambda tokens: Pattern(*tokens[:3]))
+
+FILTER = Suppress(CaselessKeyword('filter')) + Suppress('(') + \
+         VARIABLE_TERM + oneOf('= != <= >= < > ~') + \
+         (QUOTED | NUMBER | NAME) + Suppress(')') + Optional(Suppress('.'))
+FILTER.setParseAction(lambda tokens: Filter(tokens[0].value, tokens[1],
+                                            tokens[2]))
+
+SELECT = Suppress(CaselessKeyword('select')) + (
+    Suppress('*') | Group(OneOrMore(VARIABLE_TERM)).setResultsName('select'))
+LIMIT = Suppress(CaselessKeyword('limit')) + Word(nums).setResultsName('limit')
+
+QUERY = Optional(SELECT) + Optional(Suppress(CaselessKeyword('where'))) + \
+        Suppress('{') + ZeroOrMore(FILTER | PATTERN) + Suppress('}') + \
+        Optional(LIMIT) + StringEnd()
+QUERY.setParseAction(build_query)
+
+
+def parse(text):
+    """Parse the text of a query into a Query"""
+    try:
+        return QUERY.parseString(text)[0]
+    except ParseException, error:
+        raise GnowQLError('Invalid GnowQL query: %s' % error)
+
+
+def resolve_predicate(term):
+    """Return the kind of triples of a predicate, the ids of its
+    types and True if its subject and object are swapped"""
+    if term.kind == MEMBERSHIP:
+        if membership() is None:
+            raise GnowQLError('Memberships need objectapp')
+        return MEMBERSHIP, None, False
+    name = term.value.lower()
+    for kind, types, attribute, inverse in (
+        (RELATION, registry.relationtypes, 'title', False),
+        (RELATION, registry.relationtypes, 'inverse', True),
+        (ATTRIBUTE, registry.attributetypes, 'title', False)):
+        ids = sorted([pk for pk, nodetype in types.items()
+                      if (getattr(nodetype, attribute) or '').lower() == name])
+        if ids:
+            return kind, ids, inverse
+    raise GnowQLError('Unknown relation type or attribute type %s'
+                      % term.value)
+
+
+class Step(object):
+    """Pattern of a compiled query, joining the rows of its triples
+    to the bindings of the steps run before it"""
+
+    def __init__(self, kind, predicates, subject, object, bound,
+                 filters=()):
+        self.kind = kind
+        self.predicates = predicates
+        self.subject = subject
+        self.object = object
+        self.bound = frozenset(bound)
+        self.filters = list(filters)
+        self.indexed = []
+        self.datatype = None
+        if kind == MEMBERSHIP:
+            self.fields = membership()[1:]
+        elif kind == RELATION:
+            self.fields = ('left_subject', 'right_subject')
+        else:
+            self.fields = ('subject', 'svalue')
+            self.datatype = datatype_of(predicates[0])
+            if len(set([datatype_of(pk) for pk in predicates])) == 1:
+                self.indexed = [condition for condition in self.filters
+                                if condition.is_indexed(self.datatype)]
+            if self.indexed:
+                self.fields = ('subject', 'text')
+
+    def variables(self):
+        """Return the set of the variables of the step"""
+        return set([term.value for term in (self.subject, self.object)
+                    if term.kind == VARIABLE])
+
+    def is_bound(self, term):
+        """Return True if term is a constant or a variable bound
+        by the steps run before"""
+        return term.kind != VARIABLE or term.value in self.bound
+
+    def estimate(self, stats):
+        """Return the expected number of rows of the step"""
+        if self.kind == MEMBERSHIP:
+            rows, objects = stats.get(('membership', None), (0, 0))
+        else:
+            rows = objects = 0
+            for pk in self.predicates:
+                counts = stats.get(('%stype' % self.kind, pk), (0, 0))
+                rows += counts[0]
+                objects += counts[1]
+        estimate = float(rows)
+        for term in (self.subject, self.object):
+            if self.is_bound(term):
+                estimate /= max(objects, 1)
+        return estimate / FILTER_SELECTIVITY ** len(self.indexed)
+
+    def queryset(self):
+        """Return the (subject, object) rows of the triples, the
+        attributes filtered by range scans of their typed values"""
+        if self.kind == MEMBERSHIP:
+            return membership()[0].objects.order_by().values_list(
+                *self.fields)
+        if self.indexed:
+            queryset = AttributeValue.objects.filter(
+                attributetype__in=self.predicates)
+            for condition in self.indexed:
+                queryset = compare(queryset, self.predicates[0],
+                                   condition.operator, condition.value)
+            return queryset.order_by().values_list(*self.fields)
+        model = self.kind == RELATION and Relation or Attribute
+        return model.objects.filter(**{
+            '%stype__in' % self.kind: self.predicates}).order_by(
+            ).values_list(*self.fields)
+
+    def keys(self, term, constant, bindings):
+        """Return the set of the values of a term in the bindings,
+        None if it is not bound"""
+        if term.kind != VARIABLE:
+            return constant
+        if term.value in self.bound:
+            return set([binding[term.value] for binding in bindings])
+        return None
+
+    def fetch(self, subjects, objects):
+        """Yield lists of the rows of the subjects and objects,
+        looked up by the smaller side, all the rows if none is bound"""
+        queryset = self.queryset()
+        if subjects is None and objects is None:
+            rows = []
+            for row in queryset.iterator():
+                rows.append(row)
+                if len(rows) == CHUNK_SIZE:
+                    yield rows
+                    rows = []
+            if rows:
+                yield rows
+            return
+        if objects is None or (subjects is not None and
+                               len(subjects) <= len(objects)):
+            field, keys = self.fields[0], subjects
+        else:
+            field, keys = self.fields[1], objects
+        for chunk in chunks(keys):
+            yield list(queryset.filter(**{'%s__in' % field: chunk}))
+
+    def join(self, bindings, rows, subjects, objects):
+        """Return the bindings extended by the rows matching them"""
+        if subjects is not None:
+            rows = [row for row in rows if row[0] in subjects]
+        if objects is not None:
+            rows = [row for row in rows if row[1] in objects]
+        subject, object = self.subject, self.object
+        positions = [i for i, term in enumerate((subject, object))
+                     if term.kind == VARIABLE and term.value in self.bound]
+        index = {}
+        for row in rows:
+            index.setdefault(tuple([row[i] for i in positions]),
+                             []).append(row)
+
+        extended = []
+        for binding in bindings:
+            key = tuple([binding[term.value] for term in (subject, object)
+                         if term.kind == VARIABLE and
+                         term.value in self.bound])
+            for row in index.get(key, ()):
+                new = binding.copy()
+                for term, value in zip((subject, object), row):
+                    if term.kind == VARIABLE:
+                        new.setdefault(term.value, value)
+                if subject.kind == object.kind == VARIABLE and \
+                       subject.value == object.value and row[0] != row[1]:
+                    continue
+                if all_match(self.filters, new, self.datatype):
+                    extended.append(new)
+        return extended
+
+    def extend(self, bindings, constants):
+        """Yield the lists of the bindings extended by the rows of
+        the step, the bindings being joined by chunks"""
+        subject_constant, object_constant = constants
+        for i in range(0, len(bindings), CHUNK_SIZE):
+            chunk = bindings[i:i + CHUNK_SIZE]
+            subjects = self.keys(self.subject, subject_constant, chunk)
+            objects = self.keys(self.object, object_constant, chunk)
+            for rows in self.fetch(subjects, objects):
+                extended = self.join(chunk, rows, subject_constant,
+                                     object_constant)
+                if extended:
+                    yield extended
+
+
+def all_match(filters, binding, datatype):
+    """Return True if the binding satisfies all the filters"""
+    for condition in filters:
+        if not condition.matches(binding[condition.variable], datatype):
+            return False
+    return True
+
+
+class Plan(object):
+    """Compiled GnowQL query: its patterns resolved to the types of
+    their triples and ordered so that each step is the most selective
+    among the steps joined to the variables already bound"""
+
+    def __init__(self, query):
+        self.node_variables = set()
+        value_variables = set()
+        patterns = []
+        for pattern in query.patterns:
+            kind, predicates, inverse = resolve_predicate(pattern.predicate)
+            subject, object = pattern.subject, pattern.object
+            if inverse:
+                subject, object = object, subject
+            if kind == ATTRIBUTE and object.kind == NODE_ID:
+                raise GnowQLError('The value of %s cannot be a node'
+                                  % pattern.predicate.value)
+            if subject.kind == VARIABLE:
+                self.node_variables.add(subject.value)
+            if object.kind == VARIABLE and kind == ATTRIBUTE:
+                value_variables.add(object.value)
+            elif object.kind == VARIABLE:
+                self.node_variables.add(object.value)
+            patterns.append((kind, predicates, subject, object))
+        mixed = self.node_variables & value_variables
+        if mixed:
+            raise GnowQLError('?%s cannot be both a node and a value'
+                              % sorted(mixed)[0])
+        self.variables = []
+        for pattern in query.patterns:
+            for term in (pattern.subject, pattern.object):
+                if term.kind == VARIABLE and term.value not in self.variables:
+                    self.variables.append(term.value)
+
+        for condition in query.filters:
+            if condition.variable not in value_variables:
+                raise GnowQLError('?%s is not the value of an attribute'
+                                  % condition.variable)
+        self.steps = self.order(patterns, query.filters)
+        self.select = query.select or self.variables
+        for name in self.select:
+            if name not in self.variables:
+                raise GnowQLError('?%s is not in the patterns' % name)
+        self.limit = query.limit
+
+    def order(self, patterns, filters):
+        """Return the steps of the patterns, each chosen in turn among
+        the patterns sharing a bound variable, by estimated size, with
+        the filters of the variables they bind first"""
+        stats = statistics()
+        bound = set()
+        steps = []
+        while patterns:
+            candidates = []
+            for i, (kind, predicates, subject, object) in enumerate(
+                patterns):
+                variables = set([term.value for term in (subject, object)
+                                 if term.kind == VARIABLE]) - bound
+                step = Step(kind, predicates, subject, object, bound,
+                            [condition for condition in filters
+                             if condition.variable in variables])
+                joined = not bound or bool(step.variables() & bound)
+                candidates.append((not joined, step.estimate(stats), i,
+                                   step))
+            candidates.sort()
+            step, i = candidates[0][3], candidates[0][2]
+            steps.append(step)
+            bound.update(step.variables())
+            del patterns[i]
+        return steps
+
+    def constants(self):
+        """Return the sets of the ids or values of the constant subject
+        and object of each step, None for its variables, the names of
+        the nodes, titles, plurals or alternate names, being resolved
+        at once. Return None if a constant names no node"""
+        titles = set()
+        for step in self.steps:
+            for term, is_node in ((step.subject, True),
+                                  (step.object, step.kind != ATTRIBUTE)):
+                if is_node and term.kind == TEXT:
+                    titles.add(term.value)
+        nodes = resolve_names(titles)
+
+        constants = []
+        for step in self.steps:
+            values = []
+            for term, is_node in ((step.subject, True),
+                                  (step.object, step.kind != ATTRIBUTE)):
+                if term.kind == VARIABLE:
+                    values.append(None)
+                elif term.kind == NODE_ID:
+                    values.append(set([term.value]))
+                elif is_node:
+                    values.append(set(nodes[term.value]))
+                else:
+                    values.append(set([term.value]))
+            if step.kind == MEMBERSHIP and values[1] is not None:
+                values[1] = subtypes(values[1])
+            if set() in values:
+                return None
+            constants.append(tuple(values))
+        return constants
+
+    def solutions(self, index, bindings, constants):
+        """Yield the lists of the bindings of the steps from index"""
+        if index == len(self.steps):
+            yield bindings
+            return
+        for extended in self.steps[index].extend(bindings,
+                                                 constants[index]):
+            for solved in self.solutions(index + 1, extended, constants):
+                yield solved
+
+    def rows(self, bindings):
+        """Return the selected variables of the bindings,
+        the nodes being fetched at once"""
+        ids = set()
+        for binding in bindings:
+            for name in self.select:
+                if name in self.node_variables:
+                    ids.add(binding[name])
+        nodes = NID.objects.resolve(list(ids))
+        rows = []
+        for binding in bindings:
+            row = {}
+            for name in self.select:
+                row[name] = binding[name]
+                if name in self.node_variables:
+                    row[name] = nodes.get(binding[name], binding[name])
+            rows.append(row)
+        return rows
+
+    def execute(self, limit=None):
+        """Yield the {variable: node or value} rows matching the query,
+        up to the limit of the query or the limit given"""
+        if self.limit is not None:
+            limit = min(self.limit, limit is None and self.limit or limit)
+        if limit == 0 or not self.steps:
+            return
+        constants = self.constants()
+        if constants is None:
+            return
+        count = 0
+        for bindings in self.solutions(0, [{}], constants):
+            if limit is not None:
+                bindings = bindings[:limit - count]
+            for row in self.rows(bindings):
+                yield row
+            count += len(bindings)
+            if count == limit:
+                return
+
+
+def subtypes(ids):
+    """Return the ids with the ids of the subtypes of the nodetypes"""
+    ids = set(ids)
+    for nodetype in Nodetype.objects.filter(pk__in=list(ids)):
+        ids.update(nodetype.get_descendants(include_self=True).values_list(
+            'pk', flat=True))
+    return ids
+
+
+def compile_query(text):
+    """Return the Plan of the text of a query, compiled once
+    per process and per generation of the types"""
+    key = (text.strip(), types_generation())
+    plan = plans.get(key)
+    if plan is None:
+        plan = Plan(parse(text))
+        plans.set(key, plan)
+    return plan
+
+
+def run_query(text, limit=None):
+    """Yield the {variable: node or value} rows matching
+    a GnowQL query"""
+    return compile_query(text).execute(limit)
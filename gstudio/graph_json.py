@@ -0,0 +1,91 @@
+"""Compact graph JSON of the nodes of Gstudio
+
+The graph of a node is read from its neighbourhood: the metadata of the
+node and of each of its neighbours once, the names of the predicates
+once, and the edges as [from, predicate id, to] triples. The JSON is
+written incrementally by a generator."""
+import json
+
+from django.db.models.query import QuerySet
+
+from gstudio.models import NID
+from gstudio.models import Relation
+from gstudio.neighbourhood import NODE_FIELDS
+from gstudio.neighbourhood import NeighbourhoodLoader
+
+NODE_ATTRIBUTES = ('altnames', 'plural')
+
+
+def neighbour_ids(node, value):
+    """Return the ids of the neighbours of a node found in a value
+    of its neighbourhood, a relation leading to its other subject"""
+    if isinstance(value, NID):
+        value = [value]
+    elif not isinstance(value, (list, tuple, QuerySet)):
+        return []
+
+    ids = []
+    for item in value:
+        if isinstance(item, Relation):
+            if item.left_subject_id == node.pk:
+                ids.append(item.right_subject_id)
+            else:
+                ids.append(item.left_subject_id)
+        elif isinstance(item, NID):
+            ids.append(item.pk)
+    return ids
+
+
+def graph(node):
+    """Return the ids of the nodes and the (from, predicate, to)
+    edges of the graph of a node"""
+    nbh = getattr(node, 'get_nbh', {})
+    ids = set([node.pk])
+    edges = []
+    for predicate in sorted(nbh.keys()):
+        for pk in neighbour_ids(node, nbh[predicate]):
+            ids.add(pk)
+            edges.append((node.pk, predicate, pk))
+    return ids, edges
+
+
+def stream_graph_json(node, positions=None, viewable=None):
+    """Yield the chunks of the graph JSON of a node, with the x and y
+    of the nodes found in the {id: (x, y)} positions, limited to the
+    nodes whose ids are viewable when given"""
+    ids, edges = graph(node)
+    if viewable is not None:
+        ids = ids & set(viewable)
+        edges = [edge for edge in edges if edge[2] in ids]
+    rows = list(NID.objects.filter(id__in=ids).order_by('id').values_list(
+        *NODE_FIELDS))
+    urls = NeighbourhoodLoader(None).nid_urls(rows)
+    nbh = getattr(node, 'get_nbh', {})
+
+    yield '{"node_metadata": ['
+    separator = ''
+    for pk, title, slug, creation_date in rows:
+        metadata = {'_id': str(pk), 'title': title, 'screen_name': title,
+                    'url': urls[pk]}
+        if pk == node.pk:
+            for key in NODE_ATTRIBUTES:
+                if nbh.get(key):
+                    metadata[key] = nbh[key]
+        if positions and pk in positions:
+            metadata['x'], metadata['y'] = positions[pk]
+        yield separator + json.dumps(metadata)
+        separator = ', '
+
+    predicate_ids = {}
+    for source, predicate, target in edges:
+        if predicate not in predicate_ids:
+            predicate_ids[predicate] = len(predicate_ids) + 1
+    yield '], "predicates": %s, "edges": [' % json.dumps(dict(
+        [(str(pid), predicate) for predicate, pid in predicate_ids.items()]))
+
+    separator = ''
+    for source, predicate, target in edges:
+        yield '%s[%i, %i, %i]' % (separator, source,
+                                  predicate_ids[predicate], target)
+        separator = ', '
+    yield ']}'
@@ -0,0 +1,196 @@
+"""Relations implied by the relation types of Gstudio
+
+The relations of the transitive, symmetrical or reflexive relation
+types are materialized in the InferredRelation table with all the
+relations they imply. Adding a relation derives the new implied ones
+by semi-naive evaluation, joining only the newly derived relations
+with the table at each round. Removing a relation deletes the implied
+ones which may depend on it, then derives again the ones still holding
+(delete and rederive)."""
+from django.db.models import Q
+
+from gstudio.models import Relation
+from gstudio.models import Relationtype
+from gstudio.models import InferredRelation
+from gstudio.triples import match
+
+INFERRED_TRIPLE = ('left_subject', 'relationtype', 'right_subject')
+CHUNK_SIZE = 250
+
+
+def chunks(items, size=CHUNK_SIZE):
+    """Split items into lists of at most size items"""
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def rules(relationtype):
+    """Return the symmetrical, reflexive and transitive flags
+    of a relation type, None counting as False"""
+    return (bool(relationtype.is_symmetrical),
+            bool(relationtype.is_reflexive),
+            bool(relationtype.is_transitive))
+
+
+def is_inferred(relationtype):
+    """Return True if the relations of the type imply other relations"""
+    return True in rules(relationtype)
+
+
+def inferred_relationtypes():
+    """Return the relation types whose relations imply other relations"""
+    return Relationtype.objects.filter(Q(is_symmetrical=True) |
+                                       Q(is_reflexive=True) |
+                                       Q(is_transitive=True))
+
+
+def stored_pairs(relationtype_id, pairs):
+    """Return the (left, right) pairs already in the table"""
+    pairs = set(pairs)
+    stored = set()
+    for lefts in chunks(set([left for left, right in pairs])):
+        stored.update(InferredRelation.objects.filter(
+            relationtype=relationtype_id, left_subject__in=lefts
+            ).values_list('left_subject', 'right_subject'))
+    return stored & pairs
+
+
+def adjacent_pairs(relationtype_id, nodes):
+    """Return the (left, right) pairs of the table with a node on
+    either side, fetched by chunks of nodes"""
+    pairs = set()
+    for ids in chunks(nodes):
+        pairs.update(InferredRelation.objects.filter(
+            Q(left_subject__in=ids) | Q(right_subject__in=ids),
+            relationtype=relationtype_id).values_list(
+            'left_subject', 'right_subject'))
+    return pairs
+
+
+def base_pairs(relationtype_id, pairs):
+    """Return the pairs which are relations of the type"""
+    pairs = set(pairs)
+    base = set()
+    for lefts in chunks(set([left for left, right in pairs])):
+        base.update(Relation.objects.filter(
+            relationtype=relationtype_id, left_subject__in=lefts
+            ).values_list('left_subject', 'right_subject'))
+    return base & pairs
+
+
+def implied_pairs(relationtype, delta, pairs):
+    """Return the pairs implied in one step by the delta pairs
+    joined with the pairs, which include the delta"""
+    symmetrical, reflexive, transitive = rules(relationtype)
+    implied = set()
+    if symmetrical:
+        implied.update([(right, left) for left, right in delta])
+    if reflexive:
+        for left, right in delta:
+            implied.add((left, left))
+            implied.add((right, right))
+    if transitive:
+        predecessors = {}
+        successors = {}
+        for left, right in pairs:
+            predecessors.setdefault(right, set()).add(left)
+            successors.setdefault(left, set()).add(right)
+        for left, right in delta:
+            for other in predecessors.get(left, ()):
+                implied.add((other, right))
+            for other in successors.get(right, ()):
+                implied.add((left, other))
+    return implied
+
+
+def derive(relationtype, delta):
+    """Add the delta pairs of a relation type to the table, with
+    the pairs they imply, by semi-naive evaluation"""
+    delta = set(delta)
+    while delta:
+        delta -= stored_pairs(relationtype.pk, delta)
+        if not delta:
+            break
+        InferredRelation.objects.add(relationtype.pk, delta)
+        nodes = set([left for left, right in delta] +
+                    [right for left, right in delta])
+        delta = implied_pairs(relationtype, delta,
+                              adjacent_pairs(relationtype.pk, nodes))
+
+
+def closure(relationtype, pairs):
+    """Return the pairs of a relation type with the pairs they imply,
+    derived in memory by semi-naive evaluation"""
+    known = set()
+    delta = set(pairs)
+    while delta:
+        known.update(delta)
+        delta = implied_pairs(relationtype, delta, known) - known
+    return known
+
+
+def add_relation(relationtype, left, right):
+    """Add a relation to the table with the relations it implies"""
+    if is_inferred(relationtype):
+        derive(relationtype, [(left, right)])
+
+
+def remove_relation(relationtype, left, right):
+    """Remove a relation from the table with the implied relations
+    depending on it, the ones with other derivations staying"""
+    if not is_inferred(relationtype) or \
+           base_pairs(relationtype.pk, [(left, right)]):
+        return
+    symmetrical, reflexive, transitive = rules(relationtype)
+
+    # Over-delete the pairs which may be derived from the relation
+    adjacent = adjacent_pairs(relationtype.pk, [left, right])
+    edges = [(left, right)]
+    if symmetrical:
+        edges.append((right, left))
+    suspects = set()
+    for source, target in edges:
+        if transitive:
+            sources = set([source] + [other for other, node in adjacent
+                                      if node == source])
+            targets = set([target] + [other for node, other in adjacent
+                                      if node == target])
+            suspects.update([(one, other) for one in sources
+                             for other in targets])
+        else:
+            suspects.add((source, target))
+    if reflexive:
+        nodes = set([left, right] + [one for one, other in suspects] +
+                    [other for one, other in suspects])
+        suspects.update([(node, node) for node in nodes])
+    suspects = stored_pairs(relationtype.pk, suspects)
+    InferredRelation.objects.remove(relationtype.pk, suspects)
+
+    # Rederive the pairs still holding, from the relations
+    # or in one step from the pairs left in the table
+    nodes = set([one for one, other in suspects] +
+                [other for one, other in suspects])
+    remaining = adjacent_pairs(relationtype.pk, nodes)
+    rederived = base_pairs(relationtype.pk, suspects)
+    rederived.update(implied_pairs(relationtype, remaining, remaining) &
+                     suspects)
+    derive(relationtype, rederived)
+
+
+def rebuild(relationtype):
+    """Materialize again the relations of a relation type
+    with the relations they imply"""
+    InferredRelation.objects.filter(relationtype=relationtype.pk).delete()
+    if is_inferred(relationtype):
+        InferredRelation.objects.add(relationtype.pk, closure(
+            relationtype, Relation.objects.filter(
+                relationtype=relationtype.pk).values_list(
+                'left_subject', 'right_subject')))
+
+
+def inferred_triples(s=None, p=None, o=None):
+    """Return the (left_subject_id, relationtype_id, right_subject_id)
+    tuples of the relations of the transitive, symmetrical or reflexive
+    relation types and of the relations they imply, matching
+    the pattern as in triples()"""
+    return match(InferredRelation.objects.all(), INFERRED_TRIPLE, (s, p, o))
@@ -0,0 +1,176 @@
+"""Server-side force-directed layout of the graphs of Gstudio
+
+The positions of the nodes of the graph JSON of a node are computed
+with the Fruchterman-Reingold algorithm over NumPy arrays. On large
+graphs the repulsion of the distant nodes is approximated, Barnes-Hut
+style, by the centres of mass of the cells of a grid. The positions
+are cached by node, version of the graph and shape of the graph."""
+from hashlib import md5
+
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import numpy
+except ImportError:
+    raise ImproperlyConfigured('numpy module is not available')
+
+from gstudio.models import GraphChange
+from gstudio.cache import nbh_cache
+from gstudio.cache import layout_cache_key
+from gstudio.graph_json import graph
+from gstudio.settings import NBH_CACHE_TIMEOUT
+
+WIDTH = 960
+HEIGHT = 700
+ITERATIONS = 50
+EXACT_MAX_NODES = 500
+GRID_CELLS = 16
+NODES_BY_CELL = 4
+MIN_DISTANCE2 = 0.01
+
+
+def exact_repulsion(positions, k):
+    """Return the repulsive displacements between every pair of nodes"""
+    delta = positions[:, numpy.newaxis, :] - positions[numpy.newaxis, :, :]
+    distance2 = numpy.maximum((delta ** 2).sum(axis=2), MIN_DISTANCE2)
+    return (delta * (k * k / distance2)[:, :, numpy.newaxis]).sum(axis=1)
+
+
+def grid_repulsion(positions, k, cells=None):
+    """Return the repulsive displacements of the nodes, exact between
+    the nodes of neighbouring cells of a grid, approximated by the
+    centres of mass of the cells for the nodes farther apart"""
+    size = len(positions)
+    if cells is None:
+        cells = max(GRID_CELLS, int(numpy.sqrt(size / NODES_BY_CELL)))
+    low = positions.min(axis=0)
+    span = numpy.maximum(positions.max(axis=0) - low, MIN_DISTANCE2)
+    coords = numpy.minimum(((positions - low) / span * cells).astype(int),
+                           cells - 1)
+    cell = coords[:, 0] * cells + coords[:, 1]
+    count = numpy.bincount(cell, minlength=cells * cells)
+    centroids = numpy.column_stack([
+        numpy.bincount(cell, positions[:, axis], minlength=cells * cells)
+        for axis in (0, 1)]) / numpy.maximum(count, 1)[:, numpy.newaxis]
+    occupied = numpy.nonzero(count)[0]
+    occupied_coords = numpy.column_stack([occupied // cells,
+                                          occupied % cells])
+
+    # Far field, between the centres of mass of the cells
+    # which are not neighbours, shared by the nodes of a cell
+    delta = centroids[occupied][:, numpy.newaxis, :] - \
+            centroids[occupied][numpy.newaxis, :, :]
+    distance2 = numpy.maximum((delta ** 2).sum(axis=2), MIN_DISTANCE2)
+    weight = count[occupied][numpy.newaxis, :] * k * k / distance2
+    near = numpy.abs(occupied_coords[:, numpy.newaxis, :] -
+                     occupied_coords[numpy.newaxis, :, :]).max(axis=2) <= 1
+    weight[near] = 0
+    far = numpy.zeros((cells * cells, 2))
+    far[occupied] = (delta * weight[:, :, numpy.newaxis]).sum(axis=1)
+    displacement = far[cell]
+
+    # Near field, exact within the 3x3 block of cells around each cell
+    order = numpy.argsort(cell, kind='mergesort')
+    offsets = numpy.zeros(cells * cells + 1, dtype=int)
+    numpy.cumsum(count, out=offsets[1:])
+    for index in occupied:
+        x, y = divmod(int(index), cells)
+        members = order[offsets[index]:offsets[index + 1]]
+        block = numpy.concatenate([
+            order[offsets[i * cells + j]:offsets[i * cells + j + 1]]
+            for i in range(max(x - 1, 0), min(x + 2, cells))
+            for j in range(max(y - 1, 0), min(y + 2, cells))])
+        delta = positions[members][:, numpy.newaxis, :] - \
+                positions[block][numpy.newaxis, :, :]
+        distance2 = numpy.maximum((delta ** 2).sum(axis=2), MIN_DISTANCE2)
+        displacement[members] += (
+            delta * (k * k / distance2)[:, :, numpy.newaxis]).sum(axis=1)
+    return displacement
+
+
+def force_layout(size, sources, targets, width=WIDTH, height=HEIGHT,
+                 iterations=ITERATIONS):
+    """Return the (size, 2) array of the positions, fitted in width
+    and height, of the nodes of a graph whose edges join the indexes
+    in sources and targets"""
+    random = numpy.random.RandomState(size)
+    positions = random.rand(size, 2) * [width, height]
+    if size < 2:
+        return positions
+    sources = numpy.asarray(sources, dtype=int)
+    targets = numpy.asarray(targets, dtype=int)
+
+    k = numpy.sqrt(width * height / float(size))
+    temperature = width / 10.0
+    cooling = temperature / (iterations + 1)
+    for iteration in range(iterations):
+        if size > EXACT_MAX_NODES:
+            displacement = grid_repulsion(positions, k)
+        else:
+            displacement = exact_repulsion(positions, k)
+
+        if len(sources):
+            delta = positions[sources] - positions[targets]
+            distance = numpy.sqrt(numpy.maximum(
+                (delta ** 2).sum(axis=1), MIN_DISTANCE2))
+            force = delta * (distance / k)[:, numpy.newaxis]
+            for axis in (0, 1):
+                displacement[:, axis] -= numpy.bincount(
+                    sources, force[:, axis], minlength=size)
+                displacement[:, axis] += numpy.bincount(
+                    targets, force[:, axis], minlength=size)
+
+        length = numpy.sqrt(numpy.maximum(
+            (displacement ** 2).sum(axis=1), MIN_DISTANCE2))
+        positions += displacement * (numpy.minimum(length, temperature) /
+                                     length)[:, numpy.newaxis]
+        temperature -= cooling
+
+    low = positions.min(axis=0)
+    span = numpy.maximum(positions.max(axis=0) - low, MIN_DISTANCE2)
+    return (positions - low) * (numpy.array([width, height]) / span).min()
+
+
+def graph_layout(ids, edges, center=None):
+    """Return a {node id: (x, y)} dict laying out a graph of nodes
+    and (from, to) edges, translated to put the center in the middle"""
+    ids = sorted(ids)
+    index = dict([(nid, i) for i, nid in enumerate(ids)])
+    edges = [(index[source], index[target]) for source, target in edges
+             if source in index and target in index and source != target]
+    positions = force_layout(len(ids), [edge[0] for edge in edges],
+                             [edge[1] for edge in edges])
+    if center in index:
+        positions += numpy.array([WIDTH / 2.0, HEIGHT / 2.0]) - \
+                     positions[index[center]]
+    return dict([(nid, (round(float(positions[i][0]), 2),
+                        round(float(positions[i][1]), 2)))
+                 for nid, i in index.items()])
+
+
+def cached_layout(nid, ids, edges):
+    """Return the {node id: (x, y)} positions of the nodes of a graph
+    of (from, predicate, to) edges around nid, laid out once by version
+    and shape of the graph"""
+    edges = sorted(set([(source, target)
+                        for source, predicate, target in edges]))
+    digest = md5(repr((sorted(ids), edges))).hexdigest()
+    key = layout_cache_key(nid, GraphChange.objects.version(), digest)
+    positions = nbh_cache.get(key)
+    if positions is None:
+        positions = graph_layout(ids, edges, nid)
+        nbh_cache.set(key, positions, NBH_CACHE_TIMEOUT)
+    return positions
+
+
+def graph_positions(node):
+    """Return the {node id: (x, y)} positions of the nodes of the graph
+    JSON of a node"""
+    ids, edges = graph(node)
+    return cached_layout(node.pk, ids, edges)
+
+
+def network_positions(nid, depths, edges):
+    """Return the {node id: (x, y)} positions of the nodes of the ego
+    network of nid, given by its {nid: depth} nodes and its edges"""
+    return cached_layout(nid, depths.keys(), edges)
@@ -0,0 +1,43 @@
+"""Graph snapshot building command module for Gstudio"""
+from optparse import make_option
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import CommandError
+from django.core.management.base import NoArgsCommand
+
+from gstudio.models import GraphChange
+from gstudio.settings import GRAPH_SNAPSHOT_DIR
+
+
+class Command(NoArgsCommand):
+    """Command object for exporting the graph
+    of the nodes into a snapshot for the traversals"""
+    help = 'Export the graph of the nodes into a memory-mapped snapshot.'
+
+    option_list = NoArgsCommand.option_list + (
+        make_option('--directory', dest='directory',
+                    default=GRAPH_SNAPSHOT_DIR,
+                    help='Directory of the snapshots.'),
+        make_option('--prune', action='store_true', dest='prune',
+                    default=False,
+                    help='Delete the changes already in the '
+                    'previous snapshot, but the last one.'),
+        )
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get('verbosity', 1))
+        directory = options.get('directory')
+        try:
+            from gstudio.snapshot import read_current
+            from gstudio.snapshot import build_snapshot
+        except ImproperlyConfigured:
+            raise CommandError('You need to install the numpy ' \
+                               'module to run this command.')
+
+        previous = read_current(directory)
+        version = build_snapshot(directory)
+        if options.get('prune') and previous is not None:
+            GraphChange.objects.prune(previous[1])
+
+        if verbosity:
+            print 'Snapshot of the graph built at version %i.' % version
@@ -0,0 +1,19 @@
+"""Graph clusters computing command module for Gstudio"""
+from django.core.management.base import NoArgsCommand
+
+from gstudio.clusters import update_clusters
+
+
+class Command(NoArgsCommand):
+    """Command object for storing the connected component
+    and the community of the nodes of the graph"""
+    help = 'Compute the connected components and the communities ' \
+           'of the graph.'
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get('verbosity', 1))
+
+        components, communities = update_clusters()
+        if verbosity:
+            print '%i components and %i communities found.' % (
+                components, communities)
@@ -0,0 +1,22 @@
+"""Graph scores computing command module for Gstudio"""
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import CommandError
+from django.core.management.base import NoArgsCommand
+
+
+class Command(NoArgsCommand):
+    """Command object for computing the PageRank, the degrees
+    and the betweenness of the nodes of the graph"""
+    help = 'Compute the importance of the nodes in the graph.'
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get('verbosity', 1))
+        try:
+            from gstudio.centrality import update_scores
+        except ImproperlyConfigured:
+            raise CommandError('You need to install the numpy ' \
+                               'module to run this command.')
+
+        count = update_scores()
+        if verbosity:
+            print 'Scores of %i nodes computed.' % count
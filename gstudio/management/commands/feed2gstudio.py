@@ -17,7 +17,7 @@ from gstudio import __version__
 from gstudio.models import Nodetype
 from gstudio.models import Metatype
 from gstudio.managers import PUBLISHED
-from gstudio.signals import disconnect_gstudio_signals
+from gstudio.signals import disconnect_ping_signals
 
 
 class Command(LabelCommand):
@@ -45,7 +45,7 @@ class Command(LabelCommand):
         self.style.TITLE = self.style.SQL_FIELD
         self.style.STEP = self.style.SQL_COLTYPE
         self.style.ITEM = self.style.HTTP_INFO
-        disconnect_gstudio_signals()
+        disconnect_ping_signals()
 
     def write_out(self, message, verbosity_level=1):
         """Convenient method for outputing"""
@@ -0,0 +1,35 @@
+"""GnowQL query command module for Gstudio"""
+from optparse import make_option
+
+from django.utils.encoding import smart_str
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from gstudio.gnowql import run_query
+from gstudio.gnowql import compile_query
+from gstudio.gnowql import GnowQLError
+
+
+class Command(BaseCommand):
+    """Command object for printing the rows matching
+    a GnowQL query, separated by tabs"""
+    help = 'Run a GnowQL query over the graph.'
+    args = 'query'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--limit', type='int', dest='limit', default=None,
+                    help='Print at most this number of rows'),
+        )
+
+    def handle(self, *args, **options):
+        if not args:
+            raise CommandError('A GnowQL query is required.')
+        text = ' '.join(args)
+        try:
+            variables = compile_query(text).select
+            rows = run_query(text, options.get('limit'))
+            print '\t'.join(['?%s' % name for name in variables])
+            for row in rows:
+                print '\t'.join([smart_str(row[name]) for name in variables])
+        except GnowQLError, error:
+            raise CommandError(str(error))
@@ -0,0 +1,17 @@
+"""Attribute values rebuilding command module for Gstudio"""
+from django.core.management.base import NoArgsCommand
+
+from gstudio.values import rebuild
+
+
+class Command(NoArgsCommand):
+    """Command object for storing again the typed
+    values of the attributes"""
+    help = 'Rebuild the typed values of the attributes.'
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get('verbosity', 1))
+
+        count = rebuild()
+        if verbosity:
+            print '%i attribute values stored.' % count
@@ -0,0 +1,23 @@
+"""Dependencies rebuilding command module for Gstudio"""
+from django.core.management.base import NoArgsCommand
+
+from gstudio.dependencies import rebuild
+from gstudio.dependencies import dependencies
+
+
+class Command(NoArgsCommand):
+    """Command object for recording again the direction
+    of the links of the prior and posterior nodes"""
+    help = 'Rebuild the table of the dependencies between the nodes.'
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get('verbosity', 1))
+
+        count = rebuild()
+        if verbosity > 1:
+            for cycle in dependencies.cycles():
+                print 'Cycle of dependencies: %s' % \
+                      ', '.join([str(nid) for nid in cycle])
+
+        if verbosity:
+            print '%i dependencies recorded.' % count
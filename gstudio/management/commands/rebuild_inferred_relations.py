@@ -0,0 +1,30 @@
+"""Inferred relations rebuilding command module for Gstudio"""
+from django.core.management.base import NoArgsCommand
+
+from gstudio.models import InferredRelation
+from gstudio.inference import rebuild
+from gstudio.inference import inferred_relationtypes
+
+
+class Command(NoArgsCommand):
+    """Command object for materializing again the relations
+    of the transitive, symmetrical or reflexive relation types
+    with the relations they imply"""
+    help = 'Rebuild the table of the inferred relations.'
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get('verbosity', 1))
+
+        relationtypes = list(inferred_relationtypes())
+        InferredRelation.objects.exclude(relationtype__in=[
+            relationtype.pk for relationtype in relationtypes]).delete()
+        for relationtype in relationtypes:
+            rebuild(relationtype)
+            if verbosity > 1:
+                print '%s: %i relations.' % (
+                    relationtype.title, InferredRelation.objects.filter(
+                        relationtype=relationtype.pk).count())
+
+        if verbosity:
+            print 'Relations of %i relation types inferred.' % \
+                  len(relationtypes)
@@ -0,0 +1,17 @@
+"""Name index rebuilding command module for Gstudio"""
+from django.core.management.base import NoArgsCommand
+
+from gstudio.names import rebuild
+
+
+class Command(NoArgsCommand):
+    """Command object for indexing again the titles,
+    plurals and alternate names of the nodes"""
+    help = 'Rebuild the index of the names of the nodes.'
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get('verbosity', 1))
+
+        count = rebuild()
+        if verbosity:
+            print '%i names indexed.' % count
@@ -0,0 +1,17 @@
+"""Search index rebuilding command module for Gstudio"""
+from django.core.management.base import NoArgsCommand
+
+from gstudio.fulltext import rebuild
+
+
+class Command(NoArgsCommand):
+    """Command object for indexing again the terms
+    of the nodetypes"""
+    help = 'Rebuild the full-text index of the nodetypes.'
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get('verbosity', 1))
+
+        count = rebuild()
+        if verbosity:
+            print '%i nodetypes indexed.' % count
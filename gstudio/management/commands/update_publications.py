@@ -0,0 +1,18 @@
+"""Publications updating command module for Gstudio"""
+from django.core.management.base import NoArgsCommand
+
+from gstudio.publication import update_publications
+
+
+class Command(NoArgsCommand):
+    """Command object for publishing the nodes whose date of start of
+    publication passed and unpublishing the nodes whose date of end of
+    publication passed, to be run regularly"""
+    help = 'Update the sites where the nodes are published.'
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get('verbosity', 1))
+
+        added, removed = update_publications()
+        if verbosity:
+            print '%i publications added, %i removed.' % (added, removed)
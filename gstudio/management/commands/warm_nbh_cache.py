@@ -0,0 +1,49 @@
+"""Neighbourhood cache warming command module for Gstudio"""
+from optparse import make_option
+
+from django.db.models import get_model
+from django.core.management.base import NoArgsCommand
+
+from gstudio.models import Metatype
+from gstudio.models import Nodetype
+from gstudio.models import Objecttype
+from gstudio.cache import cache_nbhs
+
+
+class Command(NoArgsCommand):
+    """Command object for computing and caching
+    the neighbourhoods of the nodes"""
+    help = 'Compute and cache the neighbourhoods of the nodes.'
+
+    option_list = NoArgsCommand.option_list + (
+        make_option('--chunk-size', dest='chunk_size', type='int',
+                    default=100,
+                    help='Number of neighbourhoods computed at once.'),
+        )
+
+    def handle_noargs(self, **options):
+        verbosity = int(options.get('verbosity', 1))
+        chunk_size = options.get('chunk_size')
+
+        nbhs = {}
+        for metatype in Metatype.objects.all():
+            nbhs[metatype.pk] = metatype.build_nbh()
+        cache_nbhs(nbhs)
+        total = len(nbhs)
+
+        total += self.warm(Objecttype.objects.values_list('id', flat=True),
+                           Nodetype.objects.nbh_in_bulk, chunk_size)
+        gbobject = get_model('objectapp', 'gbobject')
+        if gbobject is not None:
+            total += self.warm(gbobject.objects.values_list('id', flat=True),
+                               gbobject.objects.nbh_in_bulk, chunk_size)
+
+        if verbosity:
+            print '%i neighbourhoods cached.' % total
+
+    def warm(self, id_list, nbh_in_bulk, chunk_size):
+        """Cache the neighbourhoods of the ids, chunk by chunk"""
+        id_list = list(id_list)
+        for i in range(0, len(id_list), chunk_size):
+            cache_nbhs(nbh_in_bulk(id_list[i:i + chunk_size]))
+        return len(id_list)
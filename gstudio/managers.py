@@ -2,12 +2,18 @@
 from datetime import datetime
 
 from django.db import models
+from django.db import connection
+from django.db import transaction
+from django.db.models import get_model
+from django.db.models import get_models
 from django.contrib.sites.models import Site
 
 DRAFT = 0
 HIDDEN = 1
 PUBLISHED = 2
 
+CHUNK_SIZE = 250
+
 
 def tags_published():
     """Return the published tags"""
@@ -19,28 +25,332 @@ def tags_published():
     return Tag.objects.filter(name__in=[t.name for t in tags_nodetype_published])
 
 
+def insert_rows(model, fields, rows):
+    """Insert the rows of values of the fields of a model
+    with one executemany statement per chunk of rows"""
+    rows = list(rows)
+    if not rows:
+        return 0
+    qn = connection.ops.quote_name
+    opts = model._meta
+    query = 'INSERT INTO %s (%s) VALUES (%s)' % (
+        qn(opts.db_table),
+        ', '.join([qn(opts.get_field(name).column) for name in fields]),
+        ', '.join(['%s'] * len(fields)))
+    cursor = connection.cursor()
+    for i in range(0, len(rows), CHUNK_SIZE):
+        cursor.executemany(query, rows[i:i + CHUNK_SIZE])
+    transaction.commit_unless_managed()
+    return len(rows)
+
+
+def nodemodel_label(model):
+    """Return the 'app_label.modelname' label of a model"""
+    return '%s.%s' % (model._meta.app_label, model._meta.module_name)
+
+
+def submodels(model):
+    """Return the installed concrete models inheriting
+    from model, the most specific ones first"""
+    children = [child for child in get_models()
+                if issubclass(child, model) and not child._meta.proxy]
+    children.sort(key=lambda child: len(child.__mro__), reverse=True)
+    return children
+
+
+def nodes_in_cluster(queryset, component=None, community=None):
+    """Return only the nodes of a connected component
+    and of a community of the graph, when given"""
+    if component is not None:
+        queryset = queryset.filter(component=component)
+    if community is not None:
+        queryset = queryset.filter(community=community)
+    return queryset
+
+
+class NIDManager(models.Manager):
+    """Default manager of NIDs, resolving them
+    to the instances of their concrete models"""
+
+    def in_cluster(self, component=None, community=None):
+        """Return the NIDs of a component and of a community"""
+        return nodes_in_cluster(self.get_query_set(), component, community)
+
+    def nodemodels(self, id_list):
+        """Return a dictionary mapping the ids
+        to the labels of their concrete models"""
+        labels = dict(self.get_query_set().filter(
+            pk__in=id_list).values_list('id', 'nodemodel'))
+        missing = [pk for pk, label in labels.items() if not label]
+        if missing:
+            labels.update(self.update_nodemodels(missing))
+        return labels
+
+    def update_nodemodels(self, id_list):
+        """Find and store the concrete models of the NIDs
+        saved without them, like legacy nodes and fixtures"""
+        labels = {}
+        remaining = set(id_list)
+        for model in submodels(self.model):
+            if not remaining:
+                break
+            found = list(model._base_manager.filter(
+                pk__in=remaining).values_list('pk', flat=True))
+            if not found:
+                continue
+            label = nodemodel_label(model)
+            self.get_query_set().filter(pk__in=found).update(nodemodel=label)
+            for pk in found:
+                labels[pk] = label
+                remaining.discard(pk)
+        return labels
+
+    def resolve_labels(self, labels):
+        """Return a dictionary mapping ids to their concrete instances
+        from a dictionary mapping ids to model labels,
+        with one query per concrete model"""
+        id_lists = {}
+        for pk, label in labels.items():
+            id_lists.setdefault(label, []).append(pk)
+
+        instances = {}
+        for label, id_list in id_lists.items():
+            model = get_model(*label.split('.'))
+            if model is not None:
+                instances.update(model._default_manager.in_bulk(id_list))
+        return instances
+
+    def resolve(self, id_list):
+        """Return a dictionary mapping the ids
+        to the instances of their concrete models"""
+        return self.resolve_labels(self.nodemodels(id_list))
+
+    def resolve_instances(self, nids):
+        """Return the instances of the concrete models of
+        NIDs already fetched, keeping their order"""
+        nids = list(nids)
+        labels = dict([(nid.pk, nid.nodemodel) for nid in nids])
+        missing = [pk for pk, label in labels.items() if not label]
+        if missing:
+            labels.update(self.update_nodemodels(missing))
+        for nid in nids:
+            if labels.get(nid.pk) == nodemodel_label(nid.__class__):
+                del labels[nid.pk]
+        instances = self.resolve_labels(labels)
+        return [instances.get(nid.pk, nid) for nid in nids]
+
+
+class GraphChangeManager(models.Manager):
+    """Manager of the log of the changes of the graph"""
+
+    def log(self, changes):
+        """Log (source, edgetype, target, added) changes"""
+        now = datetime.now()
+        insert_rows(self.model, ('source', 'edgetype', 'target', 'added',
+                                 'creation_date'),
+                    [change + (now,) for change in changes])
+
+    def version(self):
+        """Return the id of the last change, 0 if none"""
+        return self.get_query_set().aggregate(
+            version=models.Max('id'))['version'] or 0
+
+    def prune(self, version):
+        """Delete the changes up to version, keeping the last change
+        so that the version never goes back"""
+        return self.get_query_set().filter(id__lte=version).exclude(
+            id=self.version()).delete()
+
+    def since(self, version, date=None):
+        """Return the (id, source, edgetype, target, added, creation_date)
+        tuples of the changes logged after version, or since date"""
+        lookup = models.Q(id__gt=version)
+        if date is not None:
+            lookup |= models.Q(creation_date__gte=date)
+        return self.get_query_set().filter(lookup).order_by('id').values_list(
+            'id', 'source', 'edgetype', 'target', 'added', 'creation_date')
+
+
+class InferredRelationManager(models.Manager):
+    """Manager of the relations implied by the relation types"""
+
+    def add(self, relationtype_id, pairs):
+        """Store (left, right) pairs of a relation type,
+        with one executemany statement per chunk of pairs"""
+        insert_rows(self.model, ('left_subject', 'relationtype',
+                                 'right_subject'),
+                    [(left, relationtype_id, right)
+                     for left, right in pairs])
+
+    def remove(self, relationtype_id, pairs):
+        """Delete (left, right) pairs of a relation type,
+        with a query by left subject"""
+        rights = {}
+        for left, right in pairs:
+            rights.setdefault(left, []).append(right)
+        for left, right_list in rights.items():
+            self.filter(relationtype=relationtype_id, left_subject=left,
+                        right_subject__in=right_list).delete()
+
+
+class DependencyManager(models.Manager):
+    """Manager of the dependencies between the nodes"""
+
+    def pairs_by_node(self, pairs):
+        """Return the stored (node, prior) pairs among pairs,
+        with a query by node"""
+        priors = {}
+        for node, prior in pairs:
+            priors.setdefault(node, set()).add(prior)
+        stored = set()
+        for node, prior_set in priors.items():
+            stored.update(self.filter(node=node, prior__in=prior_set
+                                      ).values_list('node', 'prior'))
+        return stored
+
+    def add(self, pairs):
+        """Store the (node, prior) pairs not stored yet
+        and return them"""
+        pairs = set(pairs) - self.pairs_by_node(pairs)
+        for node, prior in pairs:
+            self.create(node=node, prior=prior)
+        return pairs
+
+    def remove(self, pairs):
+        """Delete the stored (node, prior) pairs among pairs
+        and return them"""
+        pairs = self.pairs_by_node(pairs)
+        priors = {}
+        for node, prior in pairs:
+            priors.setdefault(node, []).append(prior)
+        for node, prior_list in priors.items():
+            self.filter(node=node, prior__in=prior_list).delete()
+        return pairs
+
+
+class NodeScoreManager(models.Manager):
+    """Manager of the importance of the nodes in the graph"""
+    scores = ('pagerank', 'in_degree', 'out_degree', 'betweenness')
+
+    def order(self, queryset, score='pagerank'):
+        """Order a queryset of nodes by decreasing score,
+        the nodes not scored coming last"""
+        if score not in self.scores:
+            raise ValueError('Unknown score %s' % score)
+        qn = connection.ops.quote_name
+        opts = self.model._meta
+        node_opts = queryset.model._meta
+        subquery = 'SELECT COALESCE(MAX(%s), 0) FROM %s WHERE %s = %s.%s' % (
+            qn(opts.get_field(score).column), qn(opts.db_table),
+            qn(opts.get_field('nid').column), qn(node_opts.db_table),
+            qn(node_opts.pk.column))
+        return queryset.extra(select={'graph_score': subquery},
+                              order_by=['-graph_score'])
+
+
+class NodeNameManager(models.Manager):
+    """Manager of the names of the nodes"""
+
+    def names_of(self, nid):
+        """Return the set of the (name, kind) of a node"""
+        return set(self.filter(nid=nid).values_list('name', 'kind'))
+
+    def index(self, nid, names):
+        """Replace the (name, kind) names of a node,
+        return the set of the names added, removed or of another kind"""
+        names = set(names)
+        stored = self.names_of(nid)
+        for name, kind in stored - names:
+            self.filter(nid=nid, name=name, kind=kind).delete()
+        insert_rows(self.model, ('nid', 'name', 'kind'),
+                    [(nid, name, kind) for name, kind in names - stored])
+        return set([name for name, kind in names ^ stored])
+
+    def lookup(self, names, chunk_size=250):
+        """Return a {name: [nid, ...]} dict of the nodes named by the
+        names, the nodes titled first, with a query by chunk of names"""
+        names = sorted(set(names))
+        found = {}
+        for i in range(0, len(names), chunk_size):
+            for name, nid in self.filter(
+                name__in=names[i:i + chunk_size]).order_by(
+                'kind', 'nid').values_list('name', 'nid'):
+                nids = found.setdefault(name, [])
+                if nid not in nids:
+                    nids.append(nid)
+        return found
+
+
+class SearchPostingManager(models.Manager):
+    """Manager of the postings of the full-text index"""
+
+    def nodes(self, term, lookup='exact'):
+        """Return the ids of the nodes of the terms matching
+        a term by a lookup, as a subquery"""
+        return self.filter(**{'term__%s' % lookup: term}).values('nid')
+
+    def rank(self, queryset, weights, base, slope):
+        """Order a queryset of nodes by decreasing BM25 score, the sum
+        for each term of its weight times its frequency divided by the
+        frequency plus base plus slope times the length of the node"""
+        if not weights:
+            return queryset
+        qn = connection.ops.quote_name
+        opts = self.model._meta
+        document_opts = get_model('gstudio', 'searchdocument')._meta
+        node_opts = queryset.model._meta
+        terms = sorted(weights)
+        term = 'p.%s' % qn(opts.get_field('term').column)
+        frequency = 'p.%s' % qn(opts.get_field('frequency').column)
+        subquery = 'SELECT COALESCE(SUM(CASE %s %s ELSE 0 END * %s / ' \
+                   '(%s + %%s + %%s * d.%s)), 0) FROM %s p INNER JOIN %s d ' \
+                   'ON d.%s = p.%s WHERE p.%s = %s.%s AND %s IN (%s)' % (
+            term, ' '.join(['WHEN %s THEN %s'] * len(terms)), frequency,
+            frequency, qn(document_opts.get_field('length').column),
+            qn(opts.db_table), qn(document_opts.db_table),
+            qn(document_opts.get_field('nid').column),
+            qn(opts.get_field('nid').column),
+            qn(opts.get_field('nid').column), qn(node_opts.db_table),
+            qn(node_opts.pk.column), term, ', '.join(['%s'] * len(terms)))
+        params = []
+        for name in terms:
+            params.extend([name, weights[name]])
+        params.extend([base, slope] + terms)
+        return queryset.extra(select={'search_score': subquery},
+                              select_params=params,
+                              order_by=['-search_score'])
+
+
 class AuthorPublishedManager(models.Manager):
     """Manager to retrieve published authors"""
 
     def get_query_set(self):
         """Return published authors"""
-        now = datetime.now()
         return super(AuthorPublishedManager, self).get_query_set().filter(
-            nodetypes__status=PUBLISHED,
-            nodetypes__start_publication__lte=now,
-            nodetypes__end_publication__gt=now,
-            nodetypes__sites=Site.objects.get_current()
+            nodetypes__publications__site=Site.objects.get_current()
             ).distinct()
 
 
+class NodetypeManager(models.Manager):
+    """Default manager of nodetypes"""
+
+    def in_cluster(self, component=None, community=None):
+        """Return the nodetypes of a component and of a community"""
+        return nodes_in_cluster(self.get_query_set(), component, community)
+
+    def nbh_in_bulk(self, id_list):
+        """Return a dictionary mapping the ids of the
+        nodetypes to their neighbourhoods"""
+        from gstudio.neighbourhood import nodetype_nbh_in_bulk
+        return nodetype_nbh_in_bulk(
+            self.get_query_set().filter(pk__in=id_list))
+
+
 def nodetypes_published(queryset):
 
-    """Return only the nodetypes published"""
-    now = datetime.now()
-    return queryset.filter(status=PUBLISHED,
-                           start_publication__lte=now,
-                           end_publication__gt=now,
-                           sites=Site.objects.get_current())
+    """Return only the nodetypes published on the current site,
+    read from their publications"""
+    return queryset.filter(publications__site=Site.objects.get_current())
 
 
 class NodetypePublishedManager(models.Manager):
@@ -66,18 +376,9 @@ class NodetypePublishedManager(models.Manager):
     def advanced_search(self, pattern):
         """Advanced search on nodetypes"""
         from gstudio.search import advanced_search
-        return advanced_search(pattern)
+        return advanced_search(pattern, self.get_query_set())
 
     def basic_search(self, pattern):
         """Basic search on nodetypes"""
-        lookup = None
-        for pattern in pattern.split():
-            query_part = models.Q(content__icontains=pattern) | \
-                         models.Q(excerpt__icontains=pattern) | \
-                         models.Q(title__icontains=pattern)
-            if lookup is None:
-                lookup = query_part
-            else:
-                lookup |= query_part
-
-        return self.get_query_set().filter(lookup)
+        from gstudio.search import basic_search
+        return basic_search(pattern, self.get_query_set())
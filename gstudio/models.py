@@ -3,11 +3,16 @@ import warnings
 from datetime import datetime
 from django.db import models
 from django.db.models import Q
+from django.db.models import get_model
 from django.utils.html import strip_tags
 from django.utils.html import linebreaks
 from django.contrib.auth.models import User
 from django.contrib.sites.models import Site
+from django.db.models.signals import pre_save
 from django.db.models.signals import post_save
+from django.db.models.signals import pre_delete
+from django.db.models.signals import post_delete
+from django.db.models.signals import m2m_changed
 from django.utils.importlib import import_module
 from django.contrib import comments
 from django.contrib.comments.models import CommentFlag
@@ -27,6 +32,15 @@ from gstudio.settings import NODETYPE_BASE_MODEL
 from gstudio.settings import MARKDOWN_EXTENSIONS
 from gstudio.settings import AUTO_CLOSE_COMMENTS_AFTER
 from gstudio.managers import nodetypes_published
+from gstudio.managers import NIDManager
+from gstudio.managers import GraphChangeManager
+from gstudio.managers import InferredRelationManager
+from gstudio.managers import DependencyManager
+from gstudio.managers import NodeScoreManager
+from gstudio.managers import NodeNameManager
+from gstudio.managers import SearchPostingManager
+from gstudio.managers import NodetypeManager
+from gstudio.managers import nodemodel_label
 from gstudio.managers import NodetypePublishedManager
 from gstudio.managers import AuthorPublishedManager
 from gstudio.managers import DRAFT, HIDDEN, PUBLISHED
@@ -34,10 +48,10 @@ from gstudio.moderator import NodetypeCommentModerator
 from gstudio.url_shortener import get_url_shortener
 from gstudio.signals import ping_directories_handler
 from gstudio.signals import ping_external_urls_handler
-import json
+from gstudio.cache import get_cached_nbh
+from gstudio.registry import registry
+from gstudio.paths import parent_tree_path
 import reversion
-from reversion.models import Version
-from django.core import serializers
 
 NODETYPE_CHOICES = (
     ('ND', 'Nodes'),
@@ -138,6 +152,14 @@ class NID(models.Model):
     slug = models.SlugField(help_text=_('used for publication'),
                             unique_for_date='creation_date',
                             max_length=255)
+    nodemodel = models.CharField(_('node model'), max_length=255,
+                                 blank=True, editable=False, db_index=True)
+    component = models.IntegerField(_('component'), null=True, blank=True,
+                                    editable=False, db_index=True)
+    community = models.IntegerField(_('community'), null=True, blank=True,
+                                    editable=False, db_index=True)
+
+    objects = NIDManager()
 
 
     def get_serialized_dict(self):
@@ -161,19 +183,17 @@ class NID(models.Model):
         """ 
         Returns the object reference the id belongs to.
         """
-        try:
-            """ 
-            ALGO:     get object id, go to version model, return for the given id.
-            """
-
-            # Retrieving only the relevant tupleset for the versioned objects
-            vrs = Version.objects.filter(type=0 , object_id=self.id)
-            # Returned value is a list, so splice it.                                                                                                     
-            vrs =  vrs[0]            
-        except:
-            return None
-        
-        return vrs.object
+        if not hasattr(self, '_ref'):
+            self._ref = NID.objects.resolve_instances([self])[0]
+        return self._ref
+
+    def save(self, *args, **kwargs):
+        """Store the concrete model of the node,
+        unless a more specific one is already known"""
+        model = self.nodemodel and get_model(*self.nodemodel.split('.'))
+        if not model or issubclass(self.__class__, model):
+            self.nodemodel = nodemodel_label(self.__class__)
+        super(NID, self).save(*args, **kwargs)
 
     @property
     def get_edit_url(self):
@@ -239,6 +259,8 @@ class Metatype(Node):
     
     description = models.TextField(_('description'), blank=True, null=True)
     parent = models.ForeignKey('self', null=True, blank=True, verbose_name=_('parent metatype'), related_name='children')
+    tree_path = models.CharField(_('tree path'), max_length=255, blank=True,
+                                 db_index=True, editable=False)
 
 
     def nodetypes_published(self):
@@ -250,7 +272,16 @@ class Metatype(Node):
     @property
     def get_nbh(self):
         """  
-        Returns the neighbourhood of the metatype
+        Returns the neighbourhood of the metatype, from the
+        neighbourhood cache
+        """
+        if not hasattr(self, '_nbh'):
+            self._nbh = get_cached_nbh(self)
+        return self._nbh
+
+    def build_nbh(self):
+        """
+        Computes the neighbourhood of the metatype
         """
         nbh = {}
         nbh['title'] = self.title
@@ -259,99 +290,49 @@ class Metatype(Node):
         if self.parent:
             nbh['typeof'] = self.parent
         # generate ids and names of children/members
-        nbh['contains_subtypes'] = self.children.get_query_set()
-        nbh['contains_members'] = self.nodetypes.all()
-        nbh['left_subjecttype_of'] = Relationtype.objects.filter(left_subjecttype=self.id)
-        nbh['right_subjecttype_of'] = Relationtype.objects.filter(right_subjecttype=self.id)
-        nbh['attributetypes'] = Attributetype.objects.filter(subjecttype=self.id)
+        nbh['contains_subtypes'] = list(self.children.all())
+        nbh['contains_members'] = list(self.member_types.all())
+        nbh['left_subjecttype_of'] = list(Relationtype.objects.filter(left_subjecttype=self.id))
+        nbh['right_subjecttype_of'] = list(Relationtype.objects.filter(right_subjecttype=self.id))
+        nbh['attributetypes'] = list(Attributetype.objects.filter(subjecttype=self.id))
         
         return nbh
 
+    def get_graph_json(self):
+        """Return the compact graph JSON of the metatype"""
+        from gstudio.graph_json import stream_graph_json
+        return ''.join(stream_graph_json(self))
+
 
     @property
     def get_possible_attributetypes(self):
         """
-        Gets the relations possible for this metatype
-        1. Recursively create a set of all the ancestors i.e. parent/subtypes of the MT. 
-        2. Get all the AT's linked to each ancestor 
+        Gets the attribute types possible for this metatype, the ones
+        of its ancestors read from the cached inherited schema
         """
-        #Step 1. 
-        ancestor_list = []
-        this_parent = self.parent
-        
-        # recursive thru parent field and append
-        while this_parent:
-            ancestor_list.append(this_parent)
-            this_parent = this_parent.parent
-            
-        #Step 2.
-        attrtypes = [] 
-                
-        for each in ancestor_list:
-            # retrieve all the AT's from each ancestor 
-            attrtypes.extend(Attributetype.objects.filter(subjecttype=each.id))
-                     
-        return attrtypes
+        from gstudio.schema import ancestors_schema
+        return ancestors_schema(self, 'attributetypes')
 
 
     @property
     def get_possible_rels(self):
         """
-        Gets the relations possible for this metatype
-        1. Recursively create a set of all the ancestors i.e. parent/subtypes of the MT. 
-        2. Get all the R's linked to each ancestor 
+        Gets the relations possible for this metatype, the ones
+        of its ancestors read from the cached inherited schema
         """
-        #Step 1. 
-        ancestor_list = []
-        this_parent = self.parent
-        
-        # append
-        while this_parent:
-            ancestor_list.append(this_parent)
-            this_parent = this_parent.parent
-            
-        #Step 2.
-        rels = {}
-        rt_set = Relation.objects.all()
-        right_subset = []
-        left_subset = []
-        
-        for each in ancestor_list:
-            # retrieve all the RT's from each ancestor 
-            right_subset.extend(rt_set.filter(subject1=each.id))
-            left_subset.extend(rt_set.filter(subject2=each.id))
-         
-        rels['possible_leftroles'] = left_subset
-        rels['possible_rightroles'] = right_subset
-        
-        return rels
+        from gstudio.schema import ancestors_roles
+        return ancestors_roles(self, 'relations')
 
 
 
     @property
     def get_possible_attributes(self):
         """
-        Gets the relations possible for this metatype
-        1. Recursively create a set of all the ancestors i.e. parent/subtypes of the MT. 
-        2. Get all the RT's linked to each ancestor 
+        Gets the attributes possible for this metatype, the ones
+        of its ancestors read from the cached inherited schema
         """
-        #Step 1. 
-        ancestor_list = []
-        this_parent = self.parent
-        
-        # recursive thru parent field and append
-        while this_parent:
-            ancestor_list.append(this_parent)
-            this_parent = this_parent.parent
-            
-        #Step 2.
-        attrs = [] 
-                
-        for each in ancestor_list:
-            # retrieve all the AT's from each ancestor 
-            attrs.extend(Attribute.objects.filter(subject=each.id))
-                     
-        return attrs
+        from gstudio.schema import ancestors_schema
+        return ancestors_schema(self, 'attributes')
 
     @property
     def get_rendered_nbh(self):
@@ -377,21 +358,14 @@ class Metatype(Node):
         return nbh
 
                   
-    @property
-    def tree_path(self):
-        """Return metatype's tree path, by its ancestors"""
-        if self.parent:
-            return '%s/%s' % (self.parent.tree_path, self.slug)
-        return self.slug
-
     def __unicode__(self):
         return self.title
 
     @property
     def composed_sentence(self):
         "composes the relation as a sentence in triple format."
-        if self.parent:
-            return '%s is a kind of %s' % (self.title, self.parent.tree_path)
+        if self.parent_id:
+            return '%s is a kind of %s' % (self.title, parent_tree_path(self))
         return '%s is a root node'  % (self.slug)
     
 
@@ -426,6 +400,8 @@ class Nodetype(Node):
     parent = models.ForeignKey('self', null=True, blank=True,
                                verbose_name=_('is a kind of'),
                                related_name='children')
+    tree_path = models.CharField(_('tree path'), max_length=255, blank=True,
+                                 db_index=True, editable=False)
 
     prior_nodes = models.ManyToManyField('self', null=True, blank=True,
                                verbose_name=_('its meaning depends on '),
@@ -483,188 +459,61 @@ class Nodetype(Node):
         NODETYPE_TEMPLATES,
         help_text=_('template used to display the nodetype'))
 
-    objects = models.Manager()
+    objects = NodetypeManager()
     published = NodetypePublishedManager()
 
 
     def get_possible_reltypes(self):
         """
-        Gets the relations possible for this metatype
-        1. Recursively create a set of all the ancestors i.e. parent/subtypes of the MT. 
-        2. Get all the RT's linked to each ancestor 
+        Gets the relation types possible for this nodetype, the ones
+        of its ancestors read from the cached inherited schema
         """
-        #Step 1. 
-        ancestor_list = []
-        this_parent = self.parent
-        
-        # append
-        while this_parent:
-            ancestor_list.append(this_parent)
-            this_parent = this_parent.parent
-            
-        #Step 2.
-        reltypes = {}
-        rt_set = Relationtype.objects.all()
-        right_subset = []
-        left_subset = []
-        
-        for each in ancestor_list:
-            # retrieve all the RT's from each ancestor 
-            right_subset.extend(rt_set.filter(subjecttypeLeft=each.id))
-            left_subset.extend(rt_set.filter(subjecttypeRight=each.id))
-         
-        reltypes['possible_leftroles'] = left_subset
-        reltypes['possible_rightroles'] = right_subset
-        
-        return reltypes
+        from gstudio.schema import ancestors_roles
+        return ancestors_roles(self, 'relationtypes')
 
 
     @property
     def get_possible_attributetypes(self):
         """
-        Gets the relations possible for this metatype
-        1. Recursively create a set of all the ancestors i.e. parent/subtypes of the MT. 
-        2. Get all the AT's linked to each ancestor 
+        Gets the attribute types possible for this nodetype, the ones
+        of its ancestors read from the cached inherited schema
         """
-        #Step 1. 
-        ancestor_list = []
-        this_parent = self.parent
-        
-        # recursive thru parent field and append
-        while this_parent:
-            ancestor_list.append(this_parent)
-            this_parent = this_parent.parent
-            
-        #Step 2.
-        attrtypes = [] 
-                
-        for each in ancestor_list:
-            # retrieve all the AT's from each ancestor 
-            attrtypes.extend(Attributetype.objects.filter(subjecttype=each.id))
-                     
-        return attrtypes
+        from gstudio.schema import ancestors_schema
+        return ancestors_schema(self, 'attributetypes')
 
 
     @property
     def get_possible_rels(self):
         """
-        Gets the relations possible for this metatype
-        1. Recursively create a set of all the ancestors i.e. parent/subtypes of the MT. 
-        2. Get all the R's linked to each ancestor 
+        Gets the relations possible for this nodetype, the ones
+        of its ancestors read from the cached inherited schema
         """
-        #Step 1. 
-        ancestor_list = []
-        this_parent = self.parent
-        
-        # append
-        while this_parent:
-            ancestor_list.append(this_parent)
-            this_parent = this_parent.parent
-            
-        #Step 2.
-        rels = {}
-        rt_set = Relation.objects.all()
-        right_subset = []
-        left_subset = []
-        
-        for each in ancestor_list:
-            # retrieve all the RT's from each ancestor 
-            right_subset.extend(rt_set.filter(subject1=each.id))
-            left_subset.extend(rt_set.filter(subject2=each.id))
-         
-        rels['possible_leftroles'] = left_subset
-        rels['possible_rightroles'] = right_subset
-        
-        return rels
+        from gstudio.schema import ancestors_roles
+        return ancestors_roles(self, 'relations')
 
 
 
     @property
     def get_possible_attributes(self):
         """
-        Gets the relations possible for this metatype
-        1. Recursively create a set of all the ancestors i.e. parent/subtypes of the MT. 
-        2. Get all the RT's linked to each ancestor 
+        Gets the attributes possible for this nodetype, the ones
+        of its ancestors read from the cached inherited schema
         """
-        #Step 1. 
-        ancestor_list = []
-        this_parent = self.parent
-        
-        # recursive thru parent field and append
-        while this_parent:
-            ancestor_list.append(this_parent)
-            this_parent = this_parent.parent
-            
-        #Step 2.
-        attrs = [] 
-                
-        for each in ancestor_list:
-            # retrieve all the AT's from each ancestor 
-            attrs.extend(Attribute.objects.filter(subject=each.id))
-                     
-        return attrs
+        from gstudio.schema import ancestors_schema
+        return ancestors_schema(self, 'attributes')
 
 
     def get_graph_json(self):
-        
-        
-        # predicate_id={"plural":"a1","altnames":"a2","contains_members":"a3","contains_subtypes":"a4","prior_nodes":"a5", "posterior_nodes":"a6"}
-	g_json = {}
-	g_json["node_metadata"]= [] 
-
-	
-	nbh = self.get_nbh
-	predicate_id = {}
-        counter = 1
-        for key in nbh.keys():
-            val = "a" + str(counter)
-            predicate_id[key] = val
-            counter = counter + 1
-
-
-        
-	
-        this_node = {"_id":str(self.id),"title":self.title,"screen_name":self.title, "url":self.get_absolute_url()}
-	for key in predicate_id.keys():
-		if nbh[key]:
-			try:
-				g_json[str(key)]=[]      
-				g_json["node_metadata"].append({"_id":str(predicate_id[key]),"screen_name":key})
-				g_json[str(key)].append({"from":self.id , "to":predicate_id[key],"value":1  })
-				if not isinstance(nbh[key],basestring):
-					for item in nbh[key]:
-				
-						g_json["node_metadata"].append({"_id":str(item.id),"screen_name":item.title, "title":item.title, "url":item.get_absolute_url()})
-						g_json[str(key)].append({"from":predicate_id[key] , "to":item.id ,"value":1  })
-			
-				else:
-					value={nbh["plural"]:"a4",nbh["altnames"]:"a5"}			
-		            		this_node[str(key)]=nbh[key]
-				
-					for item in value.keys():
-						g_json["node_metadata"].append({"_id":str(value[nbh[key]]),"screen_name":nbh[key]})
-						g_json[str(key)].append({"from":predicate_id[key] , "to":value[nbh[key]] ,"value":1  })
-				
-			
-			except:
-		                    pass
-	g_json["node_metadata"].append(this_node)      
-        print g_json
-        return json.dumps(g_json)   
+        """Return the compact graph JSON of the nodetype"""
+        from gstudio.graph_json import stream_graph_json
+        return ''.join(stream_graph_json(self))
 
 
-    @property
-    def tree_path(self):
-        """Return nodetype's tree path, by its ancestors"""
-        if self.parent:
-            return '%s/%s' % (self.parent.tree_path, self.slug)
-        return self.slug
-
     @property
     def tree_path_sentence(self):
         """ Return the parent of the nodetype in a triple form """
-        if self.parent:
-            return '%s is a kind of %s' % (self.title, self.parent.tree_path)
+        if self.parent_id:
+            return '%s is a kind of %s' % (self.title, parent_tree_path(self))
         return '%s is a root node' % (self.title)
 
 
@@ -687,14 +536,14 @@ class Nodetype(Node):
         """
         relations={}
         
-        left_relations=Relation.objects.filter(left_subject=self.id)
+        left_relations=registry.attach(Relation.objects.filter(left_subject=self.id))
         if left_relations:    
             for each in left_relations:
                 relation=each.relationtype.title
                 predicate=each.right_subject
                 relations[relation]=predicate
         
-        right_relations=Relation.objects.filter(right_subject=self.id)
+        right_relations=registry.attach(Relation.objects.filter(right_subject=self.id))
         if right_relations:    
             for each in right_relations:
                 relation=each.relationtype.inverse
@@ -705,79 +554,13 @@ class Nodetype(Node):
     @property
     def get_rendered_nbh(self):
         """          
-        Returns the neighbourhood of the nodetype
+        Returns the neighbourhood of the nodetype, computed once per
+        instance with a fixed number of queries
         """
-        nbh = {}
-        nbh['title'] = self.title
-        nbh['altnames'] = self.altnames
-        nbh['plural'] = self.plural        
-        #get all MTs 
-        member_of_dict = {}
-        for each in self.metatypes.all():
-            member_of_dict[each.title]= each.get_absolute_url()
-        nbh['member_of_metatypes']=member_of_dict
-        typeof={}
-        parent=self.parent
-        if parent:
-            typeof[parent] = parent.get_absolute_url()
-        nbh['type_of']=typeof
-        #get all subtypes 
-        subtypes={}
-        for each in Nodetype.objects.filter(parent=self.id):
-            subtypes[each.title] =each.get_absolute_url()
-        nbh['contains_subtypes']=subtypes   
-        # get all the objects inheriting this OT 
-        contains_members_dict = {}
-        for each in self.member_objects.all():
-           contains_members_dict[each.title]= each.get_absolute_url()
-        nbh['contains_members'] = contains_members_dict
-        #get prior nodes
-        priornodes_dict = {}
-        for each in self.prior_nodes.all():
-             priornodes_dict[each.title]= each.get_absolute_url()
-        nbh['priornodes'] = priornodes_dict
-        #get posterior nodes
-        posteriornodes_dict = {}
-        for each in self.posterior_nodes.all():
-             posteriornodes_dict[each.title]= each.get_absolute_url()
-        nbh['posteriornodes'] = posteriornodes_dict
-        #get authors
-        author_dict = {}
-        for each in self.authors.all():
-             author_dict['User'] = each.get_absolute_url()
-        nbh['authors'] = author_dict
-        #get siblings
-        siblings={}
-        for each in self.get_siblings():
-            siblings[each.title]=each.get_absolute_url()
-        nbh['siblings']=siblings
-        #get Relations
-        relns={}
-        relnvalue={}
-        if self.get_relations:
-            NTrelns=self.get_relations
-            for value in NTrelns:
-                relnvalue[NTrelns[value].title]=NTrelns[value].ref.get_absolute_url()
-                relns[value]=relnvalue
-        nbh['relations']=relns
-        #get Attributes
-        attributes = self.subject_of.all()
-        nbh['attributes']=attributes
-        #get ATs
-        attributetypes={}
-        for each in self.subjecttype_of.all():
-            attributetypes[each.title]=each.get_absolute_url()
-        nbh['ats']=attributetypes
-        #get RTs as leftroles and rightroles
-        leftroles = {} 
-        for each in self.left_subjecttype_of.all():
-            leftroles[each.title]=each.get_absolute_url()
-        nbh['leftroles']=leftroles
-        rightroles = {} 
-        for each in self.right_subjecttype_of.all():
-            rightroles[each.title]=each.get_absolute_url()
-        nbh['rightroles']=rightroles
-        return nbh
+        if not hasattr(self, '_rendered_nbh'):
+            from gstudio.neighbourhood import NeighbourhoodLoader
+            self._rendered_nbh = NeighbourhoodLoader(self).rendered_nbh()
+        return self._rendered_nbh
        
  
     @property
@@ -868,15 +651,15 @@ class Nodetype(Node):
     @property
     def subtypeof_sentence(self):
         "composes the relation as a sentence in triple format."
-        if self.parent:
-            return '%s is a subtype of %s' % (self.title, self.parent.tree_path)
+        if self.parent_id:
+            return '%s is a subtype of %s' % (self.title, parent_tree_path(self))
         return '%s is a root node' % (self.title)
     composed_sentence = property(subtypeof_sentence)
 
     def subtypeof(self):
         "retuns the parent nodetype."
-        if self.parent:
-            return '%s' % (self.parent.tree_path)
+        if self.parent_id:
+            return '%s' % (parent_tree_path(self))
         return None 
 
     @models.permalink
@@ -990,31 +773,20 @@ class Objecttype(Nodetype):
     @property
     def get_nbh(self):
         """          
-        Returns the neighbourhood of the nodetype
+        Returns the neighbourhood of the nodetype, from the
+        neighbourhood cache
         """
-        nbh = {}
-        nbh['title'] = self.title
-        nbh['altnames'] = self.altnames
-        nbh['plural'] = self.plural        
-        nbh['member_of_metatype'] = self.metatypes.all()
-        # get all the ATs for the objecttype
-        nbh['subjecttype_of']= self.subjecttype_of.all() 
-        # get all the RTs for the objecttype        
-        nbh.update(self.get_relationtypes) 
-
-        nbh['type_of'] = [self.parent]
+        if not hasattr(self, '_nbh'):
+            self._nbh = get_cached_nbh(self)
+        return self._nbh
 
-        nbh['contains_subtypes'] = Nodetype.objects.filter(parent=self.id)
-        # get all the objects inheriting this OT 
-        nbh['contains_members'] = self.member_objects.all()
-
-        nbh['prior_nodes'] = self.prior_nodes.all()             
-
-        nbh['posterior_nodes'] = self.posterior_nodes.all() 
-
-	nbh['authors'] = self.authors.all()
-
-	return nbh
+    def build_nbh(self):
+        """
+        Computes the neighbourhood of the nodetype with a fixed
+        number of queries
+        """
+        from gstudio.neighbourhood import NeighbourhoodLoader
+        return NeighbourhoodLoader(self).objecttype_nbh()
 
     # def save(self):
     #     nbhood=self.get_nbh
@@ -1226,36 +998,36 @@ class Relation(Edge):
     @property
     def composed_sentence(self):
         "composes the relation as a sentence in a triple format."
-        return '%s %s %s %s %s %s' % (self.left_subject_scope, self.left_subject, self.relationtype_scope, self.relationtype, self.right_subject_scope, self.right_subject)
+        return '%s %s %s %s %s %s' % (self.left_subject_scope, self.left_subject, self.relationtype_scope, registry.relationtype(self.relationtype_id), self.right_subject_scope, self.right_subject)
 
     @property
     def inversed_sentence(self):
         "composes the inverse relation as a sentence in a triple format."
-        return '%s %s %s %s %s' % (self.objectScope, self.right_subject, self.relationtype.inverse, self.left_subject_scope, self.left_subject )
+        return '%s %s %s %s %s' % (self.objectScope, self.right_subject, registry.relationtype(self.relationtype_id).inverse, self.left_subject_scope, self.left_subject )
 
     @property
     def key_value(self):
-        return dict({str(self.relationtype):str(self.right_subject)})
+        return dict({str(registry.relationtype(self.relationtype_id)):str(self.right_subject)})
 
     @property
     def inverse_key_value(self):
-        return dict({str(self.relationtype.inverse):str(self.left_subject)})
+        return dict({str(registry.relationtype(self.relationtype_id).inverse):str(self.left_subject)})
 
 
     @property
     def relation_sentence(self):
         """Return the relations of the objecttypes"""
         
-        if self.relationtype:
+        if self.relationtype_id:
            # for relation in self.relationtype():
-                return '%s %s %s' % (self.left_subject,self.relationtype,self.right_subject )
+                return '%s %s %s' % (self.left_subject,registry.relationtype(self.relationtype_id),self.right_subject )
 
     @property
     def partial_composition(self):
         '''
         function that composes the right_subject and relation name, as in "x as a friend", "y as a sibling"
         '''
-        return '%s as a %s' % (self.right_subject, self.relationtype) 
+        return '%s as a %s' % (self.right_subject, registry.relationtype(self.relationtype_id)) 
 
 
 class Attribute(Edge):
@@ -1301,28 +1073,28 @@ class Attribute(Edge):
         '''
         composes the attribution as a name:value pair sentence without the subject.
         '''
-        return dict({str(self.attributetype_scope) + str(self.attributetype): str(self.value_scope)+ str(self.svalue)})
+        return dict({str(self.attributetype_scope) + str(registry.attributetype(self.attributetype_id)): str(self.value_scope)+ str(self.svalue)})
 
     @property
     def composed_sentence(self):
         '''
         composes the attribution as a sentence in a triple format.
         '''
-        return '%s %s has %s %s %s %s' % (self.subject_scope, self.subject, self.attributetype_scope, self.attributetype, self.value_scope, self.svalue)
+        return '%s %s has %s %s %s %s' % (self.subject_scope, self.subject, self.attributetype_scope, registry.attributetype(self.attributetype_id), self.value_scope, self.svalue)
 
     @property
     def composed_attribution(self):
         '''
         composes a name to the attribute
         '''
-        return 'the %s of %s is %s' % (self.attributetype, self.subject, self.svalue)
+        return 'the %s of %s is %s' % (registry.attributetype(self.attributetype_id), self.subject, self.svalue)
     
     @property
     def partial_composition(self):
         '''
         function that composes the value and attribute name, as in "red as color", "4 as length"
         '''
-        return '%s as %s' % (self.svalue, self.attributetype) 
+        return '%s as %s' % (self.svalue, registry.attributetype(self.attributetype_id)) 
 
 
     def subject_filter(self,attr):
@@ -1542,12 +1314,20 @@ class AttributeSpecification(Node):
         subjects = u''
         for each in self.subjects.all():
             subjects = subjects + each.title + ' '
-        return 'the %s of %s' % (self.attributetype, subjects)
+        return 'the %s of %s' % (registry.attributetype(self.attributetype_id), subjects)
 
 
     def __unicode__(self):
         return self.composed_subject
 
+    @property
+    def get_matches(self):
+        """
+        get the attributes of the type of the subjects
+        """
+        from gstudio.planner import matches
+        return matches(self)
+
 
     class Meta:
         verbose_name = _('attribute specification')
@@ -1571,11 +1351,19 @@ class RelationSpecification(Node):
         subjects = u''
         for each in self.subjects.all():
             subjects = subjects + each.title + ' '
-        return 'the %s of %s' % (self.relationtype, subjects)
+        return 'the %s of %s' % (registry.relationtype(self.relationtype_id), subjects)
 
     def __unicode__(self):
         return self.composed_subject
 
+    @property
+    def get_matches(self):
+        """
+        get the nodes related to the subjects
+        """
+        from gstudio.planner import matches
+        return matches(self)
+
 
     class Meta:
         verbose_name = _('relation specification')
@@ -1607,6 +1395,14 @@ class NodeSpecification(Node):
     def __unicode__(self):
         return self.composed_subject
 
+    @property
+    def get_matches(self):
+        """
+        get the nodes matching the specification
+        """
+        from gstudio.planner import matches
+        return matches(self)
+
 
     class Meta:
         verbose_name = _('Node specification')
@@ -1630,7 +1426,15 @@ class Expression(Node):
     @property
     def composed_sentence(self):
         "composes the relation as a sentence in a triple format."
-        return '%s %s %s' % (self.left_term, self.relationtype, self.right_term)
+        return '%s %s %s' % (self.left_term, registry.relationtype(self.relationtype_id), self.right_term)
+
+    @property
+    def get_matches(self):
+        """
+        get the relations matching the expression
+        """
+        from gstudio.planner import matches
+        return matches(self)
 
 
     class Meta:
@@ -1651,6 +1455,14 @@ class Union(Node):
     def __unicode__(self):
         return self.title
 
+    @property
+    def get_members(self):
+        """
+        get the gbobjects members of the class
+        """
+        from gstudio.setalgebra import members
+        return members(self)
+
 
 
 class Complement(Node):
@@ -1662,6 +1474,14 @@ class Complement(Node):
     def __unicode__(self):
         return self.title
 
+    @property
+    def get_members(self):
+        """
+        get the gbobjects members of the class
+        """
+        from gstudio.setalgebra import members
+        return members(self)
+
 class Intersection(Node):
     """
     Intersection of classes
@@ -1670,8 +1490,227 @@ class Intersection(Node):
         
     def __unicode__(self):
         return self.title
+
+    @property
+    def get_members(self):
+        """
+        get the gbobjects members of the class
+        """
+        from gstudio.setalgebra import members
+        return members(self)
     
 
+class GraphChange(models.Model):
+    """
+    Edges added to or removed from the graph of the nodes, replayed
+    by the graph snapshots to refresh themselves. Relations use their
+    relationtype as edge type, the other edges the negative types below.
+    """
+    NODE = 0
+    PARENT = -1
+    PRIOR = -2
+    POSTERIOR = -3
+
+    source = models.IntegerField(_('source'))
+    edgetype = models.IntegerField(_('edge type'))
+    target = models.IntegerField(_('target'))
+    added = models.BooleanField(_('added'), default=True)
+    creation_date = models.DateTimeField(_('creation date'),
+                                         default=datetime.now)
+
+    objects = GraphChangeManager()
+
+    def __unicode__(self):
+        return '%s %s %s' % (self.source, self.edgetype, self.target)
+
+    class Meta:
+        """GraphChange's Meta"""
+        ordering = ['id']
+        verbose_name = _('graph change')
+        verbose_name_plural = _('graph changes')
+
+
+class InferredRelation(models.Model):
+    """
+    Relations of the transitive, symmetrical or reflexive relation
+    types, with the relations they imply, so that their closure is
+    read with a single indexed lookup.
+    """
+    left_subject = models.IntegerField(_('left subject'))
+    relationtype = models.IntegerField(_('relation type'))
+    right_subject = models.IntegerField(_('right subject'))
+
+    objects = InferredRelationManager()
+
+    def __unicode__(self):
+        return '%s %s %s' % (self.left_subject, self.relationtype,
+                             self.right_subject)
+
+    class Meta:
+        """InferredRelation's Meta"""
+        unique_together = (('left_subject', 'relationtype',
+                            'right_subject'),)
+        verbose_name = _('inferred relation')
+        verbose_name_plural = _('inferred relations')
+
+
+class Dependency(models.Model):
+    """
+    Direction of the links of the prior_nodes and posterior_nodes
+    fields, which are symmetrical: the node depends on the prior.
+    """
+    node = models.IntegerField(_('node'))
+    prior = models.IntegerField(_('prior node'), db_index=True)
+
+    objects = DependencyManager()
+
+    def __unicode__(self):
+        return '%s %s' % (self.node, self.prior)
+
+    class Meta:
+        """Dependency's Meta"""
+        unique_together = (('node', 'prior'),)
+        verbose_name = _('dependency')
+        verbose_name_plural = _('dependencies')
+
+
+class NodeScore(models.Model):
+    """
+    Importance of the nodes in the graph, computed offline
+    by the compute_graph_scores command.
+    """
+    nid = models.IntegerField(_('node'), unique=True)
+    pagerank = models.FloatField(_('pagerank'), db_index=True)
+    in_degree = models.IntegerField(_('in degree'), db_index=True)
+    out_degree = models.IntegerField(_('out degree'))
+    betweenness = models.FloatField(_('betweenness'), db_index=True)
+
+    objects = NodeScoreManager()
+
+    def __unicode__(self):
+        return '%s %s' % (self.nid, self.pagerank)
+
+    class Meta:
+        """NodeScore's Meta"""
+        ordering = ['-pagerank']
+        verbose_name = _('node score')
+        verbose_name_plural = _('node scores')
+
+
+class NodeName(models.Model):
+    """
+    Casefolded titles, plurals and alternate names of the nodes,
+    so that the nodes are found by any of their names with an
+    indexed lookup.
+    """
+    TITLE = 0
+    PLURAL = 1
+    ALTNAME = 2
+    KIND_CHOICES = ((TITLE, _('title')),
+                    (PLURAL, _('plural name')),
+                    (ALTNAME, _('alternate name')))
+
+    name = models.CharField(_('name'), max_length=255, db_index=True)
+    nid = models.IntegerField(_('node'), db_index=True)
+    kind = models.SmallIntegerField(_('kind'), choices=KIND_CHOICES,
+                                    default=TITLE)
+
+    objects = NodeNameManager()
+
+    def __unicode__(self):
+        return '%s %s' % (self.name, self.nid)
+
+    class Meta:
+        """NodeName's Meta"""
+        unique_together = (('name', 'nid', 'kind'),)
+        verbose_name = _('node name')
+        verbose_name_plural = _('node names')
+
+
+class AttributeValue(models.Model):
+    """
+    Values of the attributes converted to the datatype of their
+    attribute type, each kind of value in its own column indexed
+    with the attribute type, so that the attributes are ranged over
+    by their values with indexed scans.
+    """
+    attribute = models.IntegerField(_('attribute'), unique=True)
+    subject = models.IntegerField(_('subject'))
+    attributetype = models.IntegerField(_('attribute type'))
+    number = models.FloatField(_('number'), null=True, blank=True)
+    date = models.DateTimeField(_('date'), null=True, blank=True)
+    time = models.TimeField(_('time'), null=True, blank=True)
+    boolean = models.NullBooleanField(_('boolean'))
+    text = models.CharField(_('text'), max_length=255, blank=True)
+
+    def __unicode__(self):
+        return '%s %s' % (self.attribute, self.text)
+
+    class Meta:
+        """AttributeValue's Meta"""
+        verbose_name = _('attribute value')
+        verbose_name_plural = _('attribute values')
+
+
+class Publication(models.Model):
+    """
+    Sites where a node is published at the time, updated when the node
+    is saved and by the update_publications command as the dates of
+    publication pass, so that the published nodes of a site are found
+    with an indexed equality.
+    """
+    nid = models.ForeignKey(NID, verbose_name=_('node'),
+                            related_name='publications')
+    site = models.ForeignKey(Site, verbose_name=_('site'),
+                             related_name='node_publications')
+
+    def __unicode__(self):
+        return '%s on %s' % (self.nid_id, self.site_id)
+
+    class Meta:
+        """Publication's Meta"""
+        unique_together = (('site', 'nid'),)
+        verbose_name = _('publication')
+        verbose_name_plural = _('publications')
+
+
+class SearchPosting(models.Model):
+    """
+    Number of occurrences of a term in the title, the excerpt and the
+    content of a nodetype, a posting of the full-text index.
+    """
+    term = models.CharField(_('term'), max_length=50)
+    nid = models.IntegerField(_('node'), db_index=True)
+    frequency = models.PositiveIntegerField(_('frequency'))
+
+    objects = SearchPostingManager()
+
+    def __unicode__(self):
+        return '%s %s' % (self.term, self.nid)
+
+    class Meta:
+        """SearchPosting's Meta"""
+        unique_together = (('term', 'nid'),)
+        verbose_name = _('search posting')
+        verbose_name_plural = _('search postings')
+
+
+class SearchDocument(models.Model):
+    """
+    Number of terms of a nodetype in the full-text index.
+    """
+    nid = models.IntegerField(_('node'), unique=True)
+    length = models.PositiveIntegerField(_('length'))
+
+    def __unicode__(self):
+        return '%s %s' % (self.nid, self.length)
+
+    class Meta:
+        """SearchDocument's Meta"""
+        verbose_name = _('search document')
+        verbose_name_plural = _('search documents')
+
+
 reversion.register(NID)
 # reversion.register(Node)
 # reversion.register(Objecttype)
@@ -1714,6 +1753,40 @@ if not reversion.is_registered(Relation):
     reversion.register(Relation, follow=["edge_ptr", "left_subject", "right_subject", "relationtype"])
 
 moderator.register(Nodetype, NodetypeCommentModerator)
+
+from django.utils.functional import curry
+from django.core.signals import request_started
+from gstudio.signals import previous_fields_pre_save_handler
+from gstudio.signals import expire_generations_handler
+from gstudio.signals import invalidate_nbh_handler
+from gstudio.signals import invalidate_nbh_pre_delete_handler
+from gstudio.signals import invalidate_nbh_m2m_handler
+from gstudio.signals import graph_m2m_handler
+from gstudio.signals import graph_post_save_handler
+from gstudio.signals import graph_post_delete_handler
+from gstudio.signals import invalidate_schema_handler
+from gstudio.signals import members_pre_delete_handler
+from gstudio.signals import invalidate_members_handler
+from gstudio.signals import invalidate_facets_handler
+from gstudio.signals import inference_post_save_handler
+from gstudio.signals import inference_post_delete_handler
+from gstudio.signals import dependency_m2m_handler
+from gstudio.signals import dependency_post_delete_handler
+from gstudio.signals import name_index_post_save_handler
+from gstudio.signals import name_index_post_delete_handler
+from gstudio.signals import attribute_value_post_save_handler
+from gstudio.signals import attribute_value_post_delete_handler
+from gstudio.signals import tree_path_pre_save_handler
+from gstudio.signals import tree_path_post_save_handler
+from gstudio.signals import publication_post_save_handler
+from gstudio.signals import publication_m2m_handler
+from gstudio.signals import search_index_post_save_handler
+from gstudio.signals import search_index_post_delete_handler
+
+# Connected before the pre_save handlers of mptt,
+# which move the types in the table before their saves
+pre_save.connect(previous_fields_pre_save_handler,
+                 dispatch_uid='gstudio.nid.pre_save.previous_fields')
 mptt.register(Metatype, order_insertion_by=['title'])
 mptt.register(Nodetype, order_insertion_by=['title'])
 mptt.register(Objecttype, order_insertion_by=['title'])
@@ -1725,6 +1798,81 @@ post_save.connect(ping_directories_handler, sender=Nodetype,
                   dispatch_uid='gstudio.nodetype.post_save.ping_directories')
 post_save.connect(ping_external_urls_handler, sender=Nodetype,
                   dispatch_uid='gstudio.nodetype.post_save.ping_external_urls')
-
-
-
+request_started.connect(expire_generations_handler,
+                        dispatch_uid='gstudio.request_started.generations')
+post_save.connect(invalidate_nbh_handler,
+                  dispatch_uid='gstudio.nid.post_save.nbh_cache')
+pre_delete.connect(invalidate_nbh_pre_delete_handler,
+                   dispatch_uid='gstudio.nid.pre_delete.nbh_cache')
+post_delete.connect(invalidate_nbh_handler,
+                    dispatch_uid='gstudio.nid.post_delete.nbh_cache')
+post_save.connect(invalidate_schema_handler,
+                  dispatch_uid='gstudio.nid.post_save.schema_cache')
+post_delete.connect(invalidate_schema_handler,
+                    dispatch_uid='gstudio.nid.post_delete.schema_cache')
+m2m_changed.connect(invalidate_nbh_m2m_handler, sender=Nodetype.metatypes.through,
+                    dispatch_uid='gstudio.nodetype.metatypes.nbh_cache')
+m2m_changed.connect(invalidate_nbh_m2m_handler, sender=Nodetype.prior_nodes.through,
+                    dispatch_uid='gstudio.nodetype.prior_nodes.nbh_cache')
+m2m_changed.connect(invalidate_nbh_m2m_handler, sender=Nodetype.posterior_nodes.through,
+                    dispatch_uid='gstudio.nodetype.posterior_nodes.nbh_cache')
+m2m_changed.connect(invalidate_nbh_m2m_handler, sender=Nodetype.authors.through,
+                    dispatch_uid='gstudio.nodetype.authors.nbh_cache')
+post_save.connect(graph_post_save_handler,
+                  dispatch_uid='gstudio.nid.post_save.graph')
+post_delete.connect(graph_post_delete_handler,
+                    dispatch_uid='gstudio.nid.post_delete.graph')
+m2m_changed.connect(curry(graph_m2m_handler, field='prior_nodes',
+                          edgetype=GraphChange.PRIOR),
+                    sender=Nodetype.prior_nodes.through, weak=False,
+                    dispatch_uid='gstudio.nodetype.prior_nodes.graph')
+m2m_changed.connect(curry(graph_m2m_handler, field='posterior_nodes',
+                          edgetype=GraphChange.POSTERIOR),
+                    sender=Nodetype.posterior_nodes.through, weak=False,
+                    dispatch_uid='gstudio.nodetype.posterior_nodes.graph')
+post_save.connect(inference_post_save_handler, sender=Relation,
+                  dispatch_uid='gstudio.relation.post_save.inference')
+post_save.connect(inference_post_save_handler, sender=Relationtype,
+                  dispatch_uid='gstudio.relationtype.post_save.inference')
+post_delete.connect(inference_post_delete_handler, sender=Relation,
+                    dispatch_uid='gstudio.relation.post_delete.inference')
+post_delete.connect(inference_post_delete_handler, sender=Relationtype,
+                    dispatch_uid='gstudio.relationtype.post_delete.inference')
+m2m_changed.connect(curry(dependency_m2m_handler, field='prior_nodes'),
+                    sender=Nodetype.prior_nodes.through, weak=False,
+                    dispatch_uid='gstudio.nodetype.prior_nodes.dependencies')
+m2m_changed.connect(curry(dependency_m2m_handler, field='posterior_nodes'),
+                    sender=Nodetype.posterior_nodes.through, weak=False,
+                    dispatch_uid='gstudio.nodetype.posterior_nodes.dependencies')
+post_delete.connect(dependency_post_delete_handler,
+                    dispatch_uid='gstudio.nid.post_delete.dependencies')
+pre_delete.connect(members_pre_delete_handler,
+                   dispatch_uid='gstudio.nid.pre_delete.members')
+post_save.connect(invalidate_members_handler,
+                  dispatch_uid='gstudio.nid.post_save.members')
+post_delete.connect(invalidate_members_handler,
+                    dispatch_uid='gstudio.nid.post_delete.members')
+post_save.connect(invalidate_facets_handler,
+                  dispatch_uid='gstudio.nid.post_save.facets')
+post_delete.connect(invalidate_facets_handler,
+                    dispatch_uid='gstudio.nid.post_delete.facets')
+post_save.connect(name_index_post_save_handler,
+                  dispatch_uid='gstudio.nid.post_save.names')
+post_delete.connect(name_index_post_delete_handler,
+                    dispatch_uid='gstudio.nid.post_delete.names')
+post_save.connect(attribute_value_post_save_handler,
+                  dispatch_uid='gstudio.nid.post_save.values')
+post_delete.connect(attribute_value_post_delete_handler,
+                    dispatch_uid='gstudio.nid.post_delete.values')
+pre_save.connect(tree_path_pre_save_handler,
+                 dispatch_uid='gstudio.nid.pre_save.paths')
+post_save.connect(tree_path_post_save_handler,
+                  dispatch_uid='gstudio.nid.post_save.paths')
+post_save.connect(publication_post_save_handler,
+                  dispatch_uid='gstudio.nid.post_save.publications')
+m2m_changed.connect(publication_m2m_handler, sender=Nodetype.sites.through,
+                    dispatch_uid='gstudio.nodetype.sites.publications')
+post_save.connect(search_index_post_save_handler,
+                  dispatch_uid='gstudio.nid.post_save.search')
+post_delete.connect(search_index_post_delete_handler,
+                    dispatch_uid='gstudio.nid.post_delete.search')
@@ -0,0 +1,169 @@
+"""Name index of the nodes of Gstudio
+
+The titles, plurals and alternate names of the nodes are casefolded
+and stored in the NodeName table when the nodes are saved, so that a
+node is found by any of its names with an indexed lookup. The names
+resolved are kept by each process in a bounded LRU cache, each name
+forgotten when its own generation counter in the shared cache changes,
+so that saving a node only makes the processes look up its names
+changed again."""
+from django.utils.encoding import force_unicode
+
+from tagging.utils import parse_tag_input
+
+from gstudio.models import NID
+from gstudio.models import Node
+from gstudio.models import NodeName
+from gstudio.cache import LRUCache
+from gstudio.cache import LocalGeneration
+from gstudio.cache import NAMES_GENERATION_KEY
+from gstudio.cache import name_generations
+from gstudio.cache import invalidate_names
+from gstudio.managers import insert_rows
+from gstudio.settings import NAME_CACHE_SIZE
+
+CHUNK_SIZE = 250
+
+
+def normalize(name):
+    """Return the casefolded name, its spaces collapsed"""
+    return u' '.join(force_unicode(name).lower().split())[:255]
+
+
+def names_of(title, plural=None, altnames=None):
+    """Return the set of the (name, kind) names of a node"""
+    names = set()
+    for kind, values in ((NodeName.TITLE, [title]),
+                         (NodeName.PLURAL, [plural]),
+                         (NodeName.ALTNAME, parse_tag_input(altnames or ''))):
+        for value in values:
+            name = value and normalize(value)
+            if name:
+                names.add((name, kind))
+    return names
+
+
+def node_names(node):
+    """Return the set of the (name, kind) names of a node instance"""
+    return names_of(node.title, getattr(node, 'plural', None),
+                    getattr(node, 'altnames', None))
+
+
+class NameIndex(object):
+    """Nodes of the names resolved by the process"""
+
+    def __init__(self, size=NAME_CACHE_SIZE):
+        self.generation = LocalGeneration(NAMES_GENERATION_KEY)
+        self.loaded = None
+        self.checked = None
+        self.fresh = set()
+        self.cache = LRUCache(size)
+        self.nodemodels = LRUCache(size)
+
+    def load(self):
+        """Forget the names resolved if another generation of the whole
+        index started, and check again the generations of the names
+        once the generation of the index was read again"""
+        generation = self.generation.current()
+        if generation != self.loaded:
+            self.cache.clear()
+            self.nodemodels.clear()
+            self.loaded = generation
+        if self.generation.checked != self.checked:
+            self.fresh = set()
+            self.checked = self.generation.checked
+
+    def clear(self):
+        """Forget the names resolved by the process"""
+        self.generation.expire()
+        self.loaded = None
+        self.fresh = set()
+        self.cache.clear()
+        self.nodemodels.clear()
+
+    def resolve(self, names):
+        """Return a {name: [nid, ...]} dict of the ids of the nodes
+        titled or else named by each name, the names changed or missing
+        from the cache being looked up with a single query"""
+        self.load()
+        normalized = dict([(name, normalize(name)) for name in names])
+        unchecked = set([name for name in normalized.values()
+                         if name not in self.fresh])
+        if unchecked:
+            generations = name_generations(unchecked)
+            missing = set([name for name in unchecked
+                           if self.cache.get(name, (None,))[0] !=
+                           generations[name]])
+            if missing:
+                found = NodeName.objects.lookup(missing, CHUNK_SIZE)
+                for name in missing:
+                    self.cache.set(name, (generations[name],
+                                          tuple(found.get(name, ()))))
+            self.fresh.update(unchecked)
+        return dict([(name, list(self.cache.get(key)[1]))
+                     for name, key in normalized.items()])
+
+    def nodemodel(self, nid):
+        """Return the label of the concrete model of a node,
+        None if it does not exist"""
+        if nid not in self.nodemodels:
+            self.nodemodels.set(nid, NID.objects.nodemodels([nid]).get(nid))
+        return self.nodemodels.get(nid)
+
+    def forget(self, changed):
+        """Make every process forget the nodes of the names changed"""
+        if changed:
+            invalidate_names(changed)
+            self.fresh.difference_update(changed)
+
+    def update(self, node):
+        """Index the names of a node"""
+        self.forget(NodeName.objects.index(node.pk, node_names(node)))
+
+    def remove(self, nid):
+        """Remove the names of a deleted node"""
+        changed = set([name for name, kind in
+                       NodeName.objects.names_of(nid)])
+        if changed:
+            NodeName.objects.filter(nid=nid).delete()
+            self.forget(changed)
+
+
+names = NameIndex()
+
+
+def resolve_names(name_list):
+    """Return a {name: [nid, ...]} dict of the nodes of the names"""
+    return names.resolve(name_list)
+
+
+def resolve_node(name):
+    """Return the node titled or else named name,
+    raise NID.DoesNotExist if there is none"""
+    nids = names.resolve([name])[name]
+    label = nids and names.nodemodel(nids[0])
+    node = label and NID.objects.resolve_labels(
+        {nids[0]: label}).get(nids[0])
+    if not node:
+        raise NID.DoesNotExist('No node is named %s' % name)
+    return node
+
+
+def rebuild():
+    """Index again the names of all the nodes
+    and return the number of names"""
+    rows = {}
+    for pk, title in NID.objects.values_list('pk', 'title').iterator():
+        rows[pk] = [title, None, None]
+    for pk, plural, altnames in Node.objects.values_list(
+        'pk', 'plural', 'altnames').iterator():
+        if pk in rows:
+            rows[pk][1:] = [plural, altnames]
+
+    NodeName.objects.all().delete()
+    count = insert_rows(NodeName, ('nid', 'name', 'kind'),
+                        [(pk, name, kind) for pk, (title, plural, altnames)
+                         in rows.items()
+                         for name, kind in names_of(title, plural, altnames)])
+    invalidate_names()
+    return count
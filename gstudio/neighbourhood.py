@@ -0,0 +1,500 @@
+"""Neighbourhood loader for Gstudio
+
+Builds the neighbourhood of a nodetype with a fixed number of queries,
+whatever its degree, by selecting only the columns needed through joined
+lookups and by building the permalinks of the neighbours in bulk."""
+from django.db.models import Q
+from django.db.models import get_model
+from django.core.urlresolvers import reverse
+from django.core.urlresolvers import NoReverseMatch
+from django.utils.encoding import iri_to_uri
+
+from gstudio.models import NID
+from gstudio.models import Metatype
+from gstudio.models import Nodetype
+from gstudio.models import Relation
+from gstudio.models import Relationtype
+from gstudio.models import Attributetype
+from gstudio.registry import registry
+
+NODE_FIELDS = ('id', 'title', 'slug', 'creation_date')
+
+DATE_SENTINELS = {'year': '9876', 'month': '54', 'day': '32',
+                  'slug': 'gstudio-sentinel-slug'}
+PATH_SENTINELS = {'path': 'gstudio-sentinel-path'}
+USERNAME_SENTINELS = {'username': 'gstudio-sentinel-username'}
+
+
+def get_gbobject_model():
+    """Return the Gbobject model, None if objectapp is not installed"""
+    return get_model('objectapp', 'gbobject')
+
+
+def date_kwargs(slug, creation_date):
+    """Return the kwargs of a date based permalink"""
+    return {'year': creation_date.strftime('%Y'),
+            'month': creation_date.strftime('%m'),
+            'day': creation_date.strftime('%d'),
+            'slug': slug}
+
+
+class UrlTemplate(object):
+    """Reverse an url pattern once with sentinel values,
+    then fill the resulting template for many objects"""
+
+    def __init__(self, viewname, sentinels):
+        self.viewname = viewname
+        self.template = None
+        try:
+            url = reverse(viewname, kwargs=sentinels)
+        except NoReverseMatch:
+            return
+
+        url = url.replace('%', '%%')
+        for key, value in sentinels.items():
+            if url.count(value) != 1:  # Ambiguous, use reverse()
+                return
+            url = url.replace(value, '%%(%s)s' % key)
+        self.template = url
+
+    def __call__(self, **kwargs):
+        if self.template is None:
+            return reverse(self.viewname, kwargs=kwargs)
+        return iri_to_uri(self.template % kwargs)
+
+
+class NeighbourhoodLoader(object):
+    """Load the neighbourhood of a nodetype with
+    a fixed number of queries"""
+
+    def __init__(self, nodetype):
+        self.node = nodetype
+        self._templates = {}
+        self._metatype_paths = None
+
+    def url_template(self, viewname, sentinels):
+        """Return the UrlTemplate of a view, reversed only once"""
+        if not viewname in self._templates:
+            self._templates[viewname] = UrlTemplate(viewname, sentinels)
+        return self._templates[viewname]
+
+    def nodetype_url(self, slug, creation_date):
+        """Return the permalink of a nodetype"""
+        return self.url_template('gstudio_nodetype_detail', DATE_SENTINELS)(
+            **date_kwargs(slug, creation_date))
+
+    def gbobject_url(self, slug, creation_date):
+        """Return the permalink of a gbobject"""
+        return self.url_template('objectapp_gbobject_detail',
+                                 DATE_SENTINELS)(
+            **date_kwargs(slug, creation_date))
+
+    def author_url(self, username):
+        """Return the permalink of an author"""
+        return self.url_template('gstudio_author_detail',
+                                 USERNAME_SENTINELS)(username=username)
+
+    @property
+    def metatype_paths(self):
+        """Return the tree paths of all the metatypes,
+        read with a single query"""
+        if self._metatype_paths is None:
+            self._metatype_paths = dict(Metatype.objects.values_list(
+                'id', 'tree_path'))
+        return self._metatype_paths
+
+    def metatype_url(self, pk):
+        """Return the permalink of a metatype"""
+        return self.url_template('gstudio_metatype_detail', PATH_SENTINELS)(
+            path=self.metatype_paths[pk])
+
+    def nid_urls(self, rows):
+        """Return the permalinks of rows of NIDs
+        whose concrete model is not known"""
+        ids = [row[0] for row in rows]
+        labels = ids and NID.objects.nodemodels(ids) or {}
+
+        urls = {}
+        for pk, title, slug, creation_date in rows:
+            if pk in self.metatype_paths:
+                urls[pk] = self.metatype_url(pk)
+            elif labels.get(pk, '').startswith('objectapp.'):
+                urls[pk] = self.gbobject_url(slug, creation_date)
+            else:
+                urls[pk] = self.nodetype_url(slug, creation_date)
+        return urls
+
+    def nodetype_links(self, rows):
+        """Return a {title: url} dict from rows of nodetypes"""
+        links = {}
+        for pk, title, slug, creation_date in rows:
+            links[title] = self.nodetype_url(slug, creation_date)
+        return links
+
+    def rendered_nbh(self):
+        """Return the neighbourhood of the nodetype
+        with the permalinks of the neighbours"""
+        node = self.node
+        nbh = {}
+        nbh['title'] = node.title
+        nbh['altnames'] = node.altnames
+        nbh['plural'] = node.plural
+
+        member_of_dict = {}
+        for pk, title in node.metatypes.values_list('id', 'title'):
+            member_of_dict[title] = self.metatype_url(pk)
+        nbh['member_of_metatypes'] = member_of_dict
+
+        # Parent, subtypes and siblings within one query
+        family = Q(parent=node.pk)
+        if node.parent_id:
+            family |= Q(parent=node.parent_id) | Q(pk=node.parent_id)
+        else:
+            family |= Q(parent__isnull=True)
+        typeof = {}
+        subtypes = {}
+        siblings = {}
+        for pk, parent, title, slug, creation_date in Nodetype.objects.filter(
+            family).values_list('id', 'parent', *NODE_FIELDS[1:]):
+            url = self.nodetype_url(slug, creation_date)
+            if pk == node.parent_id:
+                typeof[title] = url
+            if parent == node.pk:
+                subtypes[title] = url
+            elif parent == node.parent_id and pk != node.pk:
+                siblings[title] = url
+        nbh['type_of'] = typeof
+        nbh['contains_subtypes'] = subtypes
+
+        contains_members_dict = {}
+        gbobject = get_gbobject_model()
+        if gbobject is not None:
+            for pk, title, slug, creation_date in gbobject.objects.filter(
+                objecttypes=node.pk).values_list(*NODE_FIELDS):
+                contains_members_dict[title] = self.gbobject_url(
+                    slug, creation_date)
+        nbh['contains_members'] = contains_members_dict
+
+        nbh['priornodes'] = self.nodetype_links(
+            node.prior_nodes.values_list(*NODE_FIELDS))
+        nbh['posteriornodes'] = self.nodetype_links(
+            node.posterior_nodes.values_list(*NODE_FIELDS))
+
+        author_dict = {}
+        for username in node.authors.values_list('username', flat=True):
+            author_dict['User'] = self.author_url(username)
+        nbh['authors'] = author_dict
+        nbh['siblings'] = siblings
+
+        # Relations in both directions, with their subjects, in one query
+        rows = Relation.objects.filter(
+            Q(left_subject=node.pk) | Q(right_subject=node.pk)).values_list(
+            'relationtype__title', 'relationtype__inverse',
+            'left_subject', 'left_subject__title',
+            'left_subject__slug', 'left_subject__creation_date',
+            'right_subject', 'right_subject__title',
+            'right_subject__slug', 'right_subject__creation_date')
+        subjects = {}
+        for row in rows:
+            subjects[row[2]] = row[2:6]
+            subjects[row[6]] = row[6:10]
+        urls = self.nid_urls(subjects.values())
+        relns = {}
+        for row in rows:
+            if row[2] == node.pk:
+                name, subject = row[0], row[6:10]
+            else:
+                name, subject = row[1], row[2:6]
+            relns.setdefault(name, {})[subject[1]] = urls[subject[0]]
+        nbh['relations'] = relns
+
+        nbh['attributes'] = list(
+            node.subject_of.select_related('attributetype'))
+        nbh['ats'] = self.nodetype_links(
+            Attributetype.objects.filter(
+                subjecttype=node.pk).values_list(*NODE_FIELDS))
+
+        leftroles = {}
+        rightroles = {}
+        for row in Relationtype.objects.filter(
+            Q(left_subjecttype=node.pk) | Q(right_subjecttype=node.pk)
+            ).values_list('left_subjecttype', 'right_subjecttype',
+                          *NODE_FIELDS):
+            url = self.nodetype_url(row[4], row[5])
+            if row[0] == node.pk:
+                leftroles[row[3]] = url
+            if row[1] == node.pk:
+                rightroles[row[3]] = url
+        nbh['leftroles'] = leftroles
+        nbh['rightroles'] = rightroles
+        return nbh
+
+    def objecttype_nbh(self):
+        """Return the neighbourhood of an objecttype as model instances"""
+        node = self.node
+        nbh = {}
+        nbh['title'] = node.title
+        nbh['altnames'] = node.altnames
+        nbh['plural'] = node.plural
+        nbh['member_of_metatype'] = list(node.metatypes.all())
+        nbh['subjecttype_of'] = list(node.subjecttype_of.all())
+
+        roles = list(Relationtype.objects.filter(
+            Q(left_subjecttype=node.pk) | Q(right_subjecttype=node.pk)))
+        nbh['left_subjecttype_of'] = [rt for rt in roles
+                                      if rt.left_subjecttype_id == node.pk]
+        nbh['right_subjecttype_of'] = [rt for rt in roles
+                                       if rt.right_subjecttype_id == node.pk]
+
+        # Parent and subtypes within one query
+        family = Q(parent=node.pk)
+        if node.parent_id:
+            family |= Q(pk=node.parent_id)
+        parent = None
+        subtypes = []
+        for nodetype in Nodetype.objects.filter(family):
+            if nodetype.pk == node.parent_id:
+                parent = nodetype
+            if nodetype.parent_id == node.pk:
+                subtypes.append(nodetype)
+        nbh['type_of'] = [parent]
+        nbh['contains_subtypes'] = subtypes
+
+        gbobject = get_gbobject_model()
+        if gbobject is not None:
+            nbh['contains_members'] = list(
+                gbobject.objects.filter(objecttypes=node.pk))
+        else:
+            nbh['contains_members'] = []
+        nbh['prior_nodes'] = list(node.prior_nodes.all())
+        nbh['posterior_nodes'] = list(node.posterior_nodes.all())
+        nbh['authors'] = list(node.authors.all())
+        return nbh
+
+
+def m2m_pairs(field, id_list, inverse=False):
+    """Return the (id, related id) pairs of a many to many field
+    for the given ids, reading only its intermediary table"""
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    if inverse:
+        source, target = target, source
+    return field.rel.through.objects.filter(
+        **{'%s__in' % source: id_list}).values_list(source, target)
+
+
+def group_pairs(pairs, instances):
+    """Group instances by the first id of the pairs"""
+    groups = {}
+    for pk, related_pk in pairs:
+        if related_pk in instances:
+            groups.setdefault(pk, []).append(instances[related_pk])
+    return groups
+
+
+def neighbour_ids(id_list):
+    """Return the ids of the nodes whose neighbourhoods show the nodes
+    of id_list, read from the tables of the relations, the attributes,
+    the trees and the many to many fields, so that no neighbour is
+    missed when a neighbourhood was evicted from the cache"""
+    from gstudio.models import Attribute
+
+    ids = set()
+    for row in Relation.objects.filter(
+        Q(left_subject__in=id_list) | Q(right_subject__in=id_list) |
+        Q(relationtype__in=id_list)).values_list(
+        'pk', 'left_subject', 'right_subject'):
+        ids.update(row)
+    for row in Attribute.objects.filter(
+        Q(subject__in=id_list) | Q(attributetype__in=id_list)).values_list(
+        'pk', 'subject'):
+        ids.update(row)
+    for row in Relationtype.objects.filter(
+        Q(left_subjecttype__in=id_list) |
+        Q(right_subjecttype__in=id_list)).values_list(
+        'pk', 'left_subjecttype', 'right_subjecttype'):
+        ids.update(row)
+    for row in Attributetype.objects.filter(
+        subjecttype__in=id_list).values_list('pk', 'subjecttype'):
+        ids.update(row)
+    for model in (Metatype, Nodetype):
+        for row in model.objects.filter(
+            Q(pk__in=id_list) | Q(parent__in=id_list)).values_list(
+            'pk', 'parent'):
+            ids.update(row)
+
+    fields = [Nodetype._meta.get_field(name) for name in
+              ('prior_nodes', 'posterior_nodes', 'metatypes')]
+    gbobject = get_gbobject_model()
+    if gbobject is not None:
+        fields.extend([gbobject._meta.get_field(name) for name in
+                       ('prior_nodes', 'posterior_nodes', 'objecttypes')])
+    for field in fields:
+        for inverse in (False, True):
+            for row in m2m_pairs(field, id_list, inverse):
+                ids.update(row)
+    ids.discard(None)
+    return ids
+
+
+def nodetype_nbh_in_bulk(nodetypes):
+    """Return the neighbourhoods of many nodetypes, by id,
+    with a constant number of queries"""
+    from django.contrib.auth.models import User
+
+    nodes = list(nodetypes)
+    id_list = [node.pk for node in nodes]
+    if not id_list:
+        return {}
+    fields = dict([(name, Nodetype._meta.get_field(name)) for name in
+                   ('metatypes', 'prior_nodes', 'posterior_nodes', 'authors')])
+
+    metatype_pairs = list(m2m_pairs(fields['metatypes'], id_list))
+    metatypes = Metatype.objects.in_bulk(
+        [pk for node_pk, pk in metatype_pairs])
+    prior_pairs = list(m2m_pairs(fields['prior_nodes'], id_list))
+    posterior_pairs = list(m2m_pairs(fields['posterior_nodes'], id_list))
+    author_pairs = list(m2m_pairs(fields['authors'], id_list))
+    authors = User.objects.in_bulk([pk for node_pk, pk in author_pairs])
+
+    # Subtypes, parents, prior and posterior nodes in one query
+    related_ids = [pk for node_pk, pk in prior_pairs + posterior_pairs]
+    related_ids.extend([node.parent_id for node in nodes if node.parent_id])
+    nodetypes = dict([(nodetype.pk, nodetype) for nodetype in
+                      Nodetype.objects.filter(Q(pk__in=related_ids) |
+                                              Q(parent__in=id_list))])
+    id_set = set(id_list)
+    subtypes = {}
+    for nodetype in nodetypes.values():
+        if nodetype.parent_id in id_set:
+            subtypes.setdefault(nodetype.parent_id, []).append(nodetype)
+
+    attributetypes = {}
+    for attributetype in Attributetype.objects.filter(
+        subjecttype__in=id_list):
+        attributetypes.setdefault(attributetype.subjecttype_id,
+                                  []).append(attributetype)
+    left_roles = {}
+    right_roles = {}
+    for relationtype in Relationtype.objects.filter(
+        Q(left_subjecttype__in=id_list) | Q(right_subjecttype__in=id_list)):
+        left_roles.setdefault(relationtype.left_subjecttype_id,
+                              []).append(relationtype)
+        right_roles.setdefault(relationtype.right_subjecttype_id,
+                               []).append(relationtype)
+
+    members = {}
+    gbobject = get_gbobject_model()
+    if gbobject is not None:
+        member_pairs = list(m2m_pairs(gbobject._meta.get_field('objecttypes'),
+                                      id_list, inverse=True))
+        members = group_pairs(member_pairs, gbobject.objects.in_bulk(
+            [pk for node_pk, pk in member_pairs]))
+
+    metatypes = group_pairs(metatype_pairs, metatypes)
+    prior_nodes = group_pairs(prior_pairs, nodetypes)
+    posterior_nodes = group_pairs(posterior_pairs, nodetypes)
+    authors = group_pairs(author_pairs, authors)
+
+    nbhs = {}
+    for node in nodes:
+        nbh = {}
+        nbh['title'] = node.title
+        nbh['altnames'] = node.altnames
+        nbh['plural'] = node.plural
+        nbh['member_of_metatype'] = metatypes.get(node.pk, [])
+        nbh['subjecttype_of'] = attributetypes.get(node.pk, [])
+        nbh['left_subjecttype_of'] = left_roles.get(node.pk, [])
+        nbh['right_subjecttype_of'] = right_roles.get(node.pk, [])
+        nbh['type_of'] = [nodetypes.get(node.parent_id)]
+        nbh['contains_subtypes'] = subtypes.get(node.pk, [])
+        nbh['contains_members'] = members.get(node.pk, [])
+        nbh['prior_nodes'] = prior_nodes.get(node.pk, [])
+        nbh['posterior_nodes'] = posterior_nodes.get(node.pk, [])
+        nbh['authors'] = authors.get(node.pk, [])
+        nbhs[node.pk] = nbh
+    return nbhs
+
+
+def gbobject_nbh_in_bulk(gbobjects):
+    """Return the neighbourhoods of many gbobjects, by id,
+    with a constant number of queries"""
+    from django.contrib.auth.models import User
+    from gstudio.models import Attribute
+
+    nodes = list(gbobjects)
+    id_list = [node.pk for node in nodes]
+    if not id_list:
+        return {}
+    gbobject = get_gbobject_model()
+    fields = dict([(name, gbobject._meta.get_field(name)) for name in
+                   ('objecttypes', 'prior_nodes', 'posterior_nodes',
+                    'authors')])
+
+    objecttype_pairs = list(m2m_pairs(fields['objecttypes'], id_list))
+    objecttypes = group_pairs(objecttype_pairs, Nodetype.objects.in_bulk(
+        [pk for node_pk, pk in objecttype_pairs]))
+    prior_pairs = list(m2m_pairs(fields['prior_nodes'], id_list))
+    posterior_pairs = list(m2m_pairs(fields['posterior_nodes'], id_list))
+    related = NID.objects.resolve(
+        [pk for node_pk, pk in prior_pairs + posterior_pairs])
+    prior_nodes = group_pairs(prior_pairs, related)
+    posterior_nodes = group_pairs(posterior_pairs, related)
+    author_pairs = list(m2m_pairs(fields['authors'], id_list))
+    authors = group_pairs(author_pairs, User.objects.in_bulk(
+        [pk for node_pk, pk in author_pairs]))
+
+    id_set = set(id_list)
+    relations = {}
+    for relation in registry.attach(Relation.objects.filter(
+        Q(left_subject__in=id_list) | Q(right_subject__in=id_list))):
+        if relation.left_subject_id in id_set:
+            relations.setdefault(relation.left_subject_id, {}).setdefault(
+                unicode(relation.relationtype.title), []).append(relation)
+        if relation.right_subject_id in id_set:
+            relations.setdefault(relation.right_subject_id, {}).setdefault(
+                unicode(relation.relationtype.inverse), []).append(relation)
+
+    attributes = {}
+    for attribute in registry.attach(Attribute.objects.filter(
+        subject__in=id_list)):
+        attributes.setdefault(attribute.subject_id, {}).update(
+            attribute.edge_node_dict)
+
+    nbhs = {}
+    for node in nodes:
+        nbh = {}
+        nbh['title'] = node.title
+        nbh['altnames'] = node.altnames
+        nbh['plural'] = node.plural
+        nbh['content'] = node.content
+        nbh['member_of'] = objecttypes.get(node.pk, [])
+        nbh['prior_nodes'] = prior_nodes.get(node.pk, [])
+        nbh['posterior_nodes'] = posterior_nodes.get(node.pk, [])
+        nbh['authors'] = authors.get(node.pk, [])
+        nbh.update(relations.get(node.pk, {}))
+        nbh.update(attributes.get(node.pk, {}))
+        nbhs[node.pk] = nbh
+    return nbhs
+
+
+def serialize_nbh(nbh):
+    """Return a neighbourhood as a JSON serializable dict"""
+    data = {}
+    for key, value in nbh.items():
+        if value is None or isinstance(value, basestring):
+            data[key] = value
+            continue
+        items = []
+        for item in value:
+            if item is None:
+                continue
+            if isinstance(item, Relation):
+                items.append({'_id': item.pk,
+                              'relationtype': item.relationtype_id,
+                              'left_subject': item.left_subject_id,
+                              'right_subject': item.right_subject_id})
+            else:
+                items.append({'_id': item.pk, 'title': unicode(item)})
+        data[key] = items
+    return data
@@ -0,0 +1,94 @@
+"""Tree paths of the metatypes and nodetypes of Gstudio
+
+The path of the slugs of a type and of its ancestors is stored in its
+tree_path column, computed from the path of its parent when it is
+saved. When the path of a type changes, by a move or a new slug, the
+paths of its descendants, found by the old path starting them, are
+rewritten with a single update. A type is not saved if its path or the
+paths of its descendants would not fit in the tree_path column."""
+from django.db import connection
+from django.db import transaction
+
+PATH_SEPARATOR = '/'
+
+
+def tree_path_of(node):
+    """Return the tree path of a type from the path of its parent"""
+    if node.parent_id:
+        return PATH_SEPARATOR.join((node.parent.tree_path, node.slug))
+    return node.slug
+
+
+def parent_tree_path(node):
+    """Return the tree path of the parent of a type,
+    read from its own path, None for a root"""
+    if node.parent_id:
+        return node.tree_path.rsplit(PATH_SEPARATOR, 1)[0]
+    return None
+
+
+def concat(left, right):
+    """Return the SQL concatenation of two expressions"""
+    if 'mysql' in connection.settings_dict['ENGINE']:
+        return 'CONCAT(%s, %s)' % (left, right)
+    return '%s || %s' % (left, right)
+
+
+def length(expression):
+    """Return the SQL length in characters of an expression"""
+    if 'mysql' in connection.settings_dict['ENGINE']:
+        return 'CHAR_LENGTH(%s)' % expression
+    return 'LENGTH(%s)' % expression
+
+
+def descendants_where(node, old_path):
+    """Return the table and the tree path column of a type, and the
+    condition selecting its descendants in its tree by the old path
+    starting their paths, with its parameters"""
+    qn = connection.ops.quote_name
+    opts = node._meta
+    model = opts.get_field_by_name('tree_path')[1] or node.__class__
+    tree_id_attr = node._mptt_meta.tree_id_attr
+    tree_id = node.__class__._default_manager.filter(
+        pk=node.pk).values_list(tree_id_attr, flat=True)[0]
+    column = qn(opts.get_field('tree_path').column)
+    where = '%s = %%s AND %s ' % (qn(opts.get_field(tree_id_attr).column),
+                                  column) + \
+            connection.operators['startswith']
+    prefix = connection.ops.prep_for_like_query(old_path + PATH_SEPARATOR)
+    return (qn(model._meta.db_table), column, where,
+            [tree_id, prefix + '%'])
+
+
+def check_tree_path(node, old_path=None):
+    """Raise ValueError if the tree path of a type, or the paths of its
+    descendants once their old path is replaced, do not fit in the
+    tree_path column"""
+    max_length = node._meta.get_field('tree_path').max_length
+    longest = len(node.tree_path)
+    if old_path is not None and old_path != node.tree_path:
+        table, column, where, params = descendants_where(node, old_path)
+        cursor = connection.cursor()
+        cursor.execute('SELECT MAX(%s) FROM %s WHERE %s' % (
+            length(column), table, where), params)
+        deepest = cursor.fetchone()[0]
+        if deepest:
+            longest = max(longest, deepest - len(old_path) +
+                          len(node.tree_path))
+    if longest > max_length:
+        raise ValueError('The tree paths of %s would be longer '
+                         'than %i characters' % (node.slug, max_length))
+
+
+def update_descendant_paths(node, old_path):
+    """Replace the old path of a type by its new path at the start of
+    the paths of its descendants and return their number"""
+    table, column, where, params = descendants_where(node, old_path)
+    query = 'UPDATE %s SET %s = %s WHERE %s' % (
+        table, column,
+        concat('%s', 'SUBSTR(%s, %i)' % (column, len(old_path) + 1)),
+        where)
+    cursor = connection.cursor()
+    cursor.execute(query, [node.tree_path] + params)
+    transaction.commit_unless_managed()
+    return cursor.rowcount
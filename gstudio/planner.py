@@ -0,0 +1,286 @@
+"""Query planner of the specifications of Gstudio
+
+A NodeSpecification is compiled into constraints on the nodes: being
+a member of its subject, being the left subject of a relation like each
+of its relations, and the subject of an attribute like each of its
+attributes. The constraints are ordered by their selectivity, estimated
+from the counts of the relations and attributes of each type, and run
+one after the other: each is a single query on the indexes of the
+triples, restricted to the nodes matched so far. AttributeSpecification,
+RelationSpecification and Expression are run the same way, their terms
+being themselves specifications or plain nodes."""
+from django.db.models import Count
+
+from gstudio.models import NID
+from gstudio.models import Metatype
+from gstudio.models import Nodetype
+from gstudio.models import Relation
+from gstudio.models import Attribute
+from gstudio.models import Expression
+from gstudio.models import NodeSpecification
+from gstudio.models import RelationSpecification
+from gstudio.models import AttributeSpecification
+from gstudio.setalgebra import membership
+from gstudio.cache import schema_cache
+from gstudio.cache import statistics_cache_key
+from gstudio.settings import STATISTICS_CACHE_TIMEOUT
+
+CHUNK_SIZE = 250
+
+
+def chunks(items, size=CHUNK_SIZE):
+    """Split items into lists of at most size items"""
+    items = sorted(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def statistics():
+    """Return the {('relationtype', id): (rows, objects),
+    ('attributetype', id): (rows, values)} counts of the relations and
+    attributes of each type, with their distinct right subjects or
+    values, and the ('membership', None) counts of the memberships of
+    the gbobjects and of their distinct nodetypes, cached until an
+    attribute or a relation changes, for STATISTICS_CACHE_TIMEOUT
+    seconds at most"""
+    key = statistics_cache_key()
+    stats = schema_cache.get(key)
+    if stats is None:
+        stats = {}
+        for row in Relation.objects.values('relationtype').annotate(
+            rows=Count('left_subject'),
+            objects=Count('right_subject', distinct=True)).order_by():
+            stats[('relationtype', row['relationtype'])] = (
+                row['rows'], row['objects'])
+        for row in Attribute.objects.values('attributetype').annotate(
+            rows=Count('subject'),
+            values=Count('svalue', distinct=True)).order_by():
+            stats[('attributetype', row['attributetype'])] = (
+                row['rows'], row['values'])
+        through = membership()
+        if through is not None:
+            through, gbobject_field, nodetype_field = through
+            stats[('membership', None)] = (
+                through.objects.count(),
+                through.objects.values(nodetype_field).distinct().count())
+        schema_cache.set(key, stats, STATISTICS_CACHE_TIMEOUT)
+    return stats
+
+
+class Constraint(object):
+    """Condition on the nodes matched by a specification"""
+
+    def estimate(self, stats):
+        """Return the expected number of nodes matching"""
+        raise NotImplementedError
+
+    def apply(self, queryset):
+        """Return the queryset of nodes restricted
+        to the nodes matching"""
+        raise NotImplementedError
+
+
+class MemberConstraint(Constraint):
+    """Nodes among a list or a subquery of ids,
+    as the members of a type, of an expected size"""
+
+    def __init__(self, ids, size=None):
+        self.ids = ids
+        if size is None:
+            size = len(ids)
+        self.size = size
+
+    def estimate(self, stats):
+        return self.size
+
+    def apply(self, queryset):
+        return queryset.filter(pk__in=self.ids)
+
+    def __repr__(self):
+        return '<MemberConstraint %i nodes>' % self.size
+
+
+class TypeConstraint(Constraint):
+    """Gbobjects of a nodetype or of its subtypes"""
+
+    def __init__(self, nodetype):
+        self.nodetype = nodetype
+
+    def estimate(self, stats):
+        rows, nodetypes = stats.get(('membership', None), (0, 0))
+        return float(rows) / max(nodetypes, 1) * (
+            self.nodetype.get_descendant_count() + 1)
+
+    def apply(self, queryset):
+        """Restrict the nodes to the gbobjects of the subtypes,
+        with a subquery on the memberships"""
+        through = membership()
+        if through is None:
+            return queryset.none()
+        through, gbobject_field, nodetype_field = through
+        subtypes = self.nodetype.get_descendants(include_self=True)
+        return queryset.filter(pk__in=through.objects.filter(**{
+            '%s__in' % nodetype_field: subtypes.values('pk')}).values(
+            gbobject_field))
+
+    def __repr__(self):
+        return '<TypeConstraint %s>' % self.nodetype.pk
+
+
+class TripleConstraint(Constraint):
+    """Nodes subject of a relation or an attribute of a type
+    to an object or a value"""
+    related = None
+    predicate = None
+    value_field = None
+    kind = None
+
+    def __init__(self, predicate, value):
+        self.predicate_id = predicate
+        self.value = value
+
+    def estimate(self, stats):
+        rows, values = stats.get((self.kind, self.predicate_id), (0, 0))
+        return float(rows) / max(values, 1)
+
+    def apply(self, queryset):
+        """Join the nodes to the rows of the predicate and value"""
+        return queryset.filter(**{
+            '%s__%s' % (self.related, self.predicate): self.predicate_id,
+            '%s__%s' % (self.related, self.value_field): self.value})
+
+    def __repr__(self):
+        return '<%s %s %s>' % (self.__class__.__name__,
+                               self.predicate_id, self.value)
+
+
+class RelationConstraint(TripleConstraint):
+    """Nodes left subject of a relation of a type to a right subject"""
+    related = 'left_subject_of'
+    predicate = 'relationtype'
+    value_field = 'right_subject'
+    kind = 'relationtype'
+
+
+class AttributeConstraint(TripleConstraint):
+    """Nodes subject of an attribute of a type with a value"""
+    related = 'subject_of'
+    predicate = 'attributetype'
+    value_field = 'svalue'
+    kind = 'attributetype'
+
+
+def plan(constraints, stats=None):
+    """Return the constraints ordered by increasing estimated size,
+    the most selective being joined first"""
+    if stats is None:
+        stats = statistics()
+    return [constraint for estimate, i, constraint in sorted(
+        [(constraint.estimate(stats), i, constraint)
+         for i, constraint in enumerate(constraints)])]
+
+
+def run(constraints):
+    """Return the set of the nodes matching all the constraints, with
+    a single query joining them in the order of the plan"""
+    if not constraints:
+        return set()
+    queryset = NID.objects.all()
+    for constraint in plan(constraints):
+        queryset = constraint.apply(queryset)
+    return set(queryset.order_by().distinct().values_list('pk', flat=True))
+
+
+def member_constraint(node):
+    """Return the constraint of being a member of a type: a gbobject
+    of a nodetype or of its subtypes, a nodetype of a metatype,
+    the node itself otherwise"""
+    node = node.ref
+    if isinstance(node, Nodetype):
+        return TypeConstraint(node)
+    if isinstance(node, Metatype):
+        nodetypes = Nodetype.objects.filter(metatypes=node.pk)
+        return MemberConstraint(nodetypes.values('pk'), nodetypes.count())
+    return MemberConstraint([node.pk])
+
+
+def node_constraints(specification):
+    """Return the constraints of a NodeSpecification"""
+    constraints = [member_constraint(specification.subject)]
+    for relation in specification.relations.all():
+        constraints.append(RelationConstraint(relation.relationtype_id,
+                                              relation.right_subject_id))
+    for attribute in specification.attributes.all():
+        constraints.append(AttributeConstraint(attribute.attributetype_id,
+                                               attribute.svalue))
+    return constraints
+
+
+def terms(nodes, seen):
+    """Return the ids of the nodes, each specification among them
+    being replaced by the nodes it matches"""
+    ids = set()
+    for node in nodes:
+        node = node.ref
+        if isinstance(node, (NodeSpecification, AttributeSpecification,
+                             RelationSpecification, Expression)):
+            ids.update(matching_ids(node, seen))
+        else:
+            ids.add(node.pk)
+    return ids
+
+
+def joined(model, subject, predicate, predicate_id, value, subjects,
+           objects=None):
+    """Return the ids of the rows of a type joining one of the subjects
+    to one of the objects, any object if objects is None. The rows are
+    looked up by the smaller side, the other side being checked
+    in memory"""
+    queryset = model.objects.filter(**{predicate: predicate_id}).order_by()
+    if objects is not None and len(objects) < len(subjects):
+        subject, value = value, subject
+        subjects, objects = objects, subjects
+    ids = set()
+    for chunk in chunks(subjects):
+        for pk, other in queryset.filter(**{
+            '%s__in' % subject: chunk}).values_list('pk', value):
+            if objects is None or other in objects:
+                ids.add(pk)
+    return ids
+
+
+def matching_ids(specification, seen=()):
+    """Return the set of the ids of the nodes matched
+    by a specification"""
+    if specification.pk in seen:
+        raise ValueError('%s is defined by itself' % specification)
+    seen = set(seen) | set([specification.pk])
+
+    if isinstance(specification, NodeSpecification):
+        return run(node_constraints(specification))
+    if isinstance(specification, AttributeSpecification):
+        subjects = terms(specification.subjects.all(), seen)
+        return joined(Attribute, 'subject', 'attributetype',
+                      specification.attributetype_id, 'svalue', subjects)
+    if isinstance(specification, RelationSpecification):
+        subjects = terms(specification.subjects.all(), seen)
+        ids = set()
+        for chunk in chunks(subjects):
+            ids.update(Relation.objects.filter(
+                relationtype=specification.relationtype_id,
+                left_subject__in=chunk).order_by().values_list(
+                'right_subject', flat=True))
+        return ids
+    if isinstance(specification, Expression):
+        return joined(Relation, 'left_subject', 'relationtype',
+                      specification.relationtype_id, 'right_subject',
+                      terms([specification.left_term], seen),
+                      terms([specification.right_term], seen))
+    raise ValueError('%r is not a specification' % specification)
+
+
+def matches(specification):
+    """Return the queryset of the nodes matched by a specification:
+    the nodes of a NodeSpecification, the attributes of an
+    AttributeSpecification, the right subjects of a
+    RelationSpecification and the relations of an Expression"""
+    return NID.objects.filter(pk__in=sorted(matching_ids(specification)))
@@ -0,0 +1,76 @@
+"""Publications of the nodes of Gstudio
+
+A nodetype or a gbobject is published on its sites while its status is
+published and the time is between its dates of start and end of
+publication. The Publication table keeps the sites where each node is
+published at the time, updated when the node or its sites are saved,
+and by the update_publications command, run regularly, as the dates of
+publication pass. The published nodes of a site are then found with an
+indexed equality on the site, instead of comparing the dates and
+joining the sites of every node."""
+from datetime import datetime
+
+from django.db.models import get_model
+
+from gstudio.models import Nodetype
+from gstudio.models import Publication
+from gstudio.managers import PUBLISHED
+
+CHUNK_SIZE = 250
+
+
+def publishable_models():
+    """Return the models of the nodes published on sites,
+    the nodetypes and the gbobjects if objectapp is installed"""
+    models = [Nodetype]
+    gbobject = get_model('objectapp', 'gbobject')
+    if gbobject is not None:
+        models.append(gbobject)
+    return models
+
+
+def is_publishable(instance):
+    """Return True if the instance is published on sites"""
+    return isinstance(instance, tuple(publishable_models()))
+
+
+def published_sites(model, pks=None, now=None):
+    """Return the set of the (nid, site) pairs of the nodes of a model,
+    or of the nodes of the pks, published at the time"""
+    queryset = model.objects.filter(status=PUBLISHED,
+                                    start_publication__lte=now,
+                                    end_publication__gt=now)
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+    return set([(pk, site) for pk, site in
+                queryset.values_list('pk', 'sites') if site])
+
+
+def update_publications(model=None, pks=None):
+    """Update the publications of the nodes of a model, of all the
+    models if None, or only of the nodes of the pks, and return the
+    numbers of the publications added and removed"""
+    now = datetime.now()
+    added = removed = 0
+    models = model and [model] or publishable_models()
+    for model in models:
+        if pks is None:
+            nids = model.objects.values('pk')
+            published = published_sites(model, now=now)
+        else:
+            nids = list(pks)
+            published = published_sites(model, nids, now)
+        rows = {}
+        for pk, nid, site in Publication.objects.filter(
+            nid__in=nids).values_list('pk', 'nid', 'site'):
+            rows[(nid, site)] = pk
+
+        for nid, site in published - set(rows):
+            Publication.objects.create(nid_id=nid, site_id=site)
+            added += 1
+        stale = [pk for key, pk in rows.items() if key not in published]
+        for i in range(0, len(stale), CHUNK_SIZE):
+            Publication.objects.filter(pk__in=stale[i:i + CHUNK_SIZE]
+                                       ).delete()
+        removed += len(stale)
+    return added, removed
@@ -0,0 +1,88 @@
+"""Registry of the relation types and attribute types of Gstudio"""
+from gstudio.cache import LocalGeneration
+from gstudio.cache import TYPES_GENERATION_KEY
+
+
+class SchemaRegistry(object):
+    """Relation types and attribute types loaded once per process
+    with their subjecttypes, reloaded when the generation counter
+    of the shared cache changes. The counter is read once per request,
+    the types of the edges being then found without a round trip"""
+
+    def __init__(self):
+        self.generation = None
+        self.types_generation = LocalGeneration(TYPES_GENERATION_KEY)
+        self._relationtypes = {}
+        self._attributetypes = {}
+
+    def load(self):
+        """Load all the types if another generation started"""
+        from gstudio.models import Relationtype
+        from gstudio.models import Attributetype
+
+        generation = self.types_generation.current()
+        if generation != self.generation:
+            self._relationtypes = dict(
+                [(relationtype.pk, relationtype) for relationtype in
+                 Relationtype.objects.select_related(
+                     'left_subjecttype', 'right_subjecttype')])
+            self._attributetypes = dict(
+                [(attributetype.pk, attributetype) for attributetype in
+                 Attributetype.objects.select_related('subjecttype')])
+            self.generation = generation
+
+    def clear(self):
+        """Forget the types loaded by the process"""
+        self.generation = None
+        self._relationtypes = {}
+        self._attributetypes = {}
+
+    @property
+    def relationtypes(self):
+        """Return a dictionary mapping ids to relation types"""
+        self.load()
+        return self._relationtypes
+
+    @property
+    def attributetypes(self):
+        """Return a dictionary mapping ids to attribute types"""
+        self.load()
+        return self._attributetypes
+
+    def relationtype(self, pk):
+        """Return a relation type, fetched if it was
+        created after the last load"""
+        from gstudio.models import Relationtype
+
+        relationtypes = self.relationtypes
+        if pk not in relationtypes:
+            relationtypes[pk] = Relationtype.objects.get(pk=pk)
+        return relationtypes[pk]
+
+    def attributetype(self, pk):
+        """Return an attribute type, fetched if it was
+        created after the last load"""
+        from gstudio.models import Attributetype
+
+        attributetypes = self.attributetypes
+        if pk not in attributetypes:
+            attributetypes[pk] = Attributetype.objects.get(pk=pk)
+        return attributetypes[pk]
+
+    def attach(self, edges):
+        """Set the types of relations and attributes from the registry,
+        so reading edge.relationtype or edge.attributetype does not
+        query the database. Return the edges as a list"""
+        edges = list(edges)
+        relationtypes = self.relationtypes
+        attributetypes = self.attributetypes
+        for edge in edges:
+            pk = getattr(edge, 'relationtype_id', None)
+            if pk in relationtypes:
+                edge._relationtype_cache = relationtypes[pk]
+            pk = getattr(edge, 'attributetype_id', None)
+            if pk in attributetypes:
+                edge._attributetype_cache = attributetypes[pk]
+        return edges
+
+registry = SchemaRegistry()
@@ -0,0 +1,125 @@
+"""Schema inherited by the types of Gstudio from their ancestors"""
+from django.db.models import Q
+
+from gstudio.models import Relation
+from gstudio.models import Attribute
+from gstudio.models import Relationtype
+from gstudio.models import Attributetype
+from gstudio.cache import schema_cache
+from gstudio.cache import schema_cache_key
+from gstudio.cache import data_generation
+from gstudio.cache import schema_generation
+from gstudio.settings import SCHEMA_CACHE_TIMEOUT
+
+# Model and subject fields of each kind of schema
+SCHEMA_KINDS = {
+    'attributetypes': (Attributetype, ('subjecttype',)),
+    'relationtypes': (Relationtype, ('left_subjecttype', 'right_subjecttype')),
+    'attributes': (Attribute, ('subject',)),
+    'relations': (Relation, ('left_subject', 'right_subject')),
+    }
+
+# Kinds of schema made of the instances of the types, cached
+# in their own generation so that their writes leave the schemas valid
+DATA_KINDS = ('attributes', 'relations')
+
+
+def ancestor_ids(node):
+    """Return the ids of a type and of its ancestors from the root
+    down, read from its MPTT interval in one query"""
+    return [node.pk] + list(node.get_ancestors().values_list('id', flat=True))
+
+
+def kind_generation(kind):
+    """Return the current generation of a kind of schema"""
+    if kind in DATA_KINDS:
+        return data_generation()
+    return schema_generation()
+
+
+def schema_items(kind, id_list):
+    """Return the items of a kind of schema whose subjects
+    are in id_list, in one query"""
+    model, fields = SCHEMA_KINDS[kind]
+    query = Q()
+    for field in fields:
+        query |= Q(**{'%s__in' % field: id_list})
+    return list(model.objects.filter(query))
+
+
+def inherited_schema(node, kind):
+    """Return the ids of a type and of its ancestors with the items of
+    a kind of schema linked to them, cached per type"""
+    key = schema_cache_key(kind, node.pk, kind_generation(kind))
+    schema = schema_cache.get(key)
+    if schema is None:
+        ids = ancestor_ids(node)
+        schema = (ids, schema_items(kind, ids))
+        schema_cache.set(key, schema, SCHEMA_CACHE_TIMEOUT)
+    return schema
+
+
+def types_schema(nodes, kind):
+    """Return the ids of many types and of their ancestors
+    with the items of a kind of schema linked to them"""
+    nodes = list(nodes)
+    generation = kind_generation(kind)
+    keys = dict([(node.pk, schema_cache_key(kind, node.pk, generation))
+                 for node in nodes])
+    cached = schema_cache.get_many(keys.values())
+
+    ids = set()
+    items = {}
+    for node in nodes:
+        node_ids, node_items = cached.get(keys[node.pk]) or \
+                               inherited_schema(node, kind)
+        ids.update(node_ids)
+        for item in node_items:
+            items[item.pk] = item
+    return ids, sorted(items.values(), key=lambda item: item.pk)
+
+
+def ancestors_schema(node, kind):
+    """Return the items of a kind of schema linked to the strict
+    ancestors of a type, ordered by the tree level of their
+    ancestor, then by title"""
+    ids, items = inherited_schema(node, kind)
+    levels = dict([(pk, level) for level, pk in enumerate(ids[1:])])
+    model, fields = SCHEMA_KINDS[kind]
+
+    def level_and_title(item):
+        return (min([levels.get(getattr(item, '%s_id' % field), len(levels))
+                     for field in fields]), item.title)
+    return sorted(subject_items(kind, items, set(levels)),
+                  key=level_and_title)
+
+
+def subject_items(kind, items, ids):
+    """Filter the items of a kind of schema linked to the ids"""
+    model, fields = SCHEMA_KINDS[kind]
+    return [item for item in items if
+            [field for field in fields
+             if getattr(item, '%s_id' % field) in ids]]
+
+
+def roles(kind, items, ids):
+    """Split the relation types or the relations linked to the ids
+    in the roles the ids can play"""
+    model, (left, right) = SCHEMA_KINDS[kind]
+    return {'possible_leftroles':
+            [item for item in items if getattr(item, '%s_id' % right) in ids],
+            'possible_rightroles':
+            [item for item in items if getattr(item, '%s_id' % left) in ids]}
+
+
+def ancestors_roles(node, kind):
+    """Return the roles possible for a type
+    through its strict ancestors"""
+    ids, items = inherited_schema(node, kind)
+    return roles(kind, items, set(ids[1:]))
+
+
+def gbobject_schema(gbobject, kind):
+    """Return the items of a kind of schema linked to
+    the objecttypes of an object and to their ancestors"""
+    return types_schema(gbobject.objecttypes.all(), kind)
@@ -1,4 +1,10 @@
-"""Search module with complex query parsing for Gstudio"""
+"""Search module with complex query parsing for Gstudio
+
+The words searched are looked up in the full-text index, each term
+compiled into an indexed lookup on its postings, and the nodetypes
+found ranked by their BM25 score for the terms. The phrases and the
+words with punctuation are still matched in the texts, among the
+nodetypes having their terms."""
 from pyparsing import Word
 from pyparsing import alphas
 from pyparsing import WordEnd
@@ -15,13 +21,75 @@ from pyparsing import CaselessLiteral
 from pyparsing import operatorPrecedence
 
 from django.db.models import Q
+from django.utils.encoding import force_unicode
 
 from gstudio.models import Nodetype
+from gstudio.fulltext import WORD
+from gstudio.fulltext import rank
+from gstudio.fulltext import tokenize
+from gstudio.fulltext import term_nodes
+from gstudio.fulltext import any_term_nodes
 from gstudio.settings import STOP_WORDS
 
 
-def createQ(token):
-    """Creates the Q() object"""
+class SearchQuery(object):
+    """Q() object of a search and the terms ranking its results,
+    neutral in a union if the Q() object is None"""
+
+    def __init__(self, q=None, terms=()):
+        self.q = q
+        self.terms = tuple(terms)
+
+    def __and__(self, other):
+        if self.q is None:
+            return other
+        if other.q is None:
+            return self
+        return SearchQuery(self.q & other.q, self.terms + other.terms)
+
+    def __or__(self, other):
+        if self.q is None:
+            return other
+        if other.q is None:
+            return self
+        return SearchQuery(self.q | other.q, self.terms + other.terms)
+
+    def __invert__(self):
+        if self.q is None:
+            return self
+        return SearchQuery(~self.q)
+
+
+def scan_query(search):
+    """Return the Q() object matching a search in the texts"""
+    return Q(content__icontains=search) | \
+           Q(excerpt__icontains=search) | \
+           Q(title__icontains=search)
+
+
+def text_query(search, wildcards=None):
+    """Return the SearchQuery of the nodetypes whose texts have the
+    terms of a search, matched in the texts if it is not only terms"""
+    terms = tokenize(search)
+    words = [force_unicode(search).lower()]
+    scan = scan_query(search)
+    if not terms:
+        return SearchQuery(scan)
+    if wildcards:
+        if terms == words:
+            return SearchQuery(Q(pk__in=term_nodes(terms[0], wildcards)))
+        return SearchQuery(scan)
+
+    query = Q()
+    for term in terms:
+        query &= Q(pk__in=term_nodes(term))
+    if terms != words:
+        query &= scan
+    return SearchQuery(query, terms)
+
+
+def createQuery(token):
+    """Creates the SearchQuery object"""
     meta = getattr(token, 'meta', None)
     query = getattr(token, 'query', '')
     wildcards = None
@@ -45,13 +113,15 @@ def createQ(token):
     # Ignore connective words (of, a, an...) and STOP_WORDS
     if (len(search) < 3 and not search.isdigit()) or \
            search in STOP_WORDS:
-        return Q()
+        return SearchQuery()
 
     if not meta:
-        return Q(content__icontains=search) | \
-               Q(excerpt__icontains=search) | \
-               Q(title__icontains=search)
+        return text_query(search, wildcards)
+    return SearchQuery(createQ(meta, search, wildcards))
 
+
+def createQ(meta, search, wildcards):
+    """Creates the Q() object of a meta term"""
     if meta == 'metatype':
         if wildcards == 'BOTH':
             return Q(metatypes__title__icontains=search) | \
@@ -78,15 +148,15 @@ def createQ(token):
         return Q(tags__icontains=search)
 
 
-def unionQ(token):
-    """Appends all the Q() objects"""
-    query = Q()
+def unionQuery(token):
+    """Appends all the SearchQuery objects"""
+    query = SearchQuery()
     operation = 'and'
     negation = False
 
     for t in token:
         if type(t) is ParseResults:  # See tokens recursively
-            query &= unionQ(t)
+            query &= unionQuery(t)
         else:
             if t in ('or', 'and'):  # Set the new op and go to next token
                 operation = t
@@ -114,20 +184,43 @@ OPER_NOT = '-'
 TERM = Combine(Optional(Word(alphas).setResultsName('meta') + ':') +
                (QUOTED.setResultsName('query') |
                 WILDCARDS.setResultsName('query')))
-TERM.setParseAction(createQ)
+TERM.setParseAction(createQuery)
 
 EXPRESSION = operatorPrecedence(TERM, [
     (OPER_NOT, 1, opAssoc.RIGHT),
     (OPER_OR, 2, opAssoc.LEFT),
     (Optional(OPER_AND, default='and'), 2, opAssoc.LEFT)])
-EXPRESSION.setParseAction(unionQ)
+EXPRESSION.setParseAction(unionQuery)
 
 QUERY = OneOrMore(EXPRESSION) + StringEnd()
-QUERY.setParseAction(unionQ)
-
-
-def advanced_search(pattern):
-    """Parse the grammar of a pattern
-    and build a queryset with it"""
-    query_parsed = QUERY.parseString(pattern)
-    return Nodetype.published.filter(query_parsed[0]).distinct()
+QUERY.setParseAction(unionQuery)
+
+
+def advanced_search(pattern, queryset=None):
+    """Parse the grammar of a pattern and build a queryset with it,
+    among the published nodetypes by default"""
+    query = QUERY.parseString(pattern)[0]
+    if queryset is None:
+        queryset = Nodetype.published.all()
+    if query.q is not None:
+        queryset = queryset.filter(query.q)
+    return rank(queryset.distinct(), query.terms)
+
+
+def basic_search(pattern, queryset=None):
+    """Build a queryset of the nodetypes having any of the terms of
+    a pattern, among the published nodetypes by default. The short
+    words and the stop words are left out, only the parts of the
+    pattern without any word being matched in the texts"""
+    terms = sorted(set(tokenize(pattern)))
+    query = SearchQuery()
+    if terms:
+        query |= SearchQuery(Q(pk__in=any_term_nodes(terms)), terms)
+    for part in pattern.split():
+        if WORD.search(part) is None:
+            query |= SearchQuery(scan_query(part))
+    if queryset is None:
+        queryset = Nodetype.published.all()
+    if query.q is not None:
+        queryset = queryset.filter(query.q)
+    return rank(queryset, query.terms)
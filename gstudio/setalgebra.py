@@ -0,0 +1,166 @@
+"""Members of the class expressions of Gstudio
+
+The members of a nodetype are the gbobjects of the nodetype or of its
+subtypes. The members of the Union, Intersection and Complement
+classes, and of the expressions nesting them, are computed with
+bitsets: Python integers whose bit n is set when the NID n is a member.
+The bitsets of the nodetypes are cached, by chunks of hexadecimal digits
+fitting in the entries of memcached, until the members of the nodetype
+change. The bitsets of the expressions are combined from them."""
+from operator import or_
+from operator import and_
+
+from django.db.models import Q
+from django.db.models import get_model
+
+from gstudio.models import Union
+from gstudio.models import Nodetype
+from gstudio.models import Complement
+from gstudio.models import Intersection
+from gstudio.cache import schema_cache
+from gstudio.cache import ALL_MEMBERS
+from gstudio.cache import members_cache_key
+from gstudio.settings import SCHEMA_CACHE_TIMEOUT
+
+UNION = 'union'
+INTERSECTION = 'intersection'
+COMPLEMENT = 'complement'
+OPERATORS = {Union: UNION, Intersection: INTERSECTION,
+             Complement: COMPLEMENT}
+HEX_BITS = dict([('%x' % digit, [bit for bit in range(4)
+                                 if digit >> bit & 1])
+                 for digit in range(16)])
+CHUNK_DIGITS = 500000
+
+
+def bitset(ids):
+    """Return the bitset of the ids, built from its hexadecimal
+    digits in a time linear in the largest id"""
+    ids = list(ids)
+    if not ids:
+        return 0
+    digits = [0] * (max(ids) // 4 + 1)
+    for nid in ids:
+        digits[nid >> 2] |= 1 << (nid & 3)
+    return int(''.join(['%x' % digit for digit in reversed(digits)]), 16)
+
+
+def bitset_ids(bits):
+    """Return the sorted list of the ids of a bitset"""
+    ids = []
+    for position, digit in enumerate(reversed('%x' % bits)):
+        for bit in HEX_BITS[digit]:
+            ids.append(position * 4 + bit)
+    return ids
+
+
+def bitset_count(bits):
+    """Return the number of ids of a bitset"""
+    return sum([len(HEX_BITS[digit]) for digit in '%x' % bits])
+
+
+def membership():
+    """Return the through model of the objecttypes of the gbobjects
+    with the names of its gbobject and nodetype fields, None
+    without objectapp"""
+    gbobject = get_model('objectapp', 'gbobject')
+    if gbobject is None:
+        return None
+    field = gbobject._meta.get_field('objecttypes')
+    return (field.rel.through, field.m2m_field_name(),
+            field.m2m_reverse_field_name())
+
+
+def cached_bitset(kind, pk, compute):
+    """Return a bitset from the cache, computed and cached on miss.
+    The hexadecimal digits of the bitset are cached by chunks of
+    CHUNK_DIGITS under the key of the bitset followed by the number
+    of the chunk, the key of the bitset holding the number of chunks"""
+    key = members_cache_key(kind, pk)
+    count = schema_cache.get(key)
+    if count is not None:
+        keys = ['%s:%i' % (key, i) for i in range(count)]
+        chunks = schema_cache.get_many(keys)
+        if len(chunks) == count:
+            return int(''.join([chunks[chunk] for chunk in keys]), 16)
+
+    bits = compute()
+    digits = '%x' % bits
+    data = {}
+    for i in range(0, len(digits), CHUNK_DIGITS):
+        data['%s:%i' % (key, i // CHUNK_DIGITS)] = digits[i:i + CHUNK_DIGITS]
+    schema_cache.set_many(data, SCHEMA_CACHE_TIMEOUT)
+    schema_cache.set(key, len(data), SCHEMA_CACHE_TIMEOUT)
+    return bits
+
+
+def member_types(pks):
+    """Return the ids of the nodetypes whose members include the
+    gbobjects of the nodetypes pks: these and their ancestors"""
+    nodetypes = Nodetype.objects.filter(pk__in=list(pks)).values_list(
+        'tree_id', 'lft', 'rght')
+    if not nodetypes:
+        return []
+    return Nodetype.objects.filter(reduce(or_, [
+        Q(tree_id=tree_id, lft__lte=lft, rght__gte=rght)
+        for tree_id, lft, rght in nodetypes])).values_list('pk', flat=True)
+
+
+def universe():
+    """Return the bitset of all the gbobjects"""
+    def compute():
+        gbobject = get_model('objectapp', 'gbobject')
+        if gbobject is None:
+            return 0
+        return bitset(gbobject.objects.values_list('pk', flat=True))
+    return cached_bitset('universe', ALL_MEMBERS, compute)
+
+
+def nodetype_bitset(nodetype):
+    """Return the bitset of the gbobjects of a nodetype
+    or of its subtypes"""
+    def compute():
+        through = membership()
+        if through is None:
+            return 0
+        through, gbobject_field, nodetype_field = through
+        subtypes = nodetype.get_descendants(include_self=True).values('pk')
+        return bitset(through.objects.filter(
+            **{'%s__in' % nodetype_field: subtypes}).values_list(
+            gbobject_field, flat=True))
+    return cached_bitset('nodetype', nodetype.pk, compute)
+
+
+def combine(operator, bitsets):
+    """Apply a set operator to a list of bitsets, the complement
+    being taken from the union of the bitsets"""
+    if operator == UNION:
+        return reduce(or_, bitsets, 0)
+    if operator == INTERSECTION:
+        return bitsets and reduce(and_, bitsets) or 0
+    if operator == COMPLEMENT:
+        return universe() & ~reduce(or_, bitsets, 0)
+    raise ValueError('Unknown set operator %s' % operator)
+
+
+def evaluate(expression):
+    """Return the bitset of the members of a class expression:
+    a nodetype, a Union, an Intersection or a Complement, or a
+    (operator, operand, ...) tuple nesting class expressions"""
+    if isinstance(expression, tuple):
+        return combine(expression[0], [evaluate(operand)
+                                       for operand in expression[1:]])
+    if isinstance(expression, Nodetype):
+        return nodetype_bitset(expression)
+    operator = OPERATORS.get(expression.__class__)
+    if operator is None:
+        raise ValueError('%r is not a class expression' % expression)
+    return combine(operator, [nodetype_bitset(nodetype)
+                              for nodetype in expression.nodetypes.all()])
+
+
+def members(expression):
+    """Return the queryset of the gbobjects members
+    of a class expression"""
+    gbobject = get_model('objectapp', 'gbobject')
+    return gbobject.objects.filter(pk__in=bitset_ids(evaluate(expression)))
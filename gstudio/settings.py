@@ -1,4 +1,7 @@
 """Settings of Gstudio"""
+import os
+import tempfile
+
 from django.conf import settings
 
 PING_DIRECTORIES = getattr(settings, 'GSTUDIO_PING_DIRECTORIES',
@@ -78,6 +81,45 @@ STOP_WORDS = getattr(settings, 'GSTUDIO_STOP_WORDS',
                       'what', 'when', 'where', 'which', 'while', 'who', 'whom',
                       'why', 'will', 'with', 'would', 'yet', 'you', 'your'))
 
+NBH_BULK_MAX_NODES = getattr(settings, 'GSTUDIO_NBH_BULK_MAX_NODES', 500)
+
+NBH_CACHE_BACKEND = getattr(settings, 'GSTUDIO_NBH_CACHE_BACKEND', 'default')
+NBH_CACHE_TIMEOUT = getattr(settings, 'GSTUDIO_NBH_CACHE_TIMEOUT',
+                            60 * 60 * 24 * 30)
+
+SCHEMA_CACHE_BACKEND = getattr(settings, 'GSTUDIO_SCHEMA_CACHE_BACKEND',
+                               'default')
+SCHEMA_CACHE_TIMEOUT = getattr(settings, 'GSTUDIO_SCHEMA_CACHE_TIMEOUT',
+                               60 * 60 * 24)
+GENERATION_CHECK_INTERVAL = getattr(
+    settings, 'GSTUDIO_GENERATION_CHECK_INTERVAL', 5)
+STATISTICS_CACHE_TIMEOUT = getattr(
+    settings, 'GSTUDIO_STATISTICS_CACHE_TIMEOUT', 60 * 5)
+
+GRAPH_SNAPSHOT_DIR = getattr(settings, 'GSTUDIO_GRAPH_SNAPSHOT_DIR',
+                             os.path.join(tempfile.gettempdir(),
+                                          'gstudio_graph'))
+
+GRAPH_CHANGES_WINDOW = getattr(settings, 'GSTUDIO_GRAPH_CHANGES_WINDOW', 300)
+
+EGONET_RADIUS = getattr(settings, 'GSTUDIO_EGONET_RADIUS', 2)
+EGONET_MAX_RADIUS = getattr(settings, 'GSTUDIO_EGONET_MAX_RADIUS', 3)
+EGONET_MAX_NODES = getattr(settings, 'GSTUDIO_EGONET_MAX_NODES', 300)
+
+GRAPH_PAGE_SIZE = getattr(settings, 'GSTUDIO_GRAPH_PAGE_SIZE', 100)
+GRAPH_MAX_PAGE_SIZE = getattr(settings, 'GSTUDIO_GRAPH_MAX_PAGE_SIZE', 1000)
+
+PAGERANK_DAMPING = getattr(settings, 'GSTUDIO_PAGERANK_DAMPING', 0.85)
+BETWEENNESS_SAMPLES = getattr(settings, 'GSTUDIO_BETWEENNESS_SAMPLES', 100)
+
+GNOWQL_PLAN_CACHE_SIZE = getattr(settings, 'GSTUDIO_GNOWQL_PLAN_CACHE_SIZE',
+                                 100)
+NAME_CACHE_SIZE = getattr(settings, 'GSTUDIO_NAME_CACHE_SIZE', 10000)
+
+FACET_VALUES = getattr(settings, 'GSTUDIO_FACET_VALUES', 20)
+CLUSTER_FILTER_CHOICES = getattr(settings, 'GSTUDIO_CLUSTER_FILTER_CHOICES',
+                                 20)
+
 TWITTER_CONSUMER_KEY = getattr(settings, 'TWITTER_CONSUMER_KEY', '')
 TWITTER_CONSUMER_SECRET = getattr(settings, 'TWITTER_CONSUMER_SECRET', '')
 TWITTER_ACCESS_KEY = getattr(settings, 'TWITTER_ACCESS_KEY', '')
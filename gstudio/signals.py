@@ -2,7 +2,12 @@
 import inspect
 from functools import wraps
 
+from django.core.signals import request_started
+from django.db.models.signals import pre_save
 from django.db.models.signals import post_save
+from django.db.models.signals import pre_delete
+from django.db.models.signals import post_delete
+from django.db.models.signals import m2m_changed
 
 from gstudio import settings
 
@@ -45,11 +50,627 @@ def ping_external_urls_handler(sender, **kwargs):
         ExternalUrlsPinger(nodetype)
 
 
-def disconnect_gstudio_signals():
-    """Disconnect all the signals provided by Gstudio"""
+NBH_EDGE_FIELDS = ('parent', 'subject', 'subjecttype',
+                   'left_subject', 'right_subject',
+                   'left_subjecttype', 'right_subjecttype')
+
+
+TRACKED_FIELDS = NBH_EDGE_FIELDS + ('relationtype',)
+
+INFERENCE_FLAGS = ('is_symmetrical', 'is_reflexive', 'is_transitive')
+
+VALUE_FIELDS = ('dataType',)
+
+PATH_FIELDS = ('tree_path',)
+
+NAME_FIELDS = ('title', 'slug', 'inverse')
+
+
+def nbh_edge_fields(instance):
+    """Return the foreign keys of a node linking it to its neighbours"""
+    return [field for field in NBH_EDGE_FIELDS
+            if hasattr(instance, '%s_id' % field)]
+
+
+def previous_fields_pre_save_handler(sender, **kwargs):
+    """Remember the foreign keys of a node before it is saved, with the
+    flags of a relation type, the caches, the graph and the inferred
+    relations depending on them change with the save"""
+    from gstudio.models import NID
+
+    instance = kwargs['instance']
+    if not isinstance(instance, NID) or instance.pk is None:
+        return
+
+    fields = [field for field in TRACKED_FIELDS
+              if hasattr(instance, '%s_id' % field)] + \
+             [field for field in INFERENCE_FLAGS + VALUE_FIELDS + PATH_FIELDS +
+              NAME_FIELDS if hasattr(instance, field)]
+    if fields:
+        instance._previous_fields = {}
+        for row in instance.__class__._default_manager.filter(
+            pk=instance.pk).values_list(*fields):
+            instance._previous_fields = dict(zip(fields, row))
+
+
+def expire_generations_handler(sender, **kwargs):
+    """Read again the generations of the shared cache
+    at the start of a request"""
+    from gstudio.cache import expire_local_generations
+
+    expire_local_generations()
+
+
+def invalidate_nbh_handler(sender, **kwargs):
+    """Invalidate the cached neighbourhoods affected
+    by the saving or the deletion of a node or an edge,
+    and those of all its neighbours if it is renamed"""
+    from gstudio.models import NID
+    from gstudio.cache import invalidate_nbhs
+
+    instance = kwargs['instance']
+    if not isinstance(instance, NID):
+        return
+
+    previous = getattr(instance, '_previous_fields', {})
+    nids = [instance.pk]
+    for field in nbh_edge_fields(instance):
+        nids.append(previous.get(field))
+        nids.append(getattr(instance, '%s_id' % field))
+    renamed = [field for field in NAME_FIELDS if field in previous and
+               previous[field] != getattr(instance, field)]
+    invalidate_nbhs(nids, cascade=bool(renamed))
+
+
+def invalidate_nbh_pre_delete_handler(sender, **kwargs):
+    """Invalidate the cached neighbourhoods of the neighbours of a
+    node about to be deleted, while its edges are still stored"""
+    from gstudio.models import NID
+    from gstudio.cache import invalidate_nbhs
+
+    instance = kwargs['instance']
+    if isinstance(instance, NID):
+        invalidate_nbhs([instance.pk], cascade=True)
+
+
+def invalidate_nbh_m2m_handler(sender, **kwargs):
+    """Invalidate the cached neighbourhoods of both ends
+    of the many to many rows being changed"""
+    from gstudio.models import NID
+    from gstudio.cache import invalidate_nbhs
+
+    instance = kwargs['instance']
+    if not isinstance(instance, NID):
+        return
+
+    action = kwargs['action']
+    if action in ('post_add', 'post_remove'):
+        nids = [instance.pk]
+        if issubclass(kwargs['model'], NID):
+            nids.extend(kwargs['pk_set'])
+        invalidate_nbhs(nids)
+    elif action == 'pre_clear':
+        invalidate_nbhs([instance.pk], cascade=True)
+
+
+def invalidate_schema_handler(sender, **kwargs):
+    """Invalidate the cached schemas and the registries of types when
+    a relation type or an attribute type changes, the cached
+    attributes and relations of the types when an attribute or a
+    relation changes, and both when a type is moved or deleted"""
+    from gstudio.models import Metatype
+    from gstudio.models import Nodetype
+    from gstudio.models import Relation
+    from gstudio.models import Attribute
+    from gstudio.models import Relationtype
+    from gstudio.models import Attributetype
+    from gstudio.cache import invalidate_data
+    from gstudio.cache import invalidate_types
+    from gstudio.cache import invalidate_schemas
+
+    instance = kwargs['instance']
+    if isinstance(instance, (Attributetype, Relationtype)):
+        invalidate_types()
+        invalidate_schemas()
+    elif isinstance(instance, (Attribute, Relation)):
+        invalidate_data()
+    elif isinstance(instance, (Metatype, Nodetype)):
+        previous = getattr(instance, '_previous_fields', {})
+        if 'created' not in kwargs or ('parent' in previous and
+                                       previous['parent'] != instance.parent_id):
+            invalidate_schemas()
+            invalidate_data()
+
+
+def members_pre_delete_handler(sender, **kwargs):
+    """Record the types of a gbobject about to be deleted,
+    whose rows are deleted with it"""
+    from django.db.models import get_model
+
+    instance = kwargs['instance']
+    gbobject = get_model('objectapp', 'gbobject')
+    if gbobject is not None and isinstance(instance, gbobject):
+        instance._member_of = list(instance.objecttypes.values_list(
+            'pk', flat=True))
+
+
+def invalidate_members_handler(sender, **kwargs):
+    """Invalidate the cached members of the types of a gbobject created
+    or deleted, or of all the classes when a nodetype is moved
+    or deleted"""
+    from django.db.models import get_model
+    from gstudio.models import Nodetype
+    from gstudio.cache import ALL_MEMBERS
+    from gstudio.cache import invalidate_members
+    from gstudio.setalgebra import member_types
+
+    instance = kwargs['instance']
+    deleted = 'created' not in kwargs
+    gbobject = get_model('objectapp', 'gbobject')
+    if gbobject is not None and isinstance(instance, gbobject):
+        if deleted:
+            invalidate_members([ALL_MEMBERS] + list(member_types(
+                getattr(instance, '_member_of', []))))
+        elif kwargs['created']:
+            invalidate_members([ALL_MEMBERS])
+    elif isinstance(instance, Nodetype):
+        previous = getattr(instance, '_previous_fields', {})
+        if deleted or ('parent' in previous and
+                       previous['parent'] != instance.parent_id):
+            invalidate_members()
+
+
+def invalidate_members_m2m_handler(sender, **kwargs):
+    """Invalidate the cached members of the types
+    added to or removed from a gbobject"""
+    from gstudio.cache import invalidate_members
+    from gstudio.setalgebra import member_types
+
+    instance = kwargs['instance']
+    action = kwargs['action']
+    if kwargs['reverse']:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_members(member_types([instance.pk]))
+    elif action == 'pre_clear':
+        instance._cleared_member_of = list(
+            instance.objecttypes.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        invalidate_members(member_types(
+            getattr(instance, '_cleared_member_of', [])))
+    elif action in ('post_add', 'post_remove'):
+        invalidate_members(member_types(kwargs['pk_set']))
+
+
+def invalidate_facets_handler(sender, **kwargs):
+    """Invalidate the cached facets of the types of the nodes of an
+    attribute or a relation saved or deleted, and of their ancestors"""
+    from gstudio.models import Relation
+    from gstudio.models import Attribute
+    from gstudio.cache import invalidate_facets
+    from gstudio.facets import facet_types
+
+    instance = kwargs['instance']
+    if isinstance(instance, Attribute):
+        fields = ('subject',)
+    elif isinstance(instance, Relation):
+        fields = ('left_subject', 'right_subject')
+    else:
+        return
+
+    previous = getattr(instance, '_previous_fields', {})
+    nids = set()
+    for field in fields:
+        nids.add(getattr(instance, '%s_id' % field))
+        nids.add(previous.get(field))
+    nids.discard(None)
+    invalidate_facets(facet_types(nids))
+
+
+def graph_post_save_handler(sender, **kwargs):
+    """Log the edges of the graph added or removed
+    by the saving of a relation or the moving of a type"""
+    from gstudio.models import NID
+    from gstudio.models import Relation
+    from gstudio.models import GraphChange
+
+    instance = kwargs['instance']
+    if not isinstance(instance, NID):
+        return
+
+    previous = getattr(instance, '_previous_fields', {})
+    changes = []
+    if isinstance(instance, Relation):
+        edge = (instance.left_subject_id, instance.relationtype_id,
+                instance.right_subject_id)
+        old = previous and (previous['left_subject'],
+                            previous['relationtype'],
+                            previous['right_subject'])
+        if old != edge:
+            if old:
+                changes.append(old + (False,))
+            changes.append(edge + (True,))
+    if hasattr(instance, 'parent_id'):
+        old = previous.get('parent')
+        if old != instance.parent_id:
+            if old:
+                changes.append((instance.pk, GraphChange.PARENT, old, False))
+            if instance.parent_id:
+                changes.append((instance.pk, GraphChange.PARENT,
+                                instance.parent_id, True))
+    GraphChange.objects.log(changes)
+
+
+def graph_post_delete_handler(sender, **kwargs):
+    """Log the removal of a node, with its edge if it is a relation"""
+    from gstudio.models import NID
+    from gstudio.models import Relation
+    from gstudio.models import GraphChange
+    from gstudio.managers import nodemodel_label
+
+    instance = kwargs['instance']
+    if not isinstance(instance, NID) or \
+           instance.nodemodel != nodemodel_label(instance.__class__):
+        return
+
+    changes = [(instance.pk, GraphChange.NODE, instance.pk, False)]
+    if isinstance(instance, Relation):
+        changes.append((instance.left_subject_id, instance.relationtype_id,
+                        instance.right_subject_id, False))
+    GraphChange.objects.log(changes)
+
+
+def graph_m2m_handler(sender, field, edgetype, **kwargs):
+    """Log the edges added or removed through a symmetrical
+    many to many field of the nodes, like prior_nodes"""
+    from gstudio.models import GraphChange
+
+    instance = kwargs['instance']
+    action = kwargs['action']
+    if action in ('post_add', 'post_remove'):
+        pk_set = kwargs['pk_set']
+        added = action == 'post_add'
+    elif action == 'pre_clear':
+        pk_set = getattr(instance, field).values_list('pk', flat=True)
+        added = False
+    else:
+        return
+
+    changes = []
+    for pk in pk_set:
+        changes.append((instance.pk, edgetype, pk, added))
+        changes.append((pk, edgetype, instance.pk, added))
+    GraphChange.objects.log(changes)
+
+
+def inference_relationtype(relationtype_id):
+    """Return the relation type of a relation for the inference,
+    None if it was deleted with the relation"""
+    from gstudio.models import Relationtype
+    from gstudio.registry import registry
+
+    try:
+        return registry.relationtype(relationtype_id)
+    except Relationtype.DoesNotExist:
+        return None
+
+
+def inference_post_save_handler(sender, **kwargs):
+    """Update the inferred relations with a saved relation,
+    or all the relations of a relation type whose flags changed"""
+    from gstudio.models import Relation
+    from gstudio.models import Relationtype
+    from gstudio.inference import rebuild
+    from gstudio.inference import add_relation
+    from gstudio.inference import remove_relation
+
+    instance = kwargs['instance']
+    previous = getattr(instance, '_previous_fields', {})
+    if isinstance(instance, Relation):
+        edge = (instance.left_subject_id, instance.relationtype_id,
+                instance.right_subject_id)
+        old = previous and (previous['left_subject'],
+                            previous['relationtype'],
+                            previous['right_subject'])
+        if old == edge:
+            return
+        if old:
+            relationtype = inference_relationtype(old[1])
+            if relationtype is not None:
+                remove_relation(relationtype, old[0], old[2])
+        add_relation(inference_relationtype(edge[1]), edge[0], edge[2])
+    elif isinstance(instance, Relationtype) and previous:
+        if [previous[flag] for flag in INFERENCE_FLAGS] != \
+               [getattr(instance, flag) for flag in INFERENCE_FLAGS]:
+            rebuild(instance)
+
+
+def inference_post_delete_handler(sender, **kwargs):
+    """Remove a deleted relation from the inferred relations,
+    or all the inferred relations of a deleted relation type"""
+    from gstudio.models import Relation
+    from gstudio.models import Relationtype
+    from gstudio.models import InferredRelation
+    from gstudio.inference import remove_relation
+
+    instance = kwargs['instance']
+    if isinstance(instance, Relation):
+        relationtype = inference_relationtype(instance.relationtype_id)
+        if relationtype is not None:
+            remove_relation(relationtype, instance.left_subject_id,
+                            instance.right_subject_id)
+    elif isinstance(instance, Relationtype):
+        InferredRelation.objects.filter(relationtype=instance.pk).delete()
+
+
+def dependency_pairs(node, field, pks):
+    """Return the (node, prior) dependencies made by linking pks
+    to the node through field, prior_nodes or posterior_nodes"""
+    if field == 'prior_nodes':
+        return [(node, pk) for pk in pks]
+    return [(pk, node) for pk in pks]
+
+
+def dependency_m2m_handler(sender, field, **kwargs):
+    """Record the direction of the links made through the symmetrical
+    prior_nodes and posterior_nodes fields, from the node whose field
+    was edited, and update the dependency graph with it"""
+    from gstudio.models import Dependency
+    from gstudio.dependencies import dependencies
+
+    instance = kwargs['instance']
+    action = kwargs['action']
+    if action == 'post_add':
+        dependencies.update(added=Dependency.objects.add(
+            dependency_pairs(instance.pk, field, kwargs['pk_set'])))
+        return
+    if action == 'pre_clear':
+        instance._cleared_dependencies = list(
+            getattr(instance, field).values_list('pk', flat=True))
+        return
+    if action == 'post_remove':
+        pk_set = kwargs['pk_set']
+    elif action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_dependencies', [])
+    else:
+        return
+
+    # The pairs still linked through the other field stay dependent
+    if field == 'prior_nodes':
+        other = 'posterior_nodes'
+    else:
+        other = 'prior_nodes'
+    linked = set(getattr(instance, other).filter(
+        pk__in=pk_set).values_list('pk', flat=True))
+    unlinked = [pk for pk in pk_set if pk not in linked]
+    dependencies.update(removed=Dependency.objects.remove(
+        dependency_pairs(instance.pk, 'prior_nodes', unlinked) +
+        dependency_pairs(instance.pk, 'posterior_nodes', unlinked)))
+
+
+def dependency_post_delete_handler(sender, **kwargs):
+    """Remove the dependencies of a deleted node"""
+    from django.db.models import Q
+    from gstudio.models import NID
+    from gstudio.models import Dependency
+    from gstudio.managers import nodemodel_label
+    from gstudio.dependencies import dependencies
+
+    instance = kwargs['instance']
+    if not isinstance(instance, NID) or \
+           instance.nodemodel != nodemodel_label(instance.__class__):
+        return
+
+    queryset = Dependency.objects.filter(Q(node=instance.pk) |
+                                         Q(prior=instance.pk))
+    removed = set(queryset.values_list('node', 'prior'))
+    if removed:
+        queryset.delete()
+        dependencies.update(removed=removed)
+
+
+def name_index_post_save_handler(sender, **kwargs):
+    """Index the names of a node saved"""
+    from gstudio.models import NID
+    from gstudio.managers import nodemodel_label
+    from gstudio.names import names
+
+    instance = kwargs['instance']
+    if isinstance(instance, NID) and \
+           instance.nodemodel == nodemodel_label(instance.__class__):
+        names.update(instance)
+
+
+def name_index_post_delete_handler(sender, **kwargs):
+    """Remove the names of a deleted node"""
+    from gstudio.models import NID
+    from gstudio.managers import nodemodel_label
+    from gstudio.names import names
+
+    instance = kwargs['instance']
+    if isinstance(instance, NID) and \
+           instance.nodemodel == nodemodel_label(instance.__class__):
+        names.remove(instance.pk)
+
+
+def attribute_value_post_save_handler(sender, **kwargs):
+    """Store the typed value of an attribute saved, and again the
+    values of the attributes of an attribute type whose datatype
+    changed"""
+    from gstudio.models import NID
+    from gstudio.models import Attribute
+    from gstudio.models import Attributetype
+    from gstudio.managers import nodemodel_label
+    from gstudio.values import index_attribute
+    from gstudio.values import reindex_attributetype
+
+    instance = kwargs['instance']
+    if not isinstance(instance, NID) or \
+           instance.nodemodel != nodemodel_label(instance.__class__):
+        return
+    if isinstance(instance, Attribute):
+        index_attribute(instance)
+    elif isinstance(instance, Attributetype):
+        previous = getattr(instance, '_previous_fields', {})
+        if 'dataType' in previous and \
+               previous['dataType'] != instance.dataType:
+            reindex_attributetype(instance.pk)
+
+
+def attribute_value_post_delete_handler(sender, **kwargs):
+    """Remove the typed value of a deleted attribute"""
+    from gstudio.models import Attribute
+    from gstudio.managers import nodemodel_label
+    from gstudio.values import unindex_attribute
+
+    instance = kwargs['instance']
+    if isinstance(instance, Attribute) and \
+           instance.nodemodel == nodemodel_label(instance.__class__):
+        unindex_attribute(instance.pk)
+
+
+def tree_path_pre_save_handler(sender, **kwargs):
+    """Compute the tree path of a metatype or a nodetype saved,
+    checking that it fits with the paths of its descendants"""
+    from gstudio.models import Metatype
+    from gstudio.models import Nodetype
+    from gstudio.paths import tree_path_of
+    from gstudio.paths import check_tree_path
+
+    instance = kwargs['instance']
+    if isinstance(instance, (Metatype, Nodetype)):
+        instance.tree_path = tree_path_of(instance)
+        previous = getattr(instance, '_previous_fields', {})
+        check_tree_path(instance, previous.get('tree_path'))
+
+
+def tree_path_post_save_handler(sender, **kwargs):
+    """Rewrite the tree paths of the descendants of a metatype
+    or a nodetype whose path changed"""
+    from gstudio.models import Metatype
+    from gstudio.models import Nodetype
+    from gstudio.paths import update_descendant_paths
+
+    instance = kwargs['instance']
+    if not isinstance(instance, (Metatype, Nodetype)):
+        return
+    previous = getattr(instance, '_previous_fields', {})
+    if 'tree_path' in previous and previous['tree_path'] != instance.tree_path:
+        update_descendant_paths(instance, previous['tree_path'])
+
+
+def publication_post_save_handler(sender, **kwargs):
+    """Update the sites where a nodetype or a gbobject saved
+    is published"""
+    from gstudio.publication import is_publishable
+    from gstudio.publication import update_publications
+
+    instance = kwargs['instance']
+    if is_publishable(instance):
+        update_publications(instance.__class__, [instance.pk])
+
+
+def publication_m2m_handler(sender, **kwargs):
+    """Update the publications of the nodes whose sites change"""
+    from gstudio.publication import update_publications
+
+    if kwargs['action'] not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if kwargs['reverse']:
+        update_publications(kwargs['model'], kwargs['pk_set'])
+    else:
+        update_publications(kwargs['instance'].__class__,
+                            [kwargs['instance'].pk])
+
+
+def search_index_post_save_handler(sender, **kwargs):
+    """Index the terms of a nodetype saved"""
+    from gstudio.models import Nodetype
+    from gstudio.fulltext import index_node
+
+    instance = kwargs['instance']
+    if isinstance(instance, Nodetype):
+        index_node(instance)
+
+
+def search_index_post_delete_handler(sender, **kwargs):
+    """Remove the terms of a deleted nodetype from the index"""
+    from gstudio.models import Nodetype
+    from gstudio.fulltext import unindex_node
+
+    instance = kwargs['instance']
+    if isinstance(instance, Nodetype):
+        unindex_node(instance.pk)
+
+
+def disconnect_ping_signals():
+    """Disconnect the signals pinging the directories
+    and the external urls when a nodetype is saved"""
     from gstudio.models import Nodetype
 
     post_save.disconnect(
         sender=Nodetype, dispatch_uid='gstudio.nodetype.post_save.ping_directories')
     post_save.disconnect(
         sender=Nodetype, dispatch_uid='gstudio.nodetype.post_save.ping_external_urls')
+
+
+def disconnect_gstudio_signals():
+    """Disconnect all the signals provided by Gstudio. The caches
+    and the tables derived from the nodes are then no longer
+    maintained, and should be rebuilt with the rebuild commands"""
+    from gstudio.models import Nodetype
+    from gstudio.models import Relation
+    from gstudio.models import Relationtype
+
+    disconnect_ping_signals()
+    for signal, dispatch_uid in (
+        (request_started, 'gstudio.request_started.generations'),
+        (pre_save, 'gstudio.nid.pre_save.previous_fields'),
+        (post_save, 'gstudio.nid.post_save.nbh_cache'),
+        (pre_delete, 'gstudio.nid.pre_delete.nbh_cache'),
+        (post_delete, 'gstudio.nid.post_delete.nbh_cache'),
+        (post_save, 'gstudio.nid.post_save.schema_cache'),
+        (post_delete, 'gstudio.nid.post_delete.schema_cache'),
+        (post_save, 'gstudio.nid.post_save.graph'),
+        (post_delete, 'gstudio.nid.post_delete.graph'),
+        (post_delete, 'gstudio.nid.post_delete.dependencies'),
+        (pre_delete, 'gstudio.nid.pre_delete.members'),
+        (post_save, 'gstudio.nid.post_save.members'),
+        (post_delete, 'gstudio.nid.post_delete.members'),
+        (post_save, 'gstudio.nid.post_save.facets'),
+        (post_delete, 'gstudio.nid.post_delete.facets'),
+        (post_save, 'gstudio.nid.post_save.names'),
+        (post_delete, 'gstudio.nid.post_delete.names'),
+        (post_save, 'gstudio.nid.post_save.values'),
+        (post_delete, 'gstudio.nid.post_delete.values'),
+        (pre_save, 'gstudio.nid.pre_save.paths'),
+        (post_save, 'gstudio.nid.post_save.paths'),
+        (post_save, 'gstudio.nid.post_save.publications'),
+        (post_save, 'gstudio.nid.post_save.search'),
+        (post_delete, 'gstudio.nid.post_delete.search')):
+        signal.disconnect(dispatch_uid=dispatch_uid)
+
+    for signal, sender, dispatch_uid in (
+        (post_save, Relation, 'gstudio.relation.post_save.inference'),
+        (post_save, Relationtype, 'gstudio.relationtype.post_save.inference'),
+        (post_delete, Relation, 'gstudio.relation.post_delete.inference'),
+        (post_delete, Relationtype,
+         'gstudio.relationtype.post_delete.inference'),
+        (m2m_changed, Nodetype.metatypes.through,
+         'gstudio.nodetype.metatypes.nbh_cache'),
+        (m2m_changed, Nodetype.prior_nodes.through,
+         'gstudio.nodetype.prior_nodes.nbh_cache'),
+        (m2m_changed, Nodetype.posterior_nodes.through,
+         'gstudio.nodetype.posterior_nodes.nbh_cache'),
+        (m2m_changed, Nodetype.authors.through,
+         'gstudio.nodetype.authors.nbh_cache'),
+        (m2m_changed, Nodetype.prior_nodes.through,
+         'gstudio.nodetype.prior_nodes.graph'),
+        (m2m_changed, Nodetype.posterior_nodes.through,
+         'gstudio.nodetype.posterior_nodes.graph'),
+        (m2m_changed, Nodetype.prior_nodes.through,
+         'gstudio.nodetype.prior_nodes.dependencies'),
+        (m2m_changed, Nodetype.posterior_nodes.through,
+         'gstudio.nodetype.posterior_nodes.dependencies'),
+        (m2m_changed, Nodetype.sites.through,
+         'gstudio.nodetype.sites.publications')):
+        signal.disconnect(sender=sender, dispatch_uid=dispatch_uid)
@@ -0,0 +1,321 @@
+"""Compact snapshots of the graph of Gstudio for traversals
+
+The nodes and edges are exported into CSR arrays saved as NumPy files
+by the build_graph_snapshot command, memory-mapped read-only by every
+process. The changes logged since a snapshot was built are replayed on
+top of it in memory, with the changes of the last GRAPH_CHANGES_WINDOW
+seconds read again, so that a change committed after a newer one is
+not missed. The changes of the window already committed when the
+snapshot was built are recorded with it, and never replayed."""
+import os
+import time
+import array
+import shutil
+from datetime import datetime
+from datetime import timedelta
+
+from django.db.models import get_model
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import numpy
+except ImportError:
+    raise ImproperlyConfigured('numpy module is not available')
+
+from gstudio.models import NID
+from gstudio.models import Metatype
+from gstudio.models import Nodetype
+from gstudio.models import GraphChange
+from gstudio.triples import triples
+from gstudio.settings import GRAPH_SNAPSHOT_DIR
+from gstudio.settings import GRAPH_CHANGES_WINDOW
+
+ARRAYS = ('ids', 'out_offsets', 'out_targets', 'out_types',
+          'in_offsets', 'in_targets', 'in_types')
+CHANGES = 'changes'
+CURRENT = 'current'
+DIRECTIONS = {'out': ('out',), 'in': ('in',), 'both': ('out', 'in')}
+
+
+def m2m_edges(model, name, edgetype):
+    """Yield the edges of a many to many field of the nodes"""
+    field = model._meta.get_field(name)
+    for source, target in field.rel.through.objects.order_by().values_list(
+        field.m2m_field_name(), field.m2m_reverse_field_name()).iterator():
+        yield source, edgetype, target
+
+
+def graph_edges():
+    """Yield the (source, edgetype, target) edges of the graph"""
+    for edge in triples().iterator():
+        yield edge
+    for model in (Metatype, Nodetype):
+        for source, target in model.objects.filter(
+            parent__isnull=False).order_by().values_list(
+            'id', 'parent').iterator():
+            yield source, GraphChange.PARENT, target
+    models = [Nodetype]
+    gbobject = get_model('objectapp', 'gbobject')
+    if gbobject is not None:
+        models.append(gbobject)
+    for model in models:
+        for edge in m2m_edges(model, 'prior_nodes', GraphChange.PRIOR):
+            yield edge
+        for edge in m2m_edges(model, 'posterior_nodes',
+                              GraphChange.POSTERIOR):
+            yield edge
+
+
+def csr(sources, targets, types, size):
+    """Return the offsets, targets and types arrays
+    of the edges grouped by source index"""
+    order = numpy.argsort(sources, kind='mergesort')
+    offsets = numpy.zeros(size + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(sources, minlength=size), out=offsets[1:])
+    return offsets, targets[order], types[order]
+
+
+def build_snapshot(directory=GRAPH_SNAPSHOT_DIR):
+    """Export the graph into a new snapshot directory,
+    make it the current one and return its version"""
+    version = GraphChange.objects.version()
+    window = datetime.now() - timedelta(seconds=GRAPH_CHANGES_WINDOW)
+    changes = numpy.fromiter(GraphChange.objects.filter(
+        id__lte=version, creation_date__gte=window).values_list(
+        'id', flat=True).iterator(), dtype=numpy.int64)
+    ids = numpy.fromiter(NID.objects.order_by('id').values_list(
+        'id', flat=True).iterator(), dtype=numpy.int64)
+
+    columns = (array.array('l'), array.array('l'), array.array('l'))
+    for edge in graph_edges():
+        for column, value in zip(columns, edge):
+            column.append(value)
+    sources, types, targets = [numpy.array(column, dtype=numpy.int64)
+                               for column in columns]
+
+    # Drop the edges of the nodes created during the export
+    size = len(ids)
+    sources_index = numpy.searchsorted(ids, sources)
+    targets_index = numpy.searchsorted(ids, targets)
+    valid = (sources_index < size) & (targets_index < size)
+    valid[valid] &= (ids[sources_index[valid]] == sources[valid]) & \
+                    (ids[targets_index[valid]] == targets[valid])
+    sources_index = sources_index[valid]
+    targets_index = targets_index[valid]
+    types = types[valid]
+
+    arrays = {'ids': ids}
+    (arrays['out_offsets'], arrays['out_targets'],
+     arrays['out_types']) = csr(sources_index, targets_index, types, size)
+    (arrays['in_offsets'], arrays['in_targets'],
+     arrays['in_types']) = csr(targets_index, sources_index, types, size)
+
+    name = 'snapshot-%i-%i' % (version, int(time.time() * 1000))
+    path = os.path.join(directory, name)
+    os.makedirs(path)
+    for key in ARRAYS:
+        numpy.save(os.path.join(path, '%s.npy' % key), arrays[key])
+    numpy.save(os.path.join(path, '%s.npy' % CHANGES), changes)
+
+    previous = read_current(directory)
+    pointer = os.path.join(directory, '%s.%s' % (CURRENT, name))
+    pointer_file = open(pointer, 'w')
+    pointer_file.write('%s %i' % (name, version))
+    pointer_file.close()
+    os.rename(pointer, os.path.join(directory, CURRENT))
+
+    # Keep the previous snapshot for the processes still mapping it
+    for other in os.listdir(directory):
+        if other.startswith('snapshot-') and \
+               other not in (name, previous and previous[0]):
+            shutil.rmtree(os.path.join(directory, other), True)
+    return version
+
+
+def read_current(directory=GRAPH_SNAPSHOT_DIR):
+    """Return the name and the version of the
+    current snapshot, None if there is none"""
+    try:
+        pointer_file = open(os.path.join(directory, CURRENT))
+    except IOError:
+        return None
+    try:
+        name, version = pointer_file.read().split()
+    finally:
+        pointer_file.close()
+    return name, int(version)
+
+
+class GraphSnapshot(object):
+    """Graph of the nodes read from a snapshot directory,
+    with the changes logged since replayed in memory"""
+
+    def __init__(self, directory, name, version):
+        self.directory = directory
+        self.name = name
+        self.version = version
+        path = os.path.join(directory, name)
+        for key in ARRAYS:
+            setattr(self, key, numpy.load(os.path.join(path, '%s.npy' % key),
+                                          mmap_mode='r'))
+        self.added = {'out': {}, 'in': {}}
+        self.removed = set()
+        self.removed_nodes = set()
+        self.applied = {}
+        changes = os.path.join(path, '%s.npy' % CHANGES)
+        if os.path.exists(changes):
+            built = datetime.fromtimestamp(
+                int(name.rsplit('-', 1)[1]) / 1000.0)
+            self.applied = dict([(change_id, built) for change_id
+                                 in numpy.load(changes).tolist()])
+
+    @classmethod
+    def load(cls, directory=GRAPH_SNAPSHOT_DIR):
+        """Load the current snapshot, None if there is none"""
+        current = read_current(directory)
+        if current is None:
+            return None
+        return cls(directory, *current)
+
+    def is_current(self):
+        """Return True if no newer snapshot was built"""
+        current = read_current(self.directory)
+        return current is not None and current[0] == self.name
+
+    def refresh(self):
+        """Replay the changes of the graph logged since the last refresh,
+        and those of the window not replayed yet"""
+        window = datetime.now() - timedelta(seconds=GRAPH_CHANGES_WINDOW)
+        for change_id, source, edgetype, target, added, date in \
+                GraphChange.objects.since(self.version, window):
+            if change_id in self.applied:
+                continue
+            self.applied[change_id] = date
+            self.version = max(self.version, change_id)
+            if edgetype == GraphChange.NODE:
+                self.removed_nodes.add(source)
+                continue
+            edge = (source, edgetype, target)
+            if added:
+                self.removed.discard(edge)
+                self.added['out'].setdefault(source, set()).add(
+                    (target, edgetype))
+                self.added['in'].setdefault(target, set()).add(
+                    (source, edgetype))
+            else:
+                self.added['out'].get(source, set()).discard(
+                    (target, edgetype))
+                self.added['in'].get(target, set()).discard(
+                    (source, edgetype))
+                self.removed.add(edge)
+
+        self.applied = dict([(change_id, date) for change_id, date
+                             in self.applied.items() if date >= window])
+
+    def index(self, nid):
+        """Return the index of a node in the arrays, None if absent"""
+        i = int(numpy.searchsorted(self.ids, nid))
+        if i < len(self.ids) and self.ids[i] == nid:
+            return i
+        return None
+
+    def neighbours(self, nid, direction='both', edgetypes=None):
+        """Return the (nid, edgetype) neighbours of a node following
+        the edges in direction 'out', 'in' or 'both', and only the
+        edges of the given types if edgetypes is not None"""
+        if nid in self.removed_nodes:
+            return set()
+
+        neighbours = set()
+        i = self.index(nid)
+        for way in DIRECTIONS[direction]:
+            if i is not None:
+                offsets = getattr(self, '%s_offsets' % way)
+                start, end = offsets[i], offsets[i + 1]
+                others = self.ids[getattr(self, '%s_targets' % way)[
+                    start:end]].tolist()
+                types = getattr(self, '%s_types' % way)[start:end].tolist()
+                for other, edgetype in zip(others, types):
+                    if way == 'out':
+                        edge = (nid, edgetype, other)
+                    else:
+                        edge = (other, edgetype, nid)
+                    if edge not in self.removed:
+                        neighbours.add((other, edgetype))
+            neighbours.update(self.added[way].get(nid, ()))
+
+        return set([(other, edgetype) for other, edgetype in neighbours
+                    if other not in self.removed_nodes and
+                    (edgetypes is None or edgetype in edgetypes)])
+
+
+_snapshot = None
+
+
+def get_snapshot(directory=GRAPH_SNAPSHOT_DIR):
+    """Return the graph snapshot of the process, refreshed with
+    the last changes, None if the build_graph_snapshot command
+    has not built one yet"""
+    global _snapshot
+    if _snapshot is None or _snapshot.directory != directory or \
+           not _snapshot.is_current():
+        _snapshot = GraphSnapshot.load(directory)
+        if _snapshot is None:
+            return None
+    _snapshot.refresh()
+    return _snapshot
+
+
+def k_hop(snapshot, nid, k, direction='both', edgetypes=None):
+    """Return a dictionary mapping the nodes
+    at most k hops away from nid to their distance"""
+    distances = {nid: 0}
+    frontier = [nid]
+    for depth in range(1, k + 1):
+        next_frontier = []
+        for node in frontier:
+            for neighbour, edgetype in snapshot.neighbours(
+                node, direction, edgetypes):
+                if neighbour not in distances:
+                    distances[neighbour] = depth
+                    next_frontier.append(neighbour)
+        if not next_frontier:
+            break
+        frontier = next_frontier
+    return distances
+
+
+def shortest_path(snapshot, source, target, direction='out',
+                  edgetypes=None, max_depth=None):
+    """Return the nodes of a shortest path from source
+    to target, None if target is not reachable"""
+    parents = {source: None}
+    frontier = [source]
+    depth = 0
+    while frontier and target not in parents:
+        depth += 1
+        if max_depth is not None and depth > max_depth:
+            break
+        next_frontier = []
+        for node in frontier:
+            for neighbour, edgetype in snapshot.neighbours(
+                node, direction, edgetypes):
+                if neighbour not in parents:
+                    parents[neighbour] = node
+                    next_frontier.append(neighbour)
+        frontier = next_frontier
+
+    if target not in parents:
+        return None
+    path = [target]
+    while parents[path[-1]] is not None:
+        path.append(parents[path[-1]])
+    path.reverse()
+    return path
+
+
+def reachable(snapshot, source, target, direction='out',
+              edgetypes=None, max_depth=None):
+    """Return True if target can be reached from source"""
+    return shortest_path(snapshot, source, target, direction,
+                         edgetypes, max_depth) is not None
@@ -20,6 +20,7 @@ from tagging.utils import calculate_cloud
 from gstudio.models import Nodetype
 from gstudio.models import Author
 from gstudio.models import Metatype
+from gstudio.models import NodeScore
 
 from gstudio.gnowql import get_node
 
@@ -107,6 +108,15 @@ def get_popular_nodetypes(number=5, template='gstudio/tags/popular_nodetypes.htm
                         if object_id in object_dict][:number]}
 
 
+@register.inclusion_tag('gstudio/tags/dummy.html')
+def get_important_nodetypes(number=5, score='pagerank',
+                            template='gstudio/tags/important_nodetypes.html'):
+    """Return the nodetypes the most important in the graph"""
+    return {'template': template,
+            'nodetypes': NodeScore.objects.order(
+                Nodetype.published.all(), score)[:number]}
+
+
 @register.inclusion_tag('gstudio/tags/dummy.html', takes_context=True)
 def get_similar_nodetypes(context, number=5,
                         template='gstudio/tags/similar_nodetypes.html',
@@ -25,7 +25,27 @@ from gstudio.tests.templatetags import TemplateTagsTestCase  # ~0.4s
 from gstudio.tests.moderator import NodetypeCommentModeratorTestCase  # ~0.1s
 from gstudio.tests.spam_checker import SpamCheckerTestCase
 from gstudio.tests.url_shortener import URLShortenerTestCase
-from gstudio.signals import disconnect_gstudio_signals
+from gstudio.tests.neighbourhood import NeighbourhoodLoaderTestCase
+from gstudio.tests.nbh_cache import NeighbourhoodCacheTestCase
+from gstudio.tests.nid import NIDTestCase
+from gstudio.tests.schema import InheritedSchemaTestCase
+from gstudio.tests.registry import SchemaRegistryTestCase
+from gstudio.tests.triples import TriplesTestCase
+from gstudio.tests.egonet import EgoNetworkTestCase
+from gstudio.tests.expand import GraphExpandTestCase
+from gstudio.tests.graph_json import GraphJSONTestCase
+from gstudio.tests.inference import InferenceTestCase
+from gstudio.tests.dependencies import DependencyTestCase
+from gstudio.tests.clusters import GraphClustersTestCase
+from gstudio.tests.names import NameIndexTestCase
+from gstudio.tests.values import AttributeValuesTestCase
+from gstudio.tests.publication import PublicationTestCase
+from gstudio.tests.fulltext import FullTextTestCase
+from gstudio.tests.snapshot import HAS_NUMPY
+from gstudio.tests.snapshot import GraphSnapshotTestCase
+from gstudio.tests.layout import GraphLayoutTestCase
+from gstudio.tests.centrality import GraphScoresTestCase
+from gstudio.signals import disconnect_ping_signals
 # TOTAL ~ 6.6s
 
 
@@ -43,15 +63,27 @@ def suite():
                   TemplateTagsTestCase, QuickNodetypeTestCase,
                   URLShortenerTestCase, NodetypeCommentModeratorTestCase,
                   GstudioCustomDetailViews, SpamCheckerTestCase,
-                  NodetypeAdminTestCase, MetatypeAdminTestCase)
+                  NodetypeAdminTestCase, MetatypeAdminTestCase,
+                  NeighbourhoodLoaderTestCase, NeighbourhoodCacheTestCase,
+                  NIDTestCase, InheritedSchemaTestCase,
+                  SchemaRegistryTestCase, TriplesTestCase,
+                  EgoNetworkTestCase, GraphExpandTestCase,
+                  GraphJSONTestCase, InferenceTestCase,
+                  DependencyTestCase, GraphClustersTestCase,
+                  NameIndexTestCase, AttributeValuesTestCase,
+                  PublicationTestCase, FullTextTestCase)
 
     if 'django_xmlrpc' in settings.INSTALLED_APPS:
         test_cases += (PingBackTestCase, MetaWeblogTestCase)
 
+    if HAS_NUMPY:
+        test_cases += (GraphSnapshotTestCase, GraphLayoutTestCase,
+                       GraphScoresTestCase)
+
     for test_class in test_cases:
         tests = loader.loadTestsFromTestCase(test_class)
         suite.addTests(tests)
 
     return suite
 
-disconnect_gstudio_signals()
+disconnect_ping_signals()
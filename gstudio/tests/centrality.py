@@ -0,0 +1,47 @@
+"""Test cases for Gstudio's graph scores"""
+from django.test import TestCase
+from django.core.management import call_command
+
+from gstudio.models import Objecttype
+from gstudio.models import NodeScore
+
+
+class GraphScoresTestCase(TestCase):
+
+    def setUp(self):
+        self.number = Objecttype.objects.create(title='Number',
+                                                slug='number')
+        self.addition = Objecttype.objects.create(title='Addition',
+                                                  slug='addition')
+        self.product = Objecttype.objects.create(title='Product',
+                                                 slug='product')
+        self.addition.prior_nodes.add(self.number)
+        self.product.prior_nodes.add(self.addition)
+
+    def test_betweenness(self):
+        import numpy
+        from gstudio.centrality import betweenness
+
+        scores = betweenness(4, numpy.array([0, 1, 1, 2]),
+                             numpy.array([1, 2, 3, 3]))
+        self.assertEquals(list(scores), [0, 2, 0, 0])
+
+    def test_pagerank(self):
+        import numpy
+        from gstudio.centrality import pagerank
+
+        ranks = pagerank(3, numpy.array([0, 1]), numpy.array([1, 2]))
+        self.assertAlmostEquals(ranks.sum(), 1)
+        self.assertTrue(ranks[0] < ranks[1] < ranks[2])
+
+    def test_command(self):
+        call_command('compute_graph_scores', verbosity=0)
+        scores = dict([(score.nid, score)
+                       for score in NodeScore.objects.all()])
+        self.assertEquals(len(scores), 3)
+        self.assertEquals(NodeScore.objects.all()[0].nid, self.number.pk)
+        self.assertEquals(scores[self.addition.pk].in_degree, 1)
+        self.assertEquals(scores[self.addition.pk].out_degree, 1)
+        self.assertEquals(scores[self.addition.pk].betweenness, 1)
+        self.assertEquals(list(NodeScore.objects.order(
+            Objecttype.objects.all(), 'betweenness'))[0], self.addition)
@@ -0,0 +1,69 @@
+"""Test cases for Gstudio's graph clusters"""
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.contrib.admin import site
+from django.contrib.auth.models import User
+from django.contrib.admin.filterspecs import FilterSpec
+from django.core.management import call_command
+
+from gstudio.models import NID
+from gstudio.models import Nodetype
+from gstudio.models import Objecttype
+from gstudio.clusters import components
+from gstudio.clusters import communities
+from gstudio.admin.objecttype import ObjecttypeAdmin
+from gstudio.admin.filterspecs import ClusterFilterSpec
+
+
+class GraphClustersTestCase(TestCase):
+
+    def setUp(self):
+        self.number = Objecttype.objects.create(title='Number',
+                                                slug='number')
+        self.addition = Objecttype.objects.create(title='Addition',
+                                                  slug='addition')
+        self.colour = Objecttype.objects.create(title='Colour',
+                                                slug='colour')
+        self.red = Objecttype.objects.create(title='Red', slug='red',
+                                             parent=self.colour)
+        self.addition.prior_nodes.add(self.number)
+
+    def test_components(self):
+        self.assertEquals(components([(3, 1), (2, 4), (4, 3), (6, 5)]),
+                          {1: 1, 2: 1, 3: 1, 4: 1, 5: 5, 6: 5})
+
+    def test_communities(self):
+        cliques = [(one, other) for first in (1, 10)
+                   for one in range(first, first + 5)
+                   for other in range(one + 1, first + 5)]
+        found = communities(cliques + [(5, 10)])
+        self.assertEquals(set(found.values()), set([1, 10]))
+        self.assertEquals(found[4], 1)
+        self.assertEquals(found[12], 10)
+
+    def test_command(self):
+        alone = Objecttype.objects.create(title='Alone', slug='alone')
+        call_command('compute_graph_clusters', verbosity=0)
+        self.assertEquals(
+            NID.objects.get(pk=self.addition.pk).component, self.number.pk)
+        self.assertEquals(
+            NID.objects.get(pk=self.red.pk).community, self.colour.pk)
+        self.assertEquals(NID.objects.get(pk=alone.pk).component, alone.pk)
+        self.assertEquals(list(Nodetype.objects.in_cluster(
+            component=self.colour.pk).order_by('pk')),
+                          [self.colour.nodetype_ptr, self.red.nodetype_ptr])
+        self.assertEquals(NID.objects.in_cluster(
+            component=self.number.pk, community=self.number.pk).count(), 2)
+
+    def test_filter_spec(self):
+        call_command('compute_graph_clusters', verbosity=0)
+        field = Objecttype._meta.get_field('component')
+        request = RequestFactory().get('/', {'component__exact': '0'})
+        request.user = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        spec = FilterSpec.create(field, request, {}, Objecttype,
+                                 ObjecttypeAdmin(Objecttype, site))
+        self.assertTrue(isinstance(spec, ClusterFilterSpec))
+        self.assertEquals(spec.lookup_val, '0')
+        self.assertEquals(spec.lookup_choices,
+                          [(self.number.pk, 2), (self.colour.pk, 2)])
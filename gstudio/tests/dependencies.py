@@ -0,0 +1,78 @@
+"""Test cases for Gstudio's dependency engine"""
+from django.test import TestCase
+from django.core.management import call_command
+
+from gstudio.models import Objecttype
+from gstudio.models import Dependency
+from gstudio.dependencies import dependencies
+
+
+class DependencyTestCase(TestCase):
+
+    def setUp(self):
+        dependencies.clear()
+        self.number = Objecttype.objects.create(title='Number',
+                                                slug='number')
+        self.addition = Objecttype.objects.create(title='Addition',
+                                                  slug='addition')
+        self.product = Objecttype.objects.create(title='Product',
+                                                 slug='product')
+        self.power = Objecttype.objects.create(title='Power', slug='power')
+        self.addition.prior_nodes.add(self.number)
+        self.product.prior_nodes.add(self.addition)
+        self.addition.posterior_nodes.add(self.power)
+        self.power.prior_nodes.add(self.product)
+
+    def test_direction(self):
+        self.assertEquals(
+            set(Dependency.objects.values_list('node', 'prior')),
+            set([(self.addition.pk, self.number.pk),
+                 (self.product.pk, self.addition.pk),
+                 (self.power.pk, self.addition.pk),
+                 (self.power.pk, self.product.pk)]))
+
+    def test_closures(self):
+        self.assertEquals(dependencies.prerequisites(self.power.pk),
+                          set([self.number.pk, self.addition.pk,
+                               self.product.pk]))
+        self.assertEquals(dependencies.dependents(self.addition.pk),
+                          set([self.product.pk, self.power.pk]))
+        self.assertEquals(dependencies.topological_order(),
+                          [self.number.pk, self.addition.pk,
+                           self.product.pk, self.power.pk])
+        self.assertEquals(dependencies.cycles(), [])
+
+    def test_learning_path(self):
+        self.assertEquals(dependencies.learning_path(self.power.pk),
+                          [self.number.pk, self.addition.pk,
+                           self.product.pk, self.power.pk])
+        self.assertEquals(dependencies.learning_path(
+            self.power.pk, known=[self.addition.pk]),
+                          [self.product.pk, self.power.pk])
+
+    def test_incremental_update(self):
+        self.assertEquals(dependencies.prerequisites(self.product.pk),
+                          set([self.number.pk, self.addition.pk]))
+        self.product.prior_nodes.remove(self.addition)
+        self.assertEquals(dependencies.prerequisites(self.product.pk),
+                          set())
+        self.assertEquals(dependencies.prerequisites(self.power.pk),
+                          set([self.number.pk, self.addition.pk,
+                               self.product.pk]))
+
+        self.number.prior_nodes.add(self.power)
+        self.assertEquals(dependencies.cycles(),
+                          [sorted([self.number.pk, self.addition.pk,
+                                   self.power.pk])])
+
+        self.power.delete()
+        self.assertEquals(dependencies.cycles(), [])
+        self.assertEquals(dependencies.dependents(self.number.pk),
+                          set([self.addition.pk]))
+
+    def test_rebuild_command(self):
+        expected = set(Dependency.objects.values_list('node', 'prior'))
+        Dependency.objects.all().delete()
+        call_command('rebuild_dependencies', verbosity=0)
+        self.assertEquals(
+            set(Dependency.objects.values_list('node', 'prior')), expected)
@@ -0,0 +1,101 @@
+"""Test cases for Gstudio's ego networks"""
+import json
+
+from django.test import TestCase
+from django.contrib.sites.models import Site
+
+from gstudio.models import Relation
+from gstudio.models import Objecttype
+from gstudio.models import Relationtype
+from gstudio.models import GraphChange
+from gstudio.managers import DRAFT
+from gstudio.managers import PUBLISHED
+from gstudio.egonet import ego_network
+
+
+class EgoNetworkTestCase(TestCase):
+    urls = 'gstudio.tests.urls'
+
+    def setUp(self):
+        self.site = Site.objects.get_current()
+        self.animal = self.objecttype('Animal')
+        self.dog = self.objecttype('Dog', self.animal)
+        self.cat = self.objecttype('Cat', self.animal)
+        self.bird = self.objecttype('Bird')
+        self.worm = self.objecttype('Worm')
+        self.chases = Relationtype.objects.create(
+            title='chases', slug='chases', inverse='chased by',
+            left_subjecttype=self.animal, right_subjecttype=self.animal)
+        self.relate(self.dog, self.chases, self.cat)
+        self.relate(self.cat, self.chases, self.bird)
+        self.bird.prior_nodes.add(self.worm)
+
+    def objecttype(self, title, parent=None):
+        objecttype = Objecttype.objects.create(
+            title=title, slug=title.lower(), parent=parent,
+            status=PUBLISHED)
+        objecttype.sites.add(self.site)
+        return objecttype
+
+    def relate(self, left, relationtype, right):
+        return Relation.objects.create(
+            title='%s %s %s' % (left, relationtype, right),
+            slug='%s-%s' % (left.slug, right.slug), left_subject=left,
+            relationtype=relationtype, right_subject=right)
+
+    def test_ego_network(self):
+        depths, edges = ego_network(self.dog.pk, 1)
+        self.assertEquals(depths, {self.dog.pk: 0, self.animal.pk: 1,
+                                   self.cat.pk: 1})
+        self.assertEquals(edges, set([
+            (self.dog.pk, GraphChange.PARENT, self.animal.pk),
+            (self.cat.pk, GraphChange.PARENT, self.animal.pk),
+            (self.dog.pk, self.chases.pk, self.cat.pk)]))
+
+        depths, edges = ego_network(self.dog.pk, 3)
+        self.assertEquals(depths[self.bird.pk], 2)
+        self.assertEquals(depths[self.worm.pk], 3)
+        self.assertTrue((self.bird.pk, GraphChange.PRIOR, self.worm.pk)
+                        in edges)
+
+    def test_ego_network_truncation(self):
+        depths, edges = ego_network(self.cat.pk, 1, 3)
+        self.assertEquals(depths, {self.cat.pk: 0, self.animal.pk: 1,
+                                   self.dog.pk: 1})
+        for source, edgetype, target in edges:
+            self.assertTrue(source in depths and target in depths)
+
+    def test_ego_network_queries(self):
+        self.assertNumQueries(3, ego_network, self.dog.pk, 2)
+
+    def test_graph_ego_json(self):
+        response = self.client.get('/graphs/graph_ego_json/%i' %
+                                   self.dog.pk, {'radius': 2})
+        self.assertEquals(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEquals(sorted([node['_id'] for node in
+                                  data['node_metadata']]),
+                          sorted([str(node.pk) for node in
+                                  (self.animal, self.dog, self.cat,
+                                   self.bird)]))
+        names = [data['predicates'][str(edge[1])]
+                 for edge in data['edges']]
+        self.assertEquals(names.count('chases'), 2)
+        self.assertEquals(names.count('parent'), 2)
+
+        self.bird.status = DRAFT
+        self.bird.save()
+        response = self.client.get('/graphs/graph_ego_json/%i' %
+                                   self.dog.pk, {'radius': 2})
+        data = json.loads(response.content)
+        self.assertEquals(len(data['node_metadata']), 3)
+        self.assertEquals(len(data['edges']), 3)
+        response = self.client.get('/graphs/graph_ego_json/%i' %
+                                   self.bird.pk)
+        self.assertEquals(response.status_code, 404)
+
+        response = self.client.get('/graphs/graph_ego_json/%i' %
+                                   self.dog.pk, {'radius': 10})
+        self.assertEquals(response.status_code, 400)
+        response = self.client.get('/graphs/graph_ego_json/0')
+        self.assertEquals(response.status_code, 404)
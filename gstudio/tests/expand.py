@@ -0,0 +1,112 @@
+"""Test cases for Gstudio's graph expansion"""
+import json
+
+from django.test import TestCase
+from django.contrib.sites.models import Site
+
+from gstudio.models import Relation
+from gstudio.models import Objecttype
+from gstudio.models import Relationtype
+from gstudio.managers import DRAFT
+from gstudio.managers import PUBLISHED
+from gstudio.expand import expand
+from gstudio.expand import serialize_page
+
+
+class GraphExpandTestCase(TestCase):
+    urls = 'gstudio.tests.urls'
+
+    def setUp(self):
+        self.site = Site.objects.get_current()
+        self.animal = self.objecttype('Animal', 'animal')
+        self.subtypes = [self.objecttype('Subtype %i' % i, 'subtype-%i' % i,
+                                         self.animal) for i in range(5)]
+        self.eats = Relationtype.objects.create(
+            title='eats', slug='eats', inverse='eaten by',
+            left_subjecttype=self.animal, right_subjecttype=self.animal)
+        Relation.objects.create(title='Animal eats Subtype 0',
+                                slug='animal-eats-subtype-0',
+                                left_subject=self.animal,
+                                relationtype=self.eats,
+                                right_subject=self.subtypes[0])
+
+    def objecttype(self, title, slug, parent=None):
+        objecttype = Objecttype.objects.create(
+            title=title, slug=slug, parent=parent, status=PUBLISHED)
+        objecttype.sites.add(self.site)
+        return objecttype
+
+    def unpublish(self, objecttype):
+        objecttype = Objecttype.objects.get(pk=objecttype.pk)
+        objecttype.status = DRAFT
+        objecttype.save()
+
+    def test_expand(self):
+        ids = [subtype.pk for subtype in self.subtypes]
+        rows, cursor = expand(self.animal.pk, 'contains_subtypes', limit=2)
+        self.assertEquals([row[0] for row in rows], ids[:2])
+        self.assertEquals(cursor, ids[1])
+        rows, cursor = expand(self.animal.pk, 'contains_subtypes',
+                              cursor, limit=3)
+        self.assertEquals([row[0] for row in rows], ids[2:])
+        self.assertEquals(cursor, None)
+
+        rows, cursor = expand(self.subtypes[0].pk, 'type_of')
+        self.assertEquals([row[0] for row in rows], [self.animal.pk])
+        rows, cursor = expand(self.subtypes[0].pk, 'inverse:%i' %
+                              self.eats.pk)
+        self.assertEquals([row[0] for row in rows], [self.animal.pk])
+        rows, cursor = expand(self.subtypes[0].pk, 'relation:%i' %
+                              self.eats.pk)
+        self.assertEquals(rows, [])
+        rows, cursor = expand(self.animal.pk, 'relation:%i' % self.eats.pk)
+        self.assertEquals([row[0] for row in rows], [self.subtypes[0].pk])
+        self.assertRaises(ValueError, expand, self.animal.pk, 'unknown')
+        self.assertRaises(ValueError, expand, self.animal.pk, 'eats')
+        self.assertRaises(ValueError, expand, self.animal.pk,
+                          'relation:%i' % (self.eats.pk + 1))
+
+    def test_expand_queries(self):
+        self.assertNumQueries(1, expand, self.animal.pk,
+                              'contains_subtypes', limit=2)
+
+    def test_serialize_page(self):
+        rows, cursor = expand(self.animal.pk, 'contains_subtypes', limit=2)
+        data = serialize_page(self.animal.pk, 'contains_subtypes', rows,
+                              cursor, set([self.subtypes[0].pk]))
+        self.assertEquals([node['_id'] for node in data['node_metadata']],
+                          [str(self.subtypes[1].pk)])
+        self.assertEquals(len(data['contains_subtypes']), 2)
+        self.assertEquals(data['cursor'], str(self.subtypes[1].pk))
+
+    def test_graph_expand_json(self):
+        url = '/graphs/graph_expand_json/%i' % self.animal.pk
+        response = self.client.get(url, {'predicate': 'contains_subtypes',
+                                         'limit': 4})
+        data = json.loads(response.content)
+        self.assertEquals(len(data['node_metadata']), 4)
+        response = self.client.get(url, {'predicate': 'contains_subtypes',
+                                         'cursor': data['cursor'],
+                                         'known': self.subtypes[4].pk})
+        data = json.loads(response.content)
+        self.assertEquals(data['node_metadata'], [])
+        self.assertEquals(len(data['contains_subtypes']), 1)
+        self.assertEquals(data['cursor'], None)
+
+        self.unpublish(self.subtypes[1])
+        response = self.client.get(url, {'predicate': 'contains_subtypes',
+                                         'limit': 2})
+        data = json.loads(response.content)
+        self.assertEquals([node['_id'] for node in data['node_metadata']],
+                          [str(self.subtypes[0].pk)])
+        self.assertEquals(data['cursor'], str(self.subtypes[1].pk))
+
+        response = self.client.get(url, {'predicate': 'unknown'})
+        self.assertEquals(response.status_code, 400)
+        response = self.client.get(url, {'predicate': 'relation:%i' %
+                                         self.eats.pk, 'limit': 0})
+        self.assertEquals(response.status_code, 400)
+
+        self.unpublish(self.animal)
+        response = self.client.get(url, {'predicate': 'contains_subtypes'})
+        self.assertEquals(response.status_code, 404)
@@ -0,0 +1,72 @@
+"""Test cases for Gstudio's full-text index"""
+from django.test import TestCase
+from django.contrib.sites.models import Site
+
+from gstudio.models import Nodetype
+from gstudio.models import SearchPosting
+from gstudio.models import SearchDocument
+from gstudio.managers import PUBLISHED
+from gstudio.fulltext import rebuild
+from gstudio.fulltext import tokenize
+from gstudio.search import basic_search
+from gstudio.search import advanced_search
+
+
+class FullTextTestCase(TestCase):
+
+    def setUp(self):
+        site = Site.objects.get_current()
+        self.nodetypes = []
+        for slug, content in (('graphs', 'Graph, graph and graph theory'),
+                              ('nodes', 'The nodes of a graph and its '
+                               'edges'),
+                              ('trees', 'A tree is a connected graph '
+                               'without cycles')):
+            nodetype = Nodetype.objects.create(
+                title=slug.title(), slug=slug, content=content,
+                status=PUBLISHED)
+            nodetype.sites.add(site)
+            self.nodetypes.append(nodetype)
+
+    def postings(self, nodetype):
+        return dict(SearchPosting.objects.filter(
+            nid=nodetype.pk).values_list('term', 'frequency'))
+
+    def test_tokenize(self):
+        self.assertEquals(tokenize(u'The Graph of 3 nodes, about graphs'),
+                          [u'graph', u'3', u'nodes', u'graphs'])
+
+    def test_index(self):
+        graphs = self.nodetypes[0]
+        self.assertEquals(self.postings(graphs),
+                          {u'graphs': 1, u'graph': 3, u'theory': 1})
+        self.assertEquals(SearchDocument.objects.get(nid=graphs.pk).length, 5)
+        graphs.content = '<p>Graph theory</p>'
+        graphs.save()
+        self.assertEquals(self.postings(graphs),
+                          {u'graphs': 1, u'graph': 1, u'theory': 1})
+        graphs.delete()
+        self.assertEquals(self.postings(graphs), {})
+        self.assertEquals(SearchDocument.objects.filter(
+            nid=graphs.pk).count(), 0)
+
+    def test_search(self):
+        self.assertEquals(list(advanced_search('graph')), self.nodetypes)
+        self.assertEquals(list(advanced_search('graph -nodes')),
+                          [self.nodetypes[0], self.nodetypes[2]])
+        self.assertEquals(list(advanced_search('edg*')), [self.nodetypes[1]])
+        self.assertEquals(list(advanced_search('"graph and"')),
+                          [self.nodetypes[0], self.nodetypes[1]])
+
+    def test_basic_search(self):
+        self.assertEquals(set(basic_search('the edges of trees')),
+                          set([self.nodetypes[1], self.nodetypes[2]]))
+        self.assertEquals(list(Nodetype.published.basic_search('theory')),
+                          [self.nodetypes[0]])
+
+    def test_rebuild(self):
+        SearchPosting.objects.all().delete()
+        self.assertEquals(rebuild(), 3)
+        self.assertEquals(self.postings(self.nodetypes[2]),
+                          {u'trees': 1, u'tree': 1, u'connected': 1,
+                           u'graph': 1, u'without': 1, u'cycles': 1})
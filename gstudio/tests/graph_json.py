@@ -0,0 +1,79 @@
+"""Test cases for Gstudio's graph JSON"""
+import json
+
+from django.test import TestCase
+from django.contrib.sites.models import Site
+
+from gstudio.models import Metatype
+from gstudio.models import Objecttype
+from gstudio.managers import PUBLISHED
+from gstudio.graph_json import graph
+from gstudio.graph_json import stream_graph_json
+
+
+class GraphJSONTestCase(TestCase):
+    urls = 'gstudio.tests.urls'
+
+    def setUp(self):
+        self.metatype = Metatype.objects.create(title='Living',
+                                                slug='living')
+        self.animal = Objecttype.objects.create(title='Animal',
+                                                slug='animal',
+                                                plural='Animals',
+                                                status=PUBLISHED)
+        self.animal.sites.add(Site.objects.get_current())
+        self.animal.metatypes.add(self.metatype)
+        self.dog = Objecttype.objects.create(title='Dog', slug='dog',
+                                             parent=self.animal)
+        self.animal.prior_nodes.add(self.dog)
+
+    def test_graph(self):
+        ids, edges = graph(self.animal)
+        self.assertEquals(ids, set([self.animal.pk, self.metatype.pk,
+                                    self.dog.pk]))
+        self.assertEquals(sorted(edges), [
+            (self.animal.pk, 'contains_subtypes', self.dog.pk),
+            (self.animal.pk, 'member_of_metatype', self.metatype.pk),
+            (self.animal.pk, 'prior_nodes', self.dog.pk)])
+
+    def test_stream_graph_json(self):
+        data = json.loads(''.join(stream_graph_json(
+            self.animal, {self.dog.pk: (1.0, 2.0)})))
+        metadata = dict([(node['_id'], node)
+                         for node in data['node_metadata']])
+        self.assertEquals(len(data['node_metadata']), 3)
+        self.assertEquals(metadata[str(self.animal.pk)]['plural'],
+                          'Animals')
+        self.assertEquals((metadata[str(self.dog.pk)]['x'],
+                           metadata[str(self.dog.pk)]['y']), (1.0, 2.0))
+        self.assertEquals(sorted(data['predicates'].values()),
+                          ['contains_subtypes', 'member_of_metatype',
+                           'prior_nodes'])
+        self.assertEquals(sorted([
+            (source, data['predicates'][str(pid)], target)
+            for source, pid, target in data['edges']]),
+            sorted(graph(self.animal)[1]))
+
+    def test_viewable(self):
+        data = json.loads(''.join(stream_graph_json(
+            self.animal, viewable=[self.animal.pk, self.metatype.pk])))
+        self.assertEquals(sorted([node['_id']
+                                  for node in data['node_metadata']]),
+                          sorted([str(self.animal.pk),
+                                  str(self.metatype.pk)]))
+        self.assertEquals(data['edges'], [[self.animal.pk, 1,
+                                           self.metatype.pk]])
+
+    def test_graph_json_views(self):
+        for node in (self.metatype, self.animal):
+            response = self.client.get('/graphs/graph_json/%i' % node.pk)
+            self.assertEquals(response.status_code, 200)
+            data = json.loads(response.content)
+            self.assertTrue(str(node.pk) in [
+                metadata['_id'] for metadata in data['node_metadata']])
+        self.assertFalse(str(self.dog.pk) in [
+            metadata['_id'] for metadata in data['node_metadata']])
+        response = self.client.get('/graphs/graph_json/%i' % self.dog.pk)
+        self.assertEquals(response.status_code, 404)
+        response = self.client.get('/graphs/graph_json/0')
+        self.assertEquals(response.status_code, 404)
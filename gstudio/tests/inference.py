@@ -0,0 +1,84 @@
+"""Test cases for Gstudio's inferred relations"""
+from django.test import TestCase
+from django.core.management import call_command
+
+from gstudio.models import Relation
+from gstudio.models import Objecttype
+from gstudio.models import Relationtype
+from gstudio.models import InferredRelation
+from gstudio.inference import inferred_triples
+
+
+class InferenceTestCase(TestCase):
+
+    def setUp(self):
+        self.wheel = Objecttype.objects.create(title='Wheel', slug='wheel')
+        self.car = Objecttype.objects.create(title='Car', slug='car')
+        self.fleet = Objecttype.objects.create(title='Fleet', slug='fleet')
+        self.part_of = Relationtype.objects.create(
+            title='part of', slug='part-of', inverse='has part',
+            left_subjecttype=self.wheel, right_subjecttype=self.wheel,
+            is_transitive=True)
+        self.sibling = Relationtype.objects.create(
+            title='sibling of', slug='sibling-of', inverse='sibling of',
+            left_subjecttype=self.wheel, right_subjecttype=self.wheel,
+            is_symmetrical=True)
+
+    def relate(self, left, relationtype, right):
+        return Relation.objects.create(
+            title='%s %s %s' % (left, relationtype, right),
+            slug='%s-%s' % (left.slug, right.slug), left_subject=left,
+            relationtype=relationtype, right_subject=right)
+
+    def pairs(self, relationtype):
+        return set([(s, o) for s, p, o in inferred_triples(p=relationtype)])
+
+    def test_transitive(self):
+        self.relate(self.wheel, self.part_of, self.car)
+        relation = self.relate(self.car, self.part_of, self.fleet)
+        self.assertEquals(list(inferred_triples(o=self.fleet).order_by(
+            'left_subject')), [(self.wheel.pk, self.part_of.pk, self.fleet.pk),
+                               (self.car.pk, self.part_of.pk, self.fleet.pk)])
+
+        relation.delete()
+        self.assertEquals(self.pairs(self.part_of),
+                          set([(self.wheel.pk, self.car.pk)]))
+
+    def test_rederivation(self):
+        self.relate(self.wheel, self.part_of, self.car)
+        self.relate(self.car, self.part_of, self.fleet)
+        direct = self.relate(self.wheel, self.part_of, self.fleet)
+        direct.delete()
+        self.assertTrue((self.wheel.pk, self.fleet.pk) in
+                        self.pairs(self.part_of))
+
+    def test_symmetrical(self):
+        relation = self.relate(self.wheel, self.sibling, self.car)
+        self.assertEquals(self.pairs(self.sibling),
+                          set([(self.wheel.pk, self.car.pk),
+                               (self.car.pk, self.wheel.pk)]))
+        relation.right_subject = self.fleet
+        relation.save()
+        self.assertEquals(self.pairs(self.sibling),
+                          set([(self.wheel.pk, self.fleet.pk),
+                               (self.fleet.pk, self.wheel.pk)]))
+
+    def test_flags_change(self):
+        self.relate(self.wheel, self.sibling, self.car)
+        self.sibling.is_reflexive = True
+        self.sibling.save()
+        self.assertTrue((self.car.pk, self.car.pk) in
+                        self.pairs(self.sibling))
+        self.sibling.is_symmetrical = False
+        self.sibling.is_reflexive = False
+        self.sibling.save()
+        self.assertEquals(self.pairs(self.sibling), set())
+
+    def test_rebuild_command(self):
+        self.relate(self.wheel, self.part_of, self.car)
+        self.relate(self.car, self.part_of, self.fleet)
+        expected = self.pairs(self.part_of)
+        InferredRelation.objects.all().delete()
+        call_command('rebuild_inferred_relations', verbosity=0)
+        self.assertEquals(self.pairs(self.part_of), expected)
+        self.assertEquals(len(expected), 3)
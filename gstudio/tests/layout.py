@@ -0,0 +1,45 @@
+"""Test cases for Gstudio's graph layouts"""
+from django.test import TestCase
+
+from gstudio.models import Objecttype
+
+
+class GraphLayoutTestCase(TestCase):
+
+    def setUp(self):
+        self.animal = Objecttype.objects.create(title='Animal',
+                                                slug='animal')
+        for i in range(3):
+            Objecttype.objects.create(title='Subtype %i' % i,
+                                      slug='subtype-%i' % i,
+                                      parent=self.animal)
+
+    def test_force_layout(self):
+        import numpy
+        from gstudio.layout import force_layout
+
+        positions = force_layout(3, [0, 1], [1, 2], iterations=50)
+        self.assertEquals(positions.shape, (3, 2))
+        near = numpy.sqrt(((positions[0] - positions[1]) ** 2).sum())
+        far = numpy.sqrt(((positions[0] - positions[2]) ** 2).sum())
+        self.assertTrue(near < far)
+
+    def test_grid_repulsion(self):
+        import numpy
+        from gstudio.layout import exact_repulsion
+        from gstudio.layout import grid_repulsion
+
+        positions = numpy.random.RandomState(0).rand(200, 2) * 1000
+        exact = exact_repulsion(positions, 10.0)
+        approximate = grid_repulsion(positions, 10.0, cells=8)
+        error = numpy.sqrt(((exact - approximate) ** 2).sum(axis=1))
+        scale = numpy.sqrt((exact ** 2).sum(axis=1))
+        self.assertTrue(numpy.median(error / scale) < 0.1)
+
+    def test_graph_positions(self):
+        from gstudio.layout import graph_positions
+
+        positions = graph_positions(self.animal)
+        self.assertEquals(len(positions), 4)
+        self.assertEquals(positions[self.animal.pk], (480.0, 350.0))
+        self.assertEquals(graph_positions(self.animal), positions)
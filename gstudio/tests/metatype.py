@@ -1,10 +1,12 @@
 """Test cases for Gstudio's Metatype"""
+from django.http import Http404
 from django.test import TestCase
 from django.contrib.sites.models import Site
 
 from gstudio.models import Nodetype
 from gstudio.models import Metatype
 from gstudio.managers import PUBLISHED
+from gstudio.views.metatypes import get_metatype_or_404
 
 
 class MetatypeTestCase(TestCase):
@@ -50,3 +52,20 @@ class MetatypeTestCase(TestCase):
         self.metatypes[1].parent = self.metatypes[0]
         self.metatypes[1].save()
         self.assertEqual(self.metatypes[1].tree_path, 'metatype-1/metatype-2')
+
+    def test_tree_path_cascade(self):
+        child = Metatype.objects.create(title='Metatype 3', slug='metatype-3',
+                                        parent=self.metatypes[1])
+        self.assertEqual(child.tree_path, 'metatype-2/metatype-3')
+        self.metatypes[1].parent = self.metatypes[0]
+        self.metatypes[1].save()
+        self.assertEqual(Metatype.objects.get(pk=child.pk).tree_path,
+                         'metatype-1/metatype-2/metatype-3')
+        root = Metatype.objects.get(pk=self.metatypes[0].pk)
+        root.slug = 'root'
+        root.save()
+        self.assertEqual(Metatype.objects.get(pk=child.pk).tree_path,
+                         'root/metatype-2/metatype-3')
+        self.assertEqual(get_metatype_or_404('/root/metatype-2/metatype-3/'),
+                         child)
+        self.assertRaises(Http404, get_metatype_or_404, 'metatype-3')
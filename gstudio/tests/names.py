@@ -0,0 +1,73 @@
+"""Test cases for Gstudio's name index"""
+from django.test import TestCase
+
+from gstudio.models import NID
+from gstudio.models import NodeName
+from gstudio.models import Objecttype
+from gstudio.names import names
+from gstudio.names import rebuild
+from gstudio.names import normalize
+from gstudio.names import resolve_node
+from gstudio.names import resolve_names
+
+
+class NameIndexTestCase(TestCase):
+
+    def setUp(self):
+        names.clear()
+        self.mouse = Objecttype.objects.create(
+            title='Mouse', slug='mouse', plural='Mice',
+            altnames='rodent, "house mouse"')
+        self.computer_mouse = Objecttype.objects.create(
+            title='Pointing device', slug='pointing-device',
+            altnames='mouse')
+
+    def test_normalize(self):
+        self.assertEquals(normalize(u'  House   MOUSE '), u'house mouse')
+
+    def test_index(self):
+        self.assertEquals(NodeName.objects.names_of(self.mouse.pk),
+                          set([(u'mouse', NodeName.TITLE),
+                               (u'mice', NodeName.PLURAL),
+                               (u'rodent', NodeName.ALTNAME),
+                               (u'house mouse', NodeName.ALTNAME)]))
+        self.mouse.plural = ''
+        self.mouse.save()
+        self.assertEquals(resolve_names(['mice']), {'mice': []})
+        self.mouse.delete()
+        self.assertEquals(NodeName.objects.filter(
+            nid=self.mouse.pk).count(), 0)
+
+    def test_resolve(self):
+        self.assertEquals(resolve_names(['MICE', 'House mouse', 'cat']),
+                          {'MICE': [self.mouse.pk],
+                           'House mouse': [self.mouse.pk], 'cat': []})
+        self.assertEquals(resolve_names(['mouse'])['mouse'],
+                          [self.mouse.pk, self.computer_mouse.pk])
+        self.assertEquals(resolve_node('Rodent'), self.mouse)
+        self.assertRaises(NID.DoesNotExist, resolve_node, 'cat')
+
+    def test_cache(self):
+        resolve_names(['mice', 'rodent'])
+        self.assertNumQueries(0, lambda: resolve_names(['Mice', 'rodent']))
+        cat = Objecttype.objects.create(title='Cat', slug='cat')
+        self.assertEquals(resolve_names(['cat']), {'cat': [cat.pk]})
+
+    def test_changed_names(self):
+        self.assertEquals(resolve_names(['rodent', 'trackball']),
+                          {'rodent': [self.mouse.pk], 'trackball': []})
+        self.computer_mouse.altnames = 'mouse, trackball'
+        self.computer_mouse.save()
+        self.assertNumQueries(0, lambda: resolve_names(['rodent']))
+        self.assertEquals(resolve_names(['trackball']),
+                          {'trackball': [self.computer_mouse.pk]})
+
+    def test_resolve_node_cache(self):
+        resolve_node('rodent')
+        self.assertNumQueries(1, lambda: resolve_node('rodent'))
+
+    def test_rebuild(self):
+        NodeName.objects.all().delete()
+        self.assertEquals(rebuild(), 6)
+        self.assertEquals(resolve_names(['pointing device']),
+                          {'pointing device': [self.computer_mouse.pk]})
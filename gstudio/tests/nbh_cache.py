@@ -0,0 +1,94 @@
+"""Test cases for Gstudio's neighbourhood cache"""
+from django.test import TestCase
+
+from gstudio.models import Metatype
+from gstudio.models import Objecttype
+from gstudio.models import Relation
+from gstudio.models import Relationtype
+from gstudio.cache import nbh_cache
+from gstudio.cache import nbh_cache_key
+from gstudio.cache import invalidate_nbhs
+
+
+class NeighbourhoodCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.metatype = Metatype.objects.create(title='Metatype',
+                                                slug='metatype')
+        self.objecttype = Objecttype.objects.create(title='Dog', slug='dog')
+        self.other = Objecttype.objects.create(title='Cat', slug='cat')
+        invalidate_nbhs([self.metatype.pk, self.objecttype.pk,
+                         self.other.pk])
+
+    def get_nbh(self, model, pk):
+        return model.objects.get(pk=pk).get_nbh
+
+    def is_cached(self, node):
+        return nbh_cache.get(nbh_cache_key(node.pk)) is not None
+
+    def test_get_nbh_is_cached(self):
+        self.assertFalse(self.is_cached(self.objecttype))
+        nbh = self.get_nbh(Objecttype, self.objecttype.pk)
+        self.assertTrue(self.is_cached(self.objecttype))
+        self.assertEquals(self.get_nbh(Objecttype, self.objecttype.pk),
+                          nbh)
+
+    def test_m2m_invalidation(self):
+        self.get_nbh(Metatype, self.metatype.pk)
+        self.get_nbh(Objecttype, self.objecttype.pk)
+        self.get_nbh(Objecttype, self.other.pk)
+        self.objecttype.metatypes.add(self.metatype)
+        self.assertFalse(self.is_cached(self.metatype))
+        self.assertFalse(self.is_cached(self.objecttype))
+        self.assertTrue(self.is_cached(self.other))
+        self.assertEquals(
+            self.get_nbh(Metatype, self.metatype.pk)['contains_members'],
+            [self.objecttype.nodetype_ptr])
+
+    def test_save_invalidation(self):
+        self.get_nbh(Objecttype, self.objecttype.pk)
+        self.get_nbh(Objecttype, self.other.pk)
+        other = Objecttype.objects.get(pk=self.other.pk)
+        other.parent = Objecttype.objects.get(pk=self.objecttype.pk)
+        other.save()
+        self.assertFalse(self.is_cached(self.objecttype))
+        self.assertEquals(len(self.get_nbh(
+            Objecttype, self.objecttype.pk)['contains_subtypes']), 1)
+
+        self.get_nbh(Objecttype, self.objecttype.pk)
+        other = Objecttype.objects.get(pk=self.other.pk)
+        other.parent = None
+        other.save()
+        self.assertFalse(self.is_cached(self.objecttype))
+
+    def test_edge_invalidation(self):
+        self.get_nbh(Objecttype, self.objecttype.pk)
+        self.get_nbh(Objecttype, self.other.pk)
+        Relationtype.objects.create(
+            title='eats', slug='eats', inverse='eaten by',
+            left_subjecttype=self.objecttype,
+            right_subjecttype=self.metatype)
+        self.assertFalse(self.is_cached(self.objecttype))
+        self.assertTrue(self.is_cached(self.other))
+
+    def test_rename_invalidation(self):
+        eats = Relationtype.objects.create(
+            title='eats', slug='eats', inverse='eaten by',
+            left_subjecttype=self.objecttype,
+            right_subjecttype=self.objecttype)
+        Relation.objects.create(title='Dog eats Cat', slug='dog-eats-cat',
+                                left_subject=self.objecttype,
+                                relationtype=eats,
+                                right_subject=self.other)
+        self.get_nbh(Objecttype, self.other.pk)
+        invalidate_nbhs([self.objecttype.pk])
+        self.objecttype.title = 'Hound'
+        self.objecttype.save()
+        self.assertFalse(self.is_cached(self.other))
+
+        self.get_nbh(Objecttype, self.objecttype.pk)
+        self.get_nbh(Objecttype, self.other.pk)
+        eats.inverse = 'prey of'
+        eats.save()
+        self.assertFalse(self.is_cached(self.objecttype))
+        self.assertFalse(self.is_cached(self.other))
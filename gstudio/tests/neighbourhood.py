@@ -0,0 +1,129 @@
+"""Test cases for Gstudio's neighbourhood loader"""
+from django.test import TestCase
+from django.conf import settings
+from django.db import connection
+from django.db import reset_queries
+
+from gstudio.models import Metatype
+from gstudio.models import Nodetype
+from gstudio.models import Objecttype
+from gstudio.models import Relation
+from gstudio.models import Relationtype
+from gstudio.neighbourhood import UrlTemplate
+from gstudio.neighbourhood import DATE_SENTINELS
+from gstudio.neighbourhood import PATH_SENTINELS
+from gstudio.neighbourhood import NeighbourhoodLoader
+
+
+class NeighbourhoodLoaderTestCase(TestCase):
+
+    def setUp(self):
+        self.metatype = Metatype.objects.create(title='Metatype',
+                                                slug='metatype')
+        self.parent = Objecttype.objects.create(title='Animal',
+                                                slug='animal')
+        self.objecttype = Objecttype.objects.create(title='Dog', slug='dog',
+                                                    parent=self.parent)
+        self.objecttype.metatypes.add(self.metatype)
+        self.friend = Relationtype.objects.create(
+            title='friend of', slug='friend-of', inverse='friend of',
+            left_subjecttype=self.objecttype,
+            right_subjecttype=self.objecttype)
+
+    def add_neighbours(self, count):
+        start = self.objecttype.children.count()
+        for i in range(start, start + count):
+            subtype = Objecttype.objects.create(
+                title='Subtype %i' % i, slug='subtype-%i' % i,
+                parent=self.objecttype)
+            self.objecttype.prior_nodes.add(subtype)
+            Relation.objects.create(title='Relation %i' % i,
+                                    slug='relation-%i' % i,
+                                    left_subject=self.objecttype,
+                                    relationtype=self.friend,
+                                    right_subject=subtype)
+
+    def test_url_template(self):
+        template = UrlTemplate('gstudio_nodetype_detail', DATE_SENTINELS)
+        self.assertEquals(template(year='2011', month='01', day='02',
+                                   slug='dog'),
+                          '/2011/01/02/dog/')
+        template = UrlTemplate('gstudio_metatype_detail', PATH_SENTINELS)
+        self.assertEquals(template(path='metatype'),
+                          self.metatype.get_absolute_url())
+
+    def test_rendered_nbh(self):
+        self.add_neighbours(2)
+        nbh = NeighbourhoodLoader(self.objecttype).rendered_nbh()
+        self.assertEquals(nbh['title'], 'Dog')
+        self.assertEquals(nbh['member_of_metatypes'],
+                          {'Metatype': self.metatype.get_absolute_url()})
+        self.assertEquals(nbh['type_of'],
+                          {'Animal': self.parent.get_absolute_url()})
+        self.assertEquals(sorted(nbh['contains_subtypes'].keys()),
+                          ['Subtype 0', 'Subtype 1'])
+        self.assertEquals(sorted(nbh['priornodes'].keys()),
+                          ['Subtype 0', 'Subtype 1'])
+        self.assertEquals(sorted(nbh['relations']['friend of'].keys()),
+                          ['Subtype 0', 'Subtype 1'])
+        self.assertEquals(nbh['leftroles'],
+                          {'friend of': self.friend.get_absolute_url()})
+        self.assertEquals(nbh['rightroles'],
+                          {'friend of': self.friend.get_absolute_url()})
+
+    def test_rendered_nbh_queries_do_not_grow(self):
+        self.add_neighbours(1)
+        node = Objecttype.objects.get(pk=self.objecttype.pk)
+        queries = count_queries(
+            lambda: NeighbourhoodLoader(node).rendered_nbh())
+        self.add_neighbours(10)
+        node = Objecttype.objects.get(pk=self.objecttype.pk)
+        self.assertNumQueries(queries,
+                              lambda: NeighbourhoodLoader(node).rendered_nbh())
+
+    def test_objecttype_nbh(self):
+        self.add_neighbours(2)
+        nbh = self.objecttype.get_nbh
+        self.assertEquals(nbh['type_of'][0].pk, self.parent.pk)
+        self.assertEquals(len(nbh['contains_subtypes']), 2)
+        self.assertEquals(len(nbh['prior_nodes']), 2)
+        self.assertEquals(nbh['left_subjecttype_of'], [self.friend])
+        self.assertEquals(nbh['right_subjecttype_of'], [self.friend])
+        self.assertNumQueries(0, lambda: self.objecttype.get_nbh)
+
+    def test_nbh_in_bulk(self):
+        self.add_neighbours(2)
+        ids = [self.parent.pk, self.objecttype.pk]
+        nbhs = Nodetype.objects.nbh_in_bulk(ids)
+        self.assertEquals(sorted(nbhs.keys()), sorted(ids))
+        nbh = nbhs[self.objecttype.pk]
+        self.assertEquals(nbh['type_of'][0].pk, self.parent.pk)
+        self.assertEquals(len(nbh['contains_subtypes']), 2)
+        self.assertEquals(len(nbh['prior_nodes']), 2)
+        self.assertEquals(nbh['member_of_metatype'], [self.metatype])
+        self.assertEquals(nbh['left_subjecttype_of'], [self.friend])
+        self.assertEquals(nbhs[self.parent.pk]['type_of'], [None])
+        self.assertEquals(
+            [node.pk for node in nbhs[self.parent.pk]['contains_subtypes']],
+            [self.objecttype.pk])
+
+    def test_nbh_in_bulk_queries_do_not_grow(self):
+        self.add_neighbours(1)
+        queries = count_queries(
+            lambda: Nodetype.objects.nbh_in_bulk([self.objecttype.pk]))
+        self.add_neighbours(10)
+        ids = Nodetype.objects.values_list('id', flat=True)
+        self.assertNumQueries(queries,
+                              lambda: Nodetype.objects.nbh_in_bulk(ids))
+
+
+def count_queries(func):
+    """Return the number of queries executed by func"""
+    debug = settings.DEBUG
+    settings.DEBUG = True
+    reset_queries()
+    try:
+        func()
+        return len(connection.queries)
+    finally:
+        settings.DEBUG = debug
@@ -0,0 +1,61 @@
+"""Test cases for Gstudio's NID resolution"""
+from django.test import TestCase
+
+from gstudio.models import NID
+from gstudio.models import Metatype
+from gstudio.models import Objecttype
+from gstudio.models import Relationtype
+
+
+class NIDTestCase(TestCase):
+
+    def setUp(self):
+        self.metatype = Metatype.objects.create(title='Metatype',
+                                                slug='metatype')
+        self.dog = Objecttype.objects.create(title='Dog', slug='dog')
+        self.cat = Objecttype.objects.create(title='Cat', slug='cat')
+        self.friend = Relationtype.objects.create(
+            title='friend of', slug='friend-of', inverse='friend of',
+            left_subjecttype=self.dog, right_subjecttype=self.cat)
+
+    def test_nodemodel(self):
+        self.assertEquals(self.metatype.nodemodel, 'gstudio.metatype')
+        self.assertEquals(self.dog.nodemodel, 'gstudio.objecttype')
+        self.assertEquals(self.friend.nodemodel, 'gstudio.relationtype')
+        nid = NID.objects.get(pk=self.dog.pk)
+        self.assertEquals(nid.nodemodel, 'gstudio.objecttype')
+        nid.title = 'Doggy'
+        nid.save()
+        self.assertEquals(NID.objects.get(pk=self.dog.pk).nodemodel,
+                          'gstudio.objecttype')
+
+    def test_ref(self):
+        ref = NID.objects.get(pk=self.friend.pk).ref
+        self.assertEquals(ref.__class__, Relationtype)
+        self.assertEquals(ref.pk, self.friend.pk)
+        self.assertNumQueries(0, lambda: self.dog.ref)
+
+    def test_ref_without_nodemodel(self):
+        NID.objects.filter(pk=self.dog.pk).update(nodemodel='')
+        ref = NID.objects.get(pk=self.dog.pk).ref
+        self.assertEquals(ref.__class__, Objecttype)
+        self.assertEquals(NID.objects.get(pk=self.dog.pk).nodemodel,
+                          'gstudio.objecttype')
+
+    def test_resolve(self):
+        ids = [self.metatype.pk, self.dog.pk, self.cat.pk, self.friend.pk]
+        self.assertNumQueries(4, lambda: NID.objects.resolve(ids))
+        nodes = NID.objects.resolve(ids)
+        self.assertEquals(nodes[self.metatype.pk].__class__, Metatype)
+        self.assertEquals(nodes[self.dog.pk].__class__, Objecttype)
+        self.assertEquals(nodes[self.cat.pk].__class__, Objecttype)
+        self.assertEquals(nodes[self.friend.pk].__class__, Relationtype)
+
+    def test_resolve_instances(self):
+        nids = list(NID.objects.filter(
+            pk__in=[self.dog.pk, self.friend.pk]).order_by('-id'))
+        nodes = NID.objects.resolve_instances(nids)
+        self.assertEquals([node.pk for node in nodes],
+                          [self.friend.pk, self.dog.pk])
+        self.assertEquals([node.__class__ for node in nodes],
+                          [Relationtype, Objecttype])
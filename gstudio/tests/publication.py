@@ -0,0 +1,51 @@
+"""Test cases for Gstudio's publications"""
+from datetime import datetime
+from datetime import timedelta
+
+from django.test import TestCase
+from django.contrib.sites.models import Site
+
+from gstudio.models import Nodetype
+from gstudio.models import Publication
+from gstudio.managers import DRAFT
+from gstudio.managers import PUBLISHED
+from gstudio.publication import update_publications
+
+
+class PublicationTestCase(TestCase):
+
+    def setUp(self):
+        self.site = Site.objects.get_current()
+        self.other_site = Site.objects.create(domain='http://domain.com',
+                                              name='Domain.com')
+        self.nodetype = Nodetype.objects.create(
+            title='My nodetype', content='My content', slug='my-nodetype',
+            status=PUBLISHED)
+        self.nodetype.sites.add(self.site)
+
+    def sites(self):
+        return sorted(Publication.objects.filter(
+            nid=self.nodetype.pk).values_list('site', flat=True))
+
+    def test_signals(self):
+        self.assertEquals(self.sites(), [self.site.pk])
+        self.other_site.nodetypes.add(self.nodetype)
+        self.assertEquals(self.sites(), [self.site.pk, self.other_site.pk])
+        self.nodetype.sites.remove(self.site)
+        self.assertEquals(self.sites(), [self.other_site.pk])
+        self.nodetype.status = DRAFT
+        self.nodetype.save()
+        self.assertEquals(self.sites(), [])
+
+    def test_scheduled(self):
+        now = datetime.now()
+        Nodetype.objects.filter(pk=self.nodetype.pk).update(
+            end_publication=now - timedelta(hours=1))
+        self.assertEquals(Nodetype.published.count(), 1)
+        self.assertEquals(update_publications(), (0, 1))
+        self.assertEquals(Nodetype.published.count(), 0)
+        Nodetype.objects.filter(pk=self.nodetype.pk).update(
+            end_publication=now + timedelta(hours=1))
+        self.assertEquals(update_publications(Nodetype), (1, 0))
+        self.assertEquals(update_publications(), (0, 0))
+        self.assertEquals(Nodetype.published.count(), 1)
@@ -0,0 +1,64 @@
+"""Test cases for Gstudio's schema registry"""
+from django.test import TestCase
+
+from gstudio.models import Relation
+from gstudio.models import Attribute
+from gstudio.models import Objecttype
+from gstudio.models import Relationtype
+from gstudio.models import Attributetype
+from gstudio.cache import schema_cache
+from gstudio.cache import types_generation
+from gstudio.cache import TYPES_GENERATION_KEY
+from gstudio.cache import expire_local_generations
+from gstudio.registry import registry
+
+
+class SchemaRegistryTestCase(TestCase):
+
+    def setUp(self):
+        registry.clear()
+        self.dog = Objecttype.objects.create(title='Dog', slug='dog')
+        self.cat = Objecttype.objects.create(title='Cat', slug='cat')
+        self.friend = Relationtype.objects.create(
+            title='friend of', slug='friend-of', inverse='befriended by',
+            left_subjecttype=self.dog, right_subjecttype=self.cat)
+        self.age = Attributetype.objects.create(
+            title='age', slug='age', subjecttype=self.dog)
+        Relation.objects.create(title='Dog friend of Cat', slug='relation',
+                                left_subject=self.dog,
+                                relationtype=self.friend,
+                                right_subject=self.cat)
+        Attribute.objects.create(title='age of Dog', slug='attribute',
+                                 subject=self.dog, attributetype=self.age,
+                                 svalue='4')
+
+    def test_load(self):
+        self.assertEquals(registry.relationtypes.keys(), [self.friend.pk])
+        self.assertEquals(registry.attributetypes.keys(), [self.age.pk])
+        relationtype = registry.relationtype(self.friend.pk)
+        self.assertEquals(relationtype.inverse, 'befriended by')
+        self.assertNumQueries(0, lambda: relationtype.left_subjecttype)
+        self.assertNumQueries(0, lambda: registry.attributetype(self.age.pk))
+
+    def test_attach(self):
+        registry.load()
+        relations = registry.attach(Relation.objects.all())
+        attributes = registry.attach(Attribute.objects.all())
+        self.assertNumQueries(0, lambda: [relation.relationtype.inverse
+                                          for relation in relations])
+        self.assertNumQueries(0, lambda: [attribute.attributetype.dataType
+                                          for attribute in attributes])
+
+    def test_invalidation(self):
+        registry.load()
+        self.friend.inverse = 'friend of'
+        self.friend.save()
+        self.assertEquals(registry.relationtype(self.friend.pk).inverse,
+                          'friend of')
+
+    def test_generation_checked_once(self):
+        registry.load()
+        schema_cache.set(TYPES_GENERATION_KEY, types_generation() + 1)
+        self.assertNumQueries(0, lambda: registry.relationtype(self.friend.pk))
+        expire_local_generations()
+        self.assertNumQueries(2, lambda: registry.relationtype(self.friend.pk))
@@ -0,0 +1,86 @@
+"""Test cases for Gstudio's inherited schema"""
+from django.test import TestCase
+
+from gstudio.models import Attribute
+from gstudio.models import Objecttype
+from gstudio.models import Relationtype
+from gstudio.models import Attributetype
+from gstudio.cache import schema_generation
+from gstudio.cache import invalidate_schemas
+from gstudio.tests.neighbourhood import count_queries
+
+
+class InheritedSchemaTestCase(TestCase):
+
+    def setUp(self):
+        invalidate_schemas()
+        self.animal = Objecttype.objects.create(title='Animal',
+                                                slug='animal')
+        self.dog = Objecttype.objects.create(title='Dog', slug='dog',
+                                             parent=self.animal)
+        self.puppy = Objecttype.objects.create(title='Puppy', slug='puppy',
+                                               parent=self.dog)
+        self.age = Attributetype.objects.create(
+            title='age', slug='age', subjecttype=self.animal)
+        self.friend = Relationtype.objects.create(
+            title='friend of', slug='friend-of', inverse='friend of',
+            left_subjecttype=self.animal, right_subjecttype=self.dog)
+
+    def get(self, node):
+        return Objecttype.objects.get(pk=node.pk)
+
+    def test_get_possible_attributetypes(self):
+        self.assertEquals(self.get(self.animal).get_possible_attributetypes,
+                          [])
+        self.assertEquals(self.get(self.dog).get_possible_attributetypes,
+                          [self.age])
+        self.assertEquals(self.get(self.puppy).get_possible_attributetypes,
+                          [self.age])
+
+    def test_get_possible_reltypes(self):
+        reltypes = self.get(self.dog).get_possible_reltypes()
+        self.assertEquals(reltypes['possible_leftroles'], [])
+        self.assertEquals(reltypes['possible_rightroles'], [self.friend])
+        reltypes = self.get(self.puppy).get_possible_reltypes()
+        self.assertEquals(reltypes['possible_leftroles'], [self.friend])
+        self.assertEquals(reltypes['possible_rightroles'], [self.friend])
+
+    def test_schema_is_cached(self):
+        puppy = self.get(self.puppy)
+        puppy.get_possible_attributetypes
+        self.assertNumQueries(0, lambda: puppy.get_possible_attributetypes)
+
+    def test_queries_do_not_grow_with_depth(self):
+        queries = count_queries(
+            lambda: self.get(self.puppy).get_possible_attributetypes)
+        parent = self.puppy
+        for i in range(5):
+            parent = Objecttype.objects.create(
+                title='Level %i' % i, slug='level-%i' % i, parent=parent)
+        invalidate_schemas()
+        self.assertNumQueries(
+            queries, lambda: self.get(parent).get_possible_attributetypes)
+
+    def test_invalidation(self):
+        self.get(self.puppy).get_possible_attributetypes
+        size = Attributetype.objects.create(
+            title='size', slug='size', subjecttype=self.dog)
+        self.assertEquals(self.get(self.puppy).get_possible_attributetypes,
+                          [self.age, size])
+        puppy = self.get(self.puppy)
+        puppy.parent = self.get(self.animal)
+        puppy.save()
+        self.assertEquals(self.get(self.puppy).get_possible_attributetypes,
+                          [self.age])
+
+    def test_data_invalidation(self):
+        self.get(self.puppy).get_possible_attributetypes
+        generation = schema_generation()
+        age = Attribute.objects.create(title='age of Dog', slug='age-of-dog',
+                                       subject=self.dog,
+                                       attributetype=self.age, svalue='4')
+        self.assertEquals(schema_generation(), generation)
+        self.assertEquals(self.get(self.puppy).get_possible_attributes,
+                          [age])
+        puppy = self.get(self.puppy)
+        self.assertNumQueries(0, lambda: puppy.get_possible_attributetypes)
@@ -0,0 +1,143 @@
+"""Test cases for Gstudio's graph snapshots"""
+import shutil
+import tempfile
+from imp import find_module
+from datetime import datetime
+
+from django.test import TestCase
+
+from gstudio.models import Relation
+from gstudio.models import Objecttype
+from gstudio.models import Relationtype
+from gstudio.models import GraphChange
+
+try:
+    find_module('numpy')
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+class GraphSnapshotTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.animal = Objecttype.objects.create(title='Animal',
+                                                slug='animal')
+        self.dog = Objecttype.objects.create(title='Dog', slug='dog',
+                                             parent=self.animal)
+        self.cat = Objecttype.objects.create(title='Cat', slug='cat',
+                                             parent=self.animal)
+        self.bird = Objecttype.objects.create(title='Bird', slug='bird')
+        self.chases = Relationtype.objects.create(
+            title='chases', slug='chases', inverse='chased by',
+            left_subjecttype=self.animal, right_subjecttype=self.animal)
+        self.relate(self.dog, self.chases, self.cat)
+        self.dog.prior_nodes.add(self.bird)
+        from gstudio.snapshot import build_snapshot
+        build_snapshot(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def relate(self, left, relationtype, right):
+        return Relation.objects.create(
+            title='%s %s %s' % (left, relationtype, right),
+            slug='%s-%s' % (left.slug, right.slug), left_subject=left,
+            relationtype=relationtype, right_subject=right)
+
+    def get_snapshot(self):
+        from gstudio.snapshot import get_snapshot
+        return get_snapshot(self.directory)
+
+    def test_neighbours(self):
+        snapshot = self.get_snapshot()
+        self.assertEquals(snapshot.neighbours(self.dog.pk, 'out'),
+                          set([(self.animal.pk, GraphChange.PARENT),
+                               (self.cat.pk, self.chases.pk),
+                               (self.bird.pk, GraphChange.PRIOR)]))
+        self.assertEquals(snapshot.neighbours(self.cat.pk, 'in'),
+                          set([(self.dog.pk, self.chases.pk)]))
+        self.assertEquals(snapshot.neighbours(
+            self.animal.pk, 'in', [GraphChange.PARENT]),
+            set([(self.dog.pk, GraphChange.PARENT),
+                 (self.cat.pk, GraphChange.PARENT)]))
+
+    def test_traversals(self):
+        from gstudio.snapshot import k_hop
+        from gstudio.snapshot import reachable
+        from gstudio.snapshot import shortest_path
+
+        snapshot = self.get_snapshot()
+        self.assertEquals(k_hop(snapshot, self.cat.pk, 1),
+                          {self.cat.pk: 0, self.animal.pk: 1,
+                           self.dog.pk: 1})
+        self.assertEquals(k_hop(snapshot, self.cat.pk, 2)[self.bird.pk], 2)
+        self.assertEquals(shortest_path(snapshot, self.bird.pk,
+                                        self.cat.pk),
+                          [self.bird.pk, self.dog.pk, self.cat.pk])
+        self.assertFalse(reachable(snapshot, self.cat.pk, self.dog.pk,
+                                   edgetypes=[self.chases.pk]))
+
+    def test_refresh(self):
+        snapshot = self.get_snapshot()
+        relation = self.relate(self.cat, self.chases, self.bird)
+        self.dog.prior_nodes.remove(self.bird)
+        snapshot = self.get_snapshot()
+        self.assertEquals(snapshot.neighbours(self.cat.pk, 'out'),
+                          set([(self.animal.pk, GraphChange.PARENT),
+                               (self.bird.pk, self.chases.pk)]))
+        self.assertEquals(snapshot.neighbours(
+            self.dog.pk, 'out', [GraphChange.PRIOR]), set())
+        relation.delete()
+        self.bird.delete()
+        snapshot = self.get_snapshot()
+        self.assertEquals(snapshot.neighbours(self.cat.pk, 'out'),
+                          set([(self.animal.pk, GraphChange.PARENT)]))
+
+    def test_rebuild(self):
+        from gstudio.snapshot import build_snapshot
+
+        snapshot = self.get_snapshot()
+        self.relate(self.cat, self.chases, self.bird)
+        build_snapshot(self.directory)
+        rebuilt = self.get_snapshot()
+        self.assertNotEquals(rebuilt.name, snapshot.name)
+        self.assertEquals(rebuilt.added['out'], {})
+        self.assertTrue((self.bird.pk, self.chases.pk) in
+                        rebuilt.neighbours(self.cat.pk, 'out'))
+
+    def test_not_built(self):
+        from gstudio.snapshot import get_snapshot
+
+        directory = tempfile.mkdtemp()
+        try:
+            self.assertEquals(get_snapshot(directory), None)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_late_change(self):
+        GraphChange.objects.log([(self.cat.pk, self.chases.pk,
+                                  self.bird.pk, True)])
+        late = GraphChange.objects.version()
+        GraphChange.objects.filter(pk=late).update(
+            creation_date=datetime(2000, 1, 1))
+        self.dog.prior_nodes.remove(self.bird)
+        from gstudio.snapshot import build_snapshot
+        build_snapshot(self.directory)
+        snapshot = self.get_snapshot()
+        self.assertEquals(snapshot.neighbours(self.cat.pk, 'out'),
+                          set([(self.animal.pk, GraphChange.PARENT)]))
+        GraphChange.objects.filter(pk=late).update(
+            creation_date=datetime.now())
+        snapshot = self.get_snapshot()
+        self.assertEquals(snapshot.neighbours(self.cat.pk, 'out'),
+                          set([(self.animal.pk, GraphChange.PARENT),
+                               (self.bird.pk, self.chases.pk)]))
+
+    def test_prune(self):
+        self.relate(self.cat, self.chases, self.bird)
+        version = GraphChange.objects.version()
+        GraphChange.objects.prune(version)
+        self.assertEquals(GraphChange.objects.version(), version)
+        self.assertEquals(GraphChange.objects.count(), 1)
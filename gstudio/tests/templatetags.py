@@ -17,6 +17,7 @@ from tagging.models import Tag
 from gstudio.models import Nodetype
 from gstudio.models import Author
 from gstudio.models import Metatype
+from gstudio.models import NodeScore
 from gstudio.managers import DRAFT
 from gstudio.managers import PUBLISHED
 from gstudio.templatetags.gstudio_tags import get_authors
@@ -28,6 +29,7 @@ from gstudio.templatetags.gstudio_tags import get_recent_nodetypes
 from gstudio.templatetags.gstudio_tags import get_random_nodetypes
 from gstudio.templatetags.gstudio_tags import gstudio_breadcrumbs
 from gstudio.templatetags.gstudio_tags import get_popular_nodetypes
+from gstudio.templatetags.gstudio_tags import get_important_nodetypes
 from gstudio.templatetags.gstudio_tags import get_similar_nodetypes
 from gstudio.templatetags.gstudio_tags import get_recent_comments
 from gstudio.templatetags.gstudio_tags import get_recent_linkbacks
@@ -149,6 +151,34 @@ class TemplateTagsTestCase(TestCase):
         context = get_popular_nodetypes(3)
         self.assertEquals(context['nodetypes'], [second_nodetype])
 
+    def test_get_important_nodetypes(self):
+        context = get_important_nodetypes()
+        self.assertEquals(len(context['nodetypes']), 0)
+        self.assertEquals(context['template'],
+                          'gstudio/tags/important_nodetypes.html')
+
+        self.publish_nodetype()
+        params = {'title': 'My second nodetype',
+                  'content': 'My second content',
+                  'tags': 'gstudio, test',
+                  'status': PUBLISHED,
+                  'slug': 'my-second-nodetype'}
+        second_nodetype = Nodetype.objects.create(**params)
+        second_nodetype.sites.add(Site.objects.get_current())
+        NodeScore.objects.create(nid=second_nodetype.pk, pagerank=0.6,
+                                 in_degree=1, out_degree=0, betweenness=0)
+        NodeScore.objects.create(nid=self.nodetype.pk, pagerank=0.4,
+                                 in_degree=0, out_degree=1, betweenness=0)
+        context = get_important_nodetypes(3, 'pagerank',
+                                          'custom_template.html')
+        self.assertEquals(list(context['nodetypes']),
+                          [second_nodetype, self.nodetype])
+        self.assertEquals(context['template'], 'custom_template.html')
+        context = get_important_nodetypes(3, 'out_degree')
+        self.assertEquals(list(context['nodetypes']),
+                          [self.nodetype, second_nodetype])
+        self.assertRaises(ValueError, get_important_nodetypes, 3, 'title')
+
     def test_get_similar_nodetypes(self):
         self.publish_nodetype()
         source_context = Context({'object': self.nodetype})
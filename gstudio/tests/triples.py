@@ -0,0 +1,54 @@
+"""Test cases for Gstudio's triple patterns"""
+from django.test import TestCase
+
+from gstudio.models import Relation
+from gstudio.models import Attribute
+from gstudio.models import Objecttype
+from gstudio.models import Relationtype
+from gstudio.models import Attributetype
+from gstudio.triples import triples
+from gstudio.triples import attribute_triples
+
+
+class TriplesTestCase(TestCase):
+
+    def setUp(self):
+        self.dog = Objecttype.objects.create(title='Dog', slug='dog')
+        self.cat = Objecttype.objects.create(title='Cat', slug='cat')
+        self.bird = Objecttype.objects.create(title='Bird', slug='bird')
+        self.friend = Relationtype.objects.create(
+            title='friend of', slug='friend-of', inverse='friend of',
+            left_subjecttype=self.dog, right_subjecttype=self.dog)
+        self.chases = Relationtype.objects.create(
+            title='chases', slug='chases', inverse='chased by',
+            left_subjecttype=self.dog, right_subjecttype=self.dog)
+        self.age = Attributetype.objects.create(
+            title='age', slug='age', subjecttype=self.dog)
+        for i, (s, p, o) in enumerate([(self.dog, self.friend, self.cat),
+                                       (self.dog, self.chases, self.bird),
+                                       (self.cat, self.chases, self.bird)]):
+            Relation.objects.create(title='Relation %i' % i,
+                                    slug='relation-%i' % i, left_subject=s,
+                                    relationtype=p, right_subject=o)
+        Attribute.objects.create(title='age of Dog', slug='age-of-dog',
+                                 subject=self.dog, attributetype=self.age,
+                                 svalue='4')
+
+    def test_triples(self):
+        self.assertEquals(len(triples()), 3)
+        self.assertEquals(list(triples(s=self.dog, p=self.friend)),
+                          [(self.dog.pk, self.friend.pk, self.cat.pk)])
+        self.assertEquals(sorted(triples(p=self.chases.pk, o=self.bird)),
+                          sorted([(self.dog.pk, self.chases.pk, self.bird.pk),
+                                  (self.cat.pk, self.chases.pk,
+                                   self.bird.pk)]))
+        self.assertEquals(list(triples(o=self.cat)),
+                          [(self.dog.pk, self.friend.pk, self.cat.pk)])
+        self.assertEquals(len(triples(s=[self.dog, self.cat.pk])), 3)
+        self.assertEquals(len(triples(
+            s=Objecttype.objects.filter(slug='cat'))), 1)
+
+    def test_attribute_triples(self):
+        self.assertEquals(list(attribute_triples(p=self.age, o='4')),
+                          [(self.dog.pk, self.age.pk, u'4')])
+        self.assertEquals(list(attribute_triples(o=['5', '6'])), [])
@@ -0,0 +1,97 @@
+"""Test cases for Gstudio's typed attribute values"""
+from datetime import datetime
+
+from django.test import TestCase
+
+from gstudio.models import Attribute
+from gstudio.models import Objecttype
+from gstudio.models import Attributetype
+from gstudio.models import AttributeValue
+from gstudio.values import where
+from gstudio.values import between
+from gstudio.values import convert
+from gstudio.values import rebuild
+
+
+class AttributeValuesTestCase(TestCase):
+
+    def setUp(self):
+        self.city = Objecttype.objects.create(title='City', slug='city')
+        self.population = Attributetype.objects.create(
+            title='population', slug='population', subjecttype=self.city,
+            dataType='3')
+        self.founded = Attributetype.objects.create(
+            title='founded', slug='founded', subjecttype=self.city,
+            dataType='1')
+        self.cities = {}
+        for title, population, founded in (
+            ('Delhi', '16000000', '1052-01-01'),
+            ('Pune', '3100000', '1700-01-01'),
+            ('Pokhara', '400000', 'unknown')):
+            city = Objecttype.objects.create(title=title,
+                                             slug=title.lower())
+            self.cities[title] = city
+            for attributetype, value in ((self.population, population),
+                                         (self.founded, founded)):
+                Attribute.objects.create(
+                    title='%s of %s' % (attributetype.title, title),
+                    slug='%s-of-%s' % (attributetype.slug, title.lower()),
+                    subject=city, attributetype=attributetype,
+                    svalue=value)
+
+    def subjects(self, queryset):
+        return sorted(queryset.values_list('subject', flat=True))
+
+    def test_convert(self):
+        self.assertEquals(convert('42', '3'), 42.0)
+        self.assertEquals(convert('many', '3'), None)
+        self.assertEquals(convert('Yes', '9'), True)
+        self.assertEquals(convert('2012-03-01', '11'),
+                          datetime(2012, 3, 1))
+        self.assertEquals(convert('10:30', '13').hour, 10)
+        self.assertEquals(convert(42, '1'), u'42')
+
+    def test_index(self):
+        self.assertEquals(AttributeValue.objects.count(), 6)
+        value = AttributeValue.objects.get(
+            attributetype=self.population.pk,
+            subject=self.cities['Pune'].pk)
+        self.assertEquals(value.number, 3100000.0)
+        self.assertEquals(value.text, u'3100000')
+        Attribute.objects.filter(subject=self.cities['Pune'])[0].delete()
+        self.assertEquals(AttributeValue.objects.count(), 5)
+
+    def test_where(self):
+        delhi, pune = self.cities['Delhi'].pk, self.cities['Pune'].pk
+        self.assertEquals(self.subjects(where(self.population.pk, '>',
+                                              '1000000')),
+                          sorted([delhi, pune]))
+        self.assertEquals(self.subjects(where(self.population.pk, '=',
+                                              '3100000')), [pune])
+        self.assertEquals(len(where(self.population.pk, '!=', '3100000')),
+                          2)
+        self.assertRaises(ValueError, where, self.population.pk, '<', 'x')
+
+    def test_between(self):
+        self.assertEquals(self.subjects(between(self.population.pk,
+                                                300000, 4000000)),
+                          sorted([self.cities['Pune'].pk,
+                                  self.cities['Pokhara'].pk]))
+        self.assertEquals(len(between(self.population.pk)), 3)
+
+    def test_datatype_change(self):
+        self.assertEquals(AttributeValue.objects.filter(
+            attributetype=self.founded.pk, date__isnull=False).count(), 0)
+        self.founded.dataType = '11'
+        self.founded.save()
+        self.assertEquals(self.subjects(between(self.founded.pk,
+                                                high='1800-01-01')),
+                          sorted([self.cities['Delhi'].pk,
+                                  self.cities['Pune'].pk]))
+
+    def test_rebuild(self):
+        AttributeValue.objects.all().delete()
+        self.assertEquals(rebuild(), 6)
+        self.assertEquals(self.subjects(where(self.population.pk, '<',
+                                              '500000')),
+                          [self.cities['Pokhara'].pk])
@@ -1,4 +1,5 @@
 """Test cases for Gstudio's views"""
+import json
 from datetime import datetime
 
 from django.conf import settings
@@ -154,6 +155,18 @@ class GstudioViewsTestCase(ViewsBaseCase):
                                     {'password': 'password'})
         self.assertEquals(response.status_code, 302)
 
+    def test_gstudio_graph_nbh_json(self):
+        nodetype = self.create_published_nodetype()
+        draft = Nodetype.objects.create(title='Draft', slug='draft')
+        url = '/graphs/graph_nbh_json/?nids=%s,%s' % (nodetype.pk, draft.pk)
+        response = self.client.get(url)
+        self.assertEquals(json.loads(response.content).keys(),
+                          [str(nodetype.pk)])
+        nodetype.password = 'password'
+        nodetype.save()
+        response = self.client.get(url)
+        self.assertEquals(json.loads(response.content), {})
+
     def test_gstudio_nodetype_channel(self):
         self.check_publishing_context('/channel-test/', 2, 3)
 
@@ -0,0 +1,44 @@
+"""Triple patterns over the relations and attributes of Gstudio"""
+from django.db.models.query import QuerySet
+
+from gstudio.models import Relation
+from gstudio.models import Attribute
+
+RELATION_TRIPLE = ('left_subject', 'relationtype', 'right_subject')
+ATTRIBUTE_TRIPLE = ('subject', 'attributetype', 'svalue')
+
+
+def pattern_lookup(field, value):
+    """Return the lookup matching a term of a pattern,
+    a value, an instance or a collection of them"""
+    if isinstance(value, QuerySet):
+        return {'%s__in' % field: value.values('pk')}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return {'%s__in' % field: [getattr(item, 'pk', item)
+                                   for item in value]}
+    return {field: getattr(value, 'pk', value)}
+
+
+def match(queryset, fields, terms):
+    """Return the tuples of the fields of the rows
+    of queryset matching the terms, None matching anything"""
+    lookups = {}
+    for field, term in zip(fields, terms):
+        if term is not None:
+            lookups.update(pattern_lookup(field, term))
+    return queryset.filter(**lookups).order_by().values_list(*fields)
+
+
+def triples(s=None, p=None, o=None):
+    """Return the (left_subject_id, relationtype_id, right_subject_id)
+    tuples of the relations matching the pattern. Each term is None,
+    an id, an instance or a collection of them.
+    The result is lazy and can be sliced."""
+    return match(Relation.objects.all(), RELATION_TRIPLE, (s, p, o))
+
+
+def attribute_triples(s=None, p=None, o=None):
+    """Return the (subject_id, attributetype_id, svalue)
+    tuples of the attributes matching the pattern, o being
+    a value or a collection of values"""
+    return match(Attribute.objects.all(), ATTRIBUTE_TRIPLE, (s, p, o))
@@ -2,13 +2,15 @@
 from django.conf.urls.defaults import url
 from django.conf.urls.defaults import patterns
 
-from gstudio.models import Nodetype
-from gstudio.settings import PAGINATION
-from gstudio.settings import ALLOW_EMPTY
-from gstudio.settings import ALLOW_FUTURE
-
 urlpatterns = patterns(
     'gstudio.views.graphs',
     url(r'^graph_json/(?P<node_id>\d+)$','graph_json', name='graph_json_d3'), 
+    url(r'^graph_ego_json/(?P<node_id>\d+)$','graph_ego_json',
+        name='graph_ego_json'),
+    url(r'^graph_expand_json/(?P<node_id>\d+)$','graph_expand_json',
+        name='graph_expand_json'),
     url(r'^graph/(?P<node_id>\d+)$','force_graph', name='force_graph_d3'), 
+    url(r'^graph_nbh_json/$','graph_nbh_json', name='graph_nbh_json'), 
+    url(r'^facets_json/(?P<node_id>\d+)$','facets_json',
+        name='facets_json'),
     )
@@ -0,0 +1,182 @@
+"""Typed values of the attributes of Gstudio
+
+The value of an attribute is stored as text in its svalue field, and
+as a typed value in the table of its datatype subclass, if any. The
+AttributeValue table stores it once more, converted to the datatype of
+its attribute type, in a column per kind of type indexed with the
+attribute type, so that the attributes are compared and ranged over by
+their values with indexed scans."""
+from datetime import date
+from datetime import time
+from datetime import datetime
+
+from django.utils.encoding import force_unicode
+
+from gstudio.models import NID
+from gstudio.models import Attribute
+from gstudio.models import AttributeValue
+from gstudio.registry import registry
+
+NUMBER = 'number'
+DATE = 'date'
+TIME = 'time'
+BOOLEAN = 'boolean'
+TEXT = 'text'
+
+COLUMNS = {'3': NUMBER, '5': NUMBER, '6': NUMBER, '7': NUMBER, '8': NUMBER,
+           '9': BOOLEAN, '10': BOOLEAN, '11': DATE, '12': DATE, '13': TIME}
+DATE_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d',
+                '%Y-%m-%dT%H:%M:%S', '%d/%m/%Y')
+TIME_FORMATS = ('%H:%M:%S', '%H:%M')
+TRUE_VALUES = ('1', 'true', 'yes', 'on', 't', 'y')
+FALSE_VALUES = ('0', 'false', 'no', 'off', 'f', 'n')
+LOOKUPS = {'=': 'exact', '<': 'lt', '<=': 'lte', '>': 'gt', '>=': 'gte'}
+CHUNK_SIZE = 250
+
+
+def column(datatype):
+    """Return the column of the values of a datatype"""
+    return COLUMNS.get(datatype, TEXT)
+
+
+def parse_datetime(value, formats):
+    """Return the datetime of the first format parsing value"""
+    for format in formats:
+        try:
+            return datetime.strptime(value, format)
+        except ValueError:
+            pass
+    return None
+
+
+def convert(value, datatype):
+    """Return a value, serialized or not, converted
+    for the column of its datatype, None if it cannot be"""
+    if value is None:
+        return None
+    kind = column(datatype)
+    if kind == NUMBER:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    if kind == BOOLEAN:
+        if isinstance(value, bool):
+            return value
+        value = force_unicode(value).strip().lower()
+        if value in TRUE_VALUES:
+            return True
+        if value in FALSE_VALUES:
+            return False
+        return None
+    if kind == DATE:
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, date):
+            return datetime(value.year, value.month, value.day)
+        return parse_datetime(force_unicode(value).strip(), DATE_FORMATS)
+    if kind == TIME:
+        if isinstance(value, time):
+            return value
+        parsed = parse_datetime(force_unicode(value).strip(), TIME_FORMATS)
+        return parsed and parsed.time()
+    return force_unicode(value)[:255]
+
+
+def datatype_of(attributetype_id):
+    """Return the datatype of an attribute type"""
+    return registry.attributetype(attributetype_id).dataType
+
+
+def index_attribute(attribute):
+    """Store the typed value of an attribute, taken from the field
+    of its datatype subclass if any, else from its svalue"""
+    datatype = datatype_of(attribute.attributetype_id)
+    value = getattr(attribute, 'value', None)
+    if value is None:
+        value = attribute.svalue
+    fields = {'subject': attribute.subject_id,
+              'attributetype': attribute.attributetype_id,
+              'text': force_unicode(attribute.svalue)[:255],
+              NUMBER: None, DATE: None, TIME: None, BOOLEAN: None}
+    kind = column(datatype)
+    if kind != TEXT:
+        fields[kind] = convert(value, datatype)
+    updated = AttributeValue.objects.filter(
+        attribute=attribute.pk).update(**fields)
+    if not updated:
+        AttributeValue.objects.create(attribute=attribute.pk, **fields)
+
+
+def unindex_attribute(pk):
+    """Remove the typed value of a deleted attribute"""
+    AttributeValue.objects.filter(attribute=pk).delete()
+
+
+def index_attributes(queryset):
+    """Store the typed values of the attributes of a queryset,
+    resolved to their subclasses by chunks, and return their number"""
+    pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+    for i in range(0, len(pks), CHUNK_SIZE):
+        for attribute in NID.objects.resolve_instances(
+            Attribute.objects.filter(pk__in=pks[i:i + CHUNK_SIZE])):
+            index_attribute(attribute)
+    return len(pks)
+
+
+def reindex_attributetype(attributetype_id):
+    """Store again the typed values of the attributes of an attribute
+    type, after its datatype changed, and return their number"""
+    return index_attributes(Attribute.objects.filter(
+        attributetype=attributetype_id))
+
+
+def rebuild():
+    """Store again the typed values of all the attributes
+    and return their number"""
+    AttributeValue.objects.all().delete()
+    return index_attributes(Attribute.objects.all())
+
+
+def lookups(attributetype_id, operator, value):
+    """Return the column of the values of an attribute type and the
+    lookup comparing them to value by the operator, one of =, <, <=,
+    > and >=. Raise ValueError if value is not of the datatype"""
+    datatype = datatype_of(attributetype_id)
+    kind = column(datatype)
+    converted = convert(value, datatype)
+    if converted is None:
+        raise ValueError('%r is not a value of %s' % (value, kind))
+    if operator not in LOOKUPS:
+        raise ValueError('Unknown operator %s' % operator)
+    return kind, {'%s__%s' % (kind, LOOKUPS[operator]): converted}
+
+
+def compare(queryset, attributetype_id, operator, value):
+    """Return the AttributeValue rows of the queryset whose value, of
+    the datatype of the attribute type, compares to value by the
+    operator, one of =, !=, <, <=, > and >="""
+    if operator == '!=':
+        kind, lookup = lookups(attributetype_id, '=', value)
+        return queryset.filter(**{'%s__isnull' % kind: False}).exclude(
+            **lookup)
+    kind, lookup = lookups(attributetype_id, operator, value)
+    return queryset.filter(**lookup)
+
+
+def where(attributetype_id, operator, value):
+    """Return the AttributeValue rows of an attribute type whose value
+    compares to value by the operator, one of =, !=, <, <=, > and >="""
+    return compare(AttributeValue.objects.filter(
+        attributetype=attributetype_id), attributetype_id, operator, value)
+
+
+def between(attributetype_id, low=None, high=None):
+    """Return the AttributeValue rows of an attribute type
+    whose value is between low and high, both included"""
+    queryset = AttributeValue.objects.filter(attributetype=attributetype_id)
+    for operator, value in (('>=', low), ('<=', high)):
+        if value is not None:
+            queryset = queryset.filter(
+                **lookups(attributetype_id, operator, value)[1])
+    return queryset
@@ -1,53 +1,213 @@
 """Views for Gstudio nodetypes"""
-from django.shortcuts import redirect 
+import json
+
 from django.shortcuts import render_to_response
 from django.shortcuts import get_object_or_404
+from django.http import Http404
 from django.http import HttpResponse
-from gstudio.gnowql import *
-#import networkx as nx
-#import d3 
-import json
-import os
- 
-from gstudio.views.decorators import protect_nodetype
-from gstudio.views.decorators import update_queryset
+from django.http import HttpResponseBadRequest
+from django.core.exceptions import ImproperlyConfigured
 
-def graph_json(request, node_id): 
+from gstudio.models import NID
+from gstudio.models import Metatype
+from gstudio.models import Nodetype
+from gstudio.neighbourhood import serialize_nbh
+from gstudio.neighbourhood import get_gbobject_model
+from gstudio.neighbourhood import nodetype_nbh_in_bulk
+from gstudio.neighbourhood import gbobject_nbh_in_bulk
+from gstudio.egonet import ego_network
+from gstudio.egonet import stream_ego_network
+from gstudio.graph_json import graph
+from gstudio.graph_json import stream_graph_json
+from gstudio.expand import expand
+from gstudio.expand import serialize_page
+from gstudio.facets import get_facets
+from gstudio.facets import RELATION
+from gstudio.facets import INVERSE
+from gstudio.facets import OTHER
+from gstudio.settings import NBH_BULK_MAX_NODES
+from gstudio.settings import EGONET_RADIUS
+from gstudio.settings import EGONET_MAX_RADIUS
+from gstudio.settings import EGONET_MAX_NODES
+from gstudio.settings import GRAPH_PAGE_SIZE
+from gstudio.settings import GRAPH_MAX_PAGE_SIZE
+
+CHUNK_SIZE = 250
+
+def graph_json(request, node_id):
+    """Return the graph JSON of a node and of the neighbours the
+    request may see, with the positions of its nodes laid out when
+    NumPy is available"""
+    node = get_object_or_404(NID, id=node_id).ref
+    viewable = viewable_ids(request, graph(node)[0])
+    if node.pk not in viewable:
+        raise Http404
+    try:
+        from gstudio.layout import graph_positions
+    except ImproperlyConfigured:
+        positions = None
+    else:
+        positions = graph_positions(node)
+    return HttpResponse(stream_graph_json(node, positions, viewable),
+                        "application/json")
+
+def viewable_nodes(request, queryset, password_key):
+    """Return the nodes of a queryset the request may see, as the
+    detail views do, leaving out the nodes needing a login or a
+    password not given in the session"""
+    if not request.user.is_authenticated():
+        queryset = queryset.filter(login_required=False)
+    return [node for node in queryset if not node.password or
+            node.password == request.session.get(password_key % node.pk)]
+
+def viewable_ids(request, ids):
+    """Return the set of the ids of the nodes the request may see
+    among ids: the metatypes, and the published nodetypes and gbobjects
+    not needing a login or a password not given in the session"""
+    ids = list(set(ids))
+    managers = [(Nodetype.published, 'gstudio_nodetype_%s_password')]
+    gbobject = get_gbobject_model()
+    if gbobject is not None:
+        managers.append((gbobject.published,
+                         'objectapp_gbobject_%s_password'))
+
+    viewable = set()
+    for i in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[i:i + CHUNK_SIZE]
+        viewable.update(Metatype.objects.filter(pk__in=chunk).values_list(
+            'pk', flat=True))
+        for manager, password_key in managers:
+            for pk, login_required, password in manager.filter(
+                pk__in=chunk).values_list('pk', 'login_required', 'password'):
+                if login_required and not request.user.is_authenticated():
+                    continue
+                if password and \
+                       password != request.session.get(password_key % pk):
+                    continue
+                viewable.add(pk)
+    return viewable
+
+def graph_nbh_json(request):
+    """Return the neighbourhoods of the published nodes given
+    as a comma separated list of ids in the 'nids' parameter"""
+    try:
+        nids = [int(nid) for nid in request.GET.get('nids', '').split(',')
+                if nid.strip()]
+    except ValueError:
+        return HttpResponseBadRequest('Invalid node ids.')
+    if len(nids) > NBH_BULK_MAX_NODES:
+        return HttpResponseBadRequest(
+            'Too many nodes, %i at most.' % NBH_BULK_MAX_NODES)
 
-    if(node_id=='189087228'):
-        jsonFile = open( os.path.join(os.path.dirname(__file__), '../static/gstudio/js/egonet.json'), "r")
-        #testjson = json.loads(jsonFile)
+    nbhs = nodetype_nbh_in_bulk(viewable_nodes(
+        request, Nodetype.published.filter(pk__in=nids),
+        'gstudio_nodetype_%s_password'))
+    gbobject = get_gbobject_model()
+    if gbobject is not None:
+        nbhs.update(gbobject_nbh_in_bulk(viewable_nodes(
+            request, gbobject.published.filter(pk__in=nids),
+            'objectapp_gbobject_%s_password')))
 
-        return HttpResponse(str(jsonFile.read()), "application/json")
+    data = {}
+    for nid, nbh in nbhs.items():
+        data[str(nid)] = serialize_nbh(nbh)
+    return HttpResponse(json.dumps(data), "application/json")
 
+def graph_ego_json(request, node_id):
+    """Return the ego network of a node, the nodes at most
+    'radius' hops away, limited to 'max_nodes' nodes, with their
+    positions laid out when NumPy is available"""
     try:
-        node = NID.objects.get(id=node_id)
-        node = node.ref        
-    except:
-        return HttpResponse("Node not found.", "text/html")
+        radius = int(request.GET.get('radius', EGONET_RADIUS))
+        max_nodes = int(request.GET.get('max_nodes', EGONET_MAX_NODES))
+    except ValueError:
+        return HttpResponseBadRequest('Invalid radius or number of nodes.')
+    if not 0 < radius <= EGONET_MAX_RADIUS:
+        return HttpResponseBadRequest(
+            'Invalid radius, %i at most.' % EGONET_MAX_RADIUS)
+    if not 0 < max_nodes <= EGONET_MAX_NODES:
+        return HttpResponseBadRequest(
+            'Invalid number of nodes, %i at most.' % EGONET_MAX_NODES)
+
+    node = get_object_or_404(NID, id=node_id)
+    depths, edges = ego_network(node.pk, radius, max_nodes)
+    viewable = viewable_ids(request, depths.keys())
+    if node.pk not in viewable:
+        raise Http404
+    depths = dict([(pk, depth) for pk, depth in depths.items()
+                   if pk in viewable])
+    edges = set([edge for edge in edges
+                 if edge[0] in viewable and edge[2] in viewable])
+    try:
+        from gstudio.layout import network_positions
+    except ImproperlyConfigured:
+        positions = None
+    else:
+        positions = network_positions(node.pk, depths, edges)
+    return HttpResponse(stream_ego_network(depths, edges, positions),
+                        "application/json")
+
+def graph_expand_json(request, node_id):
+    """Return a page of the neighbours of a node through the
+    'predicate' parameter, following the 'cursor' parameter.
+    The metadata of the nodes in the comma separated 'known'
+    list of ids are not sent again, and the neighbours the request
+    may not see are left out of the page."""
+    params = request.REQUEST
+    predicate = params.get('predicate', '')
+    try:
+        limit = int(params.get('limit', GRAPH_PAGE_SIZE))
+        cursor = params.get('cursor') and int(params['cursor']) or None
+        known = set([int(nid) for nid in params.get('known', '').split(',')
+                     if nid.strip()])
+    except ValueError:
+        return HttpResponseBadRequest('Invalid limit, cursor or node ids.')
+    if not 0 < limit <= GRAPH_MAX_PAGE_SIZE:
+        return HttpResponseBadRequest(
+            'Invalid limit, %i at most.' % GRAPH_MAX_PAGE_SIZE)
+
+    node = get_object_or_404(NID, id=node_id)
+    if node.pk not in viewable_ids(request, [node.pk]):
+        raise Http404
+    try:
+        rows, next_cursor = expand(node.pk, predicate, cursor, limit)
+    except ValueError:
+        return HttpResponseBadRequest('Unknown predicate.')
+    viewable = viewable_ids(request, [row[0] for row in rows])
+    rows = [row for row in rows if row[0] in viewable]
+    data = serialize_page(node.pk, predicate, rows, next_cursor, known)
+    return HttpResponse(json.dumps(data), "application/json")
+
+def facets_json(request, node_id):
+    """Return the facets of the members of a nodetype, drilled down
+    by the 'facet' parameters, each a kind:predicate:value triple,
+    the kind being one of attribute, relation and inverse. The nodes
+    counted as values of the relations are left out unless the
+    request may see them."""
+    nodetype = get_object_or_404(Nodetype, id=node_id)
+    if nodetype.pk not in viewable_ids(request, [nodetype.pk]):
+        raise Http404
+    try:
+        selected = [facet.split(':', 2)
+                    for facet in request.GET.getlist('facet')]
+        facets = get_facets(nodetype, selected)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid facets.')
+
+    facets = dict(facets)
+    ids = []
+    for kind in (RELATION, INVERSE):
+        for values in facets[kind].values():
+            ids.extend([value for value, count in values
+                        if value is not OTHER])
+    viewable = viewable_ids(request, ids)
+    for kind in (RELATION, INVERSE):
+        facets[kind] = dict([(predicate, [(value, count)
+                                          for value, count in values
+                                          if value is OTHER or
+                                          value in viewable])
+                             for predicate, values in facets[kind].items()])
+    return HttpResponse(json.dumps(facets), "application/json")
 
-    return HttpResponse(node.get_graph_json(), "application/json")
-    
 def force_graph(request, node_id):
     return render_to_response('gstudio/graph1.html',{'node_id': node_id })
-
- 
-#node = get_node(str(object_id))
-#ot = Objecttype.objects.get(title='place')
-#G = ot.get_radial_graph_json()
-#    
-#    G = nx.DiGraph()
-#    
-#    G.add_node(node)
-#    
-#    for key in node.get_nbh.keys():
-#        # is null
-#        if isinstance(node[key],list):
-#           G.add_nodes_from(node[key])
-#
-#            for item in node[key]:
-#                G.add_edge()                
-#    
-
-
-#    return ast(nodetype, permanent=True)
@@ -8,9 +8,9 @@ from gstudio.views.decorators import template_name_for_nodetype_queryset_filtere
 
 
 def get_metatype_or_404(path):
-    """Retrieve a Metatype by a path"""
+    """Retrieve a Metatype by its full tree path"""
     path_bits = [p for p in path.split('/') if p]
-    return get_object_or_404(Metatype, slug=path_bits[-1])
+    return get_object_or_404(Metatype, tree_path='/'.join(path_bits))
 
 
 def metatype_detail(request, path, page=None, **kwargs):
@@ -3,6 +3,7 @@ from django.utils.translation import ugettext as _
 from django.views.generic.list_detail import object_list
 
 from gstudio.models import Nodetype
+from gstudio.models import NodeScore
 from gstudio.settings import PAGINATION
 
 
@@ -18,6 +19,9 @@ def nodetype_search(request):
             error = _('The pattern is too short')
         else:
             nodetypes = Nodetype.published.search(pattern)
+            order = request.GET.get('order')
+            if order in NodeScore.objects.scores:
+                nodetypes = NodeScore.objects.order(nodetypes, order)
     else:
         error = _('No pattern to search found')
 
@@ -5,6 +5,8 @@ from objectapp.models import Gbobject
 from objectapp.models import Process
 from objectapp.models import System
 
+from gstudio.admin.filterspecs import ClusterFilterSpec
+
 from objectapp.admin.gbobject import GbobjectAdmin
 from objectapp.admin.process import ProcessAdmin
 from objectapp.admin.system import SystemAdmin
@@ -17,7 +17,7 @@ from objectapp import __version__
 from objectapp.models import Gbobject
 from objectapp.models import Objecttype
 from objectapp.managers import PUBLISHED
-from objectapp.signals import disconnect_objectapp_signals
+from objectapp.signals import disconnect_ping_signals
 
 
 class Command(LabelCommand):
@@ -45,7 +45,7 @@ class Command(LabelCommand):
         self.style.TITLE = self.style.SQL_FIELD
         self.style.STEP = self.style.SQL_COLTYPE
         self.style.ITEM = self.style.HTTP_INFO
-        disconnect_objectapp_signals()
+        disconnect_ping_signals()
 
     def write_out(self, message, verbosity_level=1):
         """Convenient method for outputing"""
@@ -1,9 +1,10 @@
 """Managers of Objectapp"""
-from datetime import datetime
 
 from django.db import models
 from django.contrib.sites.models import Site
 
+from gstudio.managers import nodes_in_cluster
+
 DRAFT = 0
 HIDDEN = 1
 PUBLISHED = 2
@@ -24,22 +25,30 @@ class AuthorPublishedManager(models.Manager):
 
     def get_query_set(self):
         """Return published authors"""
-        now = datetime.now()
         return super(AuthorPublishedManager, self).get_query_set().filter(
-            gbobjects__status=PUBLISHED,
-            gbobjects__start_publication__lte=now,
-            gbobjects__end_publication__gt=now,
-            gbobjects__sites=Site.objects.get_current()
+            gbobjects__publications__site=Site.objects.get_current()
             ).distinct()
 
 
+class GbobjectManager(models.Manager):
+    """Default manager of gbobjects"""
+
+    def in_cluster(self, component=None, community=None):
+        """Return the gbobjects of a component and of a community"""
+        return nodes_in_cluster(self.get_query_set(), component, community)
+
+    def nbh_in_bulk(self, id_list):
+        """Return a dictionary mapping the ids of the
+        gbobjects to their neighbourhoods"""
+        from gstudio.neighbourhood import gbobject_nbh_in_bulk
+        return gbobject_nbh_in_bulk(
+            self.get_query_set().filter(pk__in=id_list))
+
+
 def gbobjects_published(queryset):
-    """Return only the gbobjects published"""
-    now = datetime.now()
-    return queryset.filter(status=PUBLISHED,
-                           start_publication__lte=now,
-                           end_publication__gt=now,
-                           sites=Site.objects.get_current())
+    """Return only the gbobjects published on the current site,
+    read from their publications"""
+    return queryset.filter(publications__site=Site.objects.get_current())
 
 
 class GbobjectPublishedManager(models.Manager):
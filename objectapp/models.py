@@ -9,12 +9,13 @@ from django.utils.html import linebreaks
 from django.contrib.auth.models import User
 from django.contrib.sites.models import Site
 from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed
 from django.utils.importlib import import_module
+from django.utils.functional import curry
 from django.contrib import comments
 from django.contrib.comments.models import CommentFlag
 from django.contrib.comments.moderation import moderator
 from django.utils.translation import ugettext_lazy as _
-import json
 from django.contrib.markup.templatetags.markup import markdown
 from django.contrib.markup.templatetags.markup import textile
 from django.contrib.markup.templatetags.markup import restructuredtext
@@ -30,9 +31,18 @@ from gstudio.models import Processtype
 from gstudio.models import Attributetype
 from gstudio.models import Attribute
 from gstudio.models import Relation
+from gstudio.models import NID
 from gstudio.models import Node
 from gstudio.models import Edge
 from gstudio.models import Author
+from gstudio.models import GraphChange
+from gstudio.cache import get_cached_nbh
+from gstudio.registry import registry
+from gstudio.signals import invalidate_nbh_m2m_handler
+from gstudio.signals import graph_m2m_handler
+from gstudio.signals import dependency_m2m_handler
+from gstudio.signals import invalidate_members_m2m_handler
+from gstudio.signals import publication_m2m_handler
 
 import reversion
 from objectapp.settings import UPLOAD_TO
@@ -42,6 +52,7 @@ from objectapp.settings import GBOBJECT_BASE_MODEL
 from objectapp.settings import MARKDOWN_EXTENSIONS
 from objectapp.settings import AUTO_CLOSE_COMMENTS_AFTER
 from objectapp.managers import gbobjects_published
+from objectapp.managers import GbobjectManager
 from objectapp.managers import GbobjectPublishedManager
 from objectapp.managers import AuthorPublishedManager
 from objectapp.managers import DRAFT, HIDDEN, PUBLISHED
@@ -143,7 +154,7 @@ class Gbobject(Node):
         GBOBJECT_TEMPLATES,
         help_text=_('template used to display the gbobject'))
 
-    objects = models.Manager()
+    objects = GbobjectManager()
     published = GbobjectPublishedManager()
 
 
@@ -155,8 +166,8 @@ class Gbobject(Node):
         # 3. For each RT, create a dict key and a value as a dict. And add the relation as a new key-value pair (rid:subject).
         # 4. If self is in right value, then add inverse relation as RT and add the relation as a new key-value pair (rid:subject).
 
-        left_relset = Relation.objects.filter(left_subject=self.id) 
-        right_relset = Relation.objects.filter(right_subject=self.id) 
+        left_relset = registry.attach(Relation.objects.filter(left_subject=self.id))
+        right_relset = registry.attach(Relation.objects.filter(right_subject=self.id))
         
         #return left_relset + right_relset
 
@@ -200,59 +211,22 @@ class Gbobject(Node):
     
     def get_possible_rels(self):
         """
-        Gets the relations possible for this metatype
-        1. Recursively create a set of all the ancestors i.e. parent/subtypes of the MT. 
-        2. Get all the R's linked to each ancestor 
+        Gets the relations possible for this object, the ones
+        of its objecttypes and of their ancestors
         """
-        #Step 1. 
-        ancestor_list = []
-        this_parent = self.parent
-        
-        # append
-        while this_parent:
-            ancestor_list.append(this_parent)
-            this_parent = this_parent.parent
-            
-        #Step 2.
-        rels = {}
-        rt_set = Relation.objects.all()
-        right_subset = []
-        left_subset = []
-        
-        for each in ancestor_list:
-            # retrieve all the RT's from each ancestor 
-            right_subset.extend(rt_set.filter(subject1=each.id))
-            left_subset.extend(rt_set.filter(subject2=each.id))
-         
-        rels['possible_leftroles'] = left_subset
-        rels['possible_rightroles'] = right_subset
-        
-        return rels
+        from gstudio.schema import roles
+        from gstudio.schema import gbobject_schema
+        ids, rels = gbobject_schema(self, 'relations')
+        return roles('relations', rels, ids)
 
 
     def get_possible_attributes(self):
         """
-        Gets the relations possible for this metatype
-        1. Recursively create a set of all the ancestors i.e. parent/subtypes of the MT. 
-        2. Get all the RT's linked to each ancestor 
+        Gets the attributes possible for this object, the ones
+        of its objecttypes and of their ancestors
         """
-        #Step 1. 
-        ancestor_list = []
-        this_parent = self.parent
-        
-        # recursive thru parent field and append
-        while this_parent:
-            ancestor_list.append(this_parent)
-            this_parent = this_parent.parent
-            
-        #Step 2.
-        attrs = [] 
-                
-        for each in ancestor_list:
-            # retrieve all the AT's from each ancestor 
-            attrs.extend(Attribute.objects.filter(subject=each.id))
-                     
-        return attrs
+        from gstudio.schema import gbobject_schema
+        return gbobject_schema(self, 'attributes')[1]
 
 
 
@@ -260,7 +234,16 @@ class Gbobject(Node):
     @property
     def get_nbh(self):
         """ 
-        Returns the neighbourhood of the object
+        Returns the neighbourhood of the object, from the
+        neighbourhood cache
+        """
+        if not hasattr(self, '_nbh'):
+            self._nbh = get_cached_nbh(self)
+        return self._nbh
+
+    def build_nbh(self):
+        """ 
+        Computes the neighbourhood of the object
         """
         fields = ['title','altname','pluralform']
         nbh = {}
@@ -271,21 +254,11 @@ class Gbobject(Node):
         #return  all OTs the object is linked to
         nbh['member_of'] = self.objecttypes.all()
         
-        prior_nodes_list =[] 
-        temp = self.prior_nodes.all()             
-        for pn in temp:
-            # put the ot, at, rt instead of NT
-            prior_nodes_list.append(pn.ref)
-
-        nbh['prior_nodes'] = prior_nodes_list             
-
-        posterior_nodes_list =[] 
-        temp = self.posterior_nodes.all()             
-        for pn in temp:
-            # put the ot, at, rt instead of NT
-            posterior_nodes_list.append(pn.ref)
-
-        nbh['posterior_nodes'] = posterior_nodes_list 
+        # put the ot, at, rt instead of NT
+        nbh['prior_nodes'] = NID.objects.resolve_instances(
+            self.prior_nodes.all())
+        nbh['posterior_nodes'] = NID.objects.resolve_instances(
+            self.posterior_nodes.all())
 	nbh['authors'] = self.authors.all()
         
         # get all the relations of the object    
@@ -295,41 +268,10 @@ class Gbobject(Node):
         return nbh
 
     
-     def get_graph_json(self):
-
-        predicate_id={"plural":"a1","altnames":"a2","member_of":"a3", "prior_nodes":"a4","posterior_nodes":"a5"}
-	g_json = {}
-	g_json["node_metadata"]= [] 
-	
-	
-	nbh = self.get_nbh
-	
-        this_node = {"_id":str(self.id),"title":self.title,"screen_name":self.title, "url":self.get_absolute_url()}
-	for key in predicate_id.keys():
-		if nbh[key]:
-			try:
-				g_json[str(key)]=[]      
-				g_json["node_metadata"].append({"_id":str(predicate_id[key]),"screen_name":key})
-				g_json[str(key)].append({"from":self.id , "to":predicate_id[key],"value":1  })
-				if not isinstance(nbh[key],basestring):
-					for item in nbh[key]:
-				
-						g_json["node_metadata"].append({"_id":str(item.id),"screen_name":item.title, "title":item.title, "url":item.get_absolute_url()})
-						g_json[str(key)].append({"from":predicate_id[key] , "to":item.id ,"value":1  })
-			
-				else:
-					value={nbh["plural"]:"a4",nbh["altnames"]:"a5"}			
-		            		this_node[str(key)]=nbh[key]
-				
-					for item in value.keys():
-						g_json["node_metadata"].append({"_id":str(value[nbh[key]]),"screen_name":nbh[key]})
-						g_json[str(key)].append({"from":predicate_id[key] , "to":value[nbh[key]] ,"value":1  })
-				
-			
-			except:
-		                    pass
-	g_json["node_metadata"].append(this_node)      
-        return json.dumps(g_json)   
+    def get_graph_json(self):
+        """Return the compact graph JSON of the object"""
+        from gstudio.graph_json import stream_graph_json
+        return ''.join(stream_graph_json(self))
 
 
 
@@ -340,7 +282,7 @@ class Gbobject(Node):
         """
         relations={}
         reltype={}
-        left_relations=Relation.objects.filter(left_subject=self.id)
+        left_relations=registry.attach(Relation.objects.filter(left_subject=self.id))
         if left_relations:
            for each in left_relations:
            	relation=each.relationtype.title
@@ -362,7 +304,7 @@ class Gbobject(Node):
                     reltype[relation]=predicate_values
                 relations['lrelations']=reltype
         
-        right_relations=Relation.objects.filter(right_subject=self.id)
+        right_relations=registry.attach(Relation.objects.filter(right_subject=self.id))
         reltype={}
         if right_relations:
            for each in right_relations:
@@ -450,7 +392,7 @@ class Gbobject(Node):
 
         #get Attributes
         attributes ={}
-        for each in self.subject_of.all():
+        for each in registry.attach(self.subject_of.all()):
              attributes[each.attributetype]=each.svalue 
         nbh['attributes']=attributes
         return nbh
@@ -663,5 +605,30 @@ post_save.connect(ping_directories_handler, sender=Gbobject,
                   dispatch_uid='objectapp.gbobject.post_save.ping_directories')
 post_save.connect(ping_external_urls_handler, sender=Gbobject,
                   dispatch_uid='objectapp.gbobject.post_save.ping_external_urls')
-
-
+m2m_changed.connect(invalidate_nbh_m2m_handler, sender=Gbobject.objecttypes.through,
+                    dispatch_uid='objectapp.gbobject.objecttypes.nbh_cache')
+m2m_changed.connect(invalidate_nbh_m2m_handler, sender=Gbobject.prior_nodes.through,
+                    dispatch_uid='objectapp.gbobject.prior_nodes.nbh_cache')
+m2m_changed.connect(invalidate_nbh_m2m_handler, sender=Gbobject.posterior_nodes.through,
+                    dispatch_uid='objectapp.gbobject.posterior_nodes.nbh_cache')
+m2m_changed.connect(invalidate_nbh_m2m_handler, sender=Gbobject.authors.through,
+                    dispatch_uid='objectapp.gbobject.authors.nbh_cache')
+m2m_changed.connect(curry(graph_m2m_handler, field='prior_nodes',
+                          edgetype=GraphChange.PRIOR),
+                    sender=Gbobject.prior_nodes.through, weak=False,
+                    dispatch_uid='objectapp.gbobject.prior_nodes.graph')
+m2m_changed.connect(curry(graph_m2m_handler, field='posterior_nodes',
+                          edgetype=GraphChange.POSTERIOR),
+                    sender=Gbobject.posterior_nodes.through, weak=False,
+                    dispatch_uid='objectapp.gbobject.posterior_nodes.graph')
+m2m_changed.connect(curry(dependency_m2m_handler, field='prior_nodes'),
+                    sender=Gbobject.prior_nodes.through, weak=False,
+                    dispatch_uid='objectapp.gbobject.prior_nodes.dependencies')
+m2m_changed.connect(curry(dependency_m2m_handler, field='posterior_nodes'),
+                    sender=Gbobject.posterior_nodes.through, weak=False,
+                    dispatch_uid='objectapp.gbobject.posterior_nodes.dependencies')
+m2m_changed.connect(invalidate_members_m2m_handler,
+                    sender=Gbobject.objecttypes.through,
+                    dispatch_uid='objectapp.gbobject.objecttypes.members')
+m2m_changed.connect(publication_m2m_handler, sender=Gbobject.sites.through,
+                    dispatch_uid='objectapp.gbobject.sites.publications')
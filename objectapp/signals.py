@@ -3,6 +3,7 @@ import inspect
 from functools import wraps
 
 from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed
 
 from objectapp import settings
 
@@ -45,11 +46,34 @@ def ping_external_urls_handler(sender, **kwargs):
         ExternalUrlsPinger(gbobject)
 
 
-def disconnect_objectapp_signals():
-    """Disconnect all the signals provided by Objectapp"""
+def disconnect_ping_signals():
+    """Disconnect the signals pinging the directories
+    and the external urls when a gbobject is saved"""
     from objectapp.models import Gbobject
 
     post_save.disconnect(
         sender=Gbobject, dispatch_uid='objectapp.gbobject.post_save.ping_directories')
     post_save.disconnect(
         sender=Gbobject, dispatch_uid='objectapp.gbobject.post_save.ping_external_urls')
+
+
+def disconnect_objectapp_signals():
+    """Disconnect all the signals provided by Objectapp. The caches
+    and the tables derived from the gbobjects are then no longer
+    maintained, and should be rebuilt with the rebuild commands"""
+    from objectapp.models import Gbobject
+
+    disconnect_ping_signals()
+    for field, name in (('objecttypes', 'nbh_cache'),
+                        ('prior_nodes', 'nbh_cache'),
+                        ('posterior_nodes', 'nbh_cache'),
+                        ('authors', 'nbh_cache'),
+                        ('prior_nodes', 'graph'),
+                        ('posterior_nodes', 'graph'),
+                        ('prior_nodes', 'dependencies'),
+                        ('posterior_nodes', 'dependencies'),
+                        ('objecttypes', 'members'),
+                        ('sites', 'publications')):
+        m2m_changed.disconnect(
+            sender=getattr(Gbobject, field).through,
+            dispatch_uid='objectapp.gbobject.%s.%s' % (field, name))
@@ -7,7 +7,7 @@ from objectapp.tests.gbobject import GbobjectTestCase  # ~0.2s
 from objectapp.tests.gbobject import GbobjectHtmlContentTestCase  # ~0.5s
 from objectapp.tests.gbobject import GbobjectGetBaseModelTestCase
 from objectapp.tests.signals import SignalsTestCase
-from objectapp.tests.Objecttype import ObjecttypeTestCase
+from objectapp.tests.objecttype import ObjecttypeTestCase
 from objectapp.tests.admin import GbobjectAdminTestCase
 from objectapp.tests.admin import ObjecttypeAdminTestCase
 from objectapp.tests.managers import ManagersTestCase  # ~1.2s
@@ -25,7 +25,11 @@ from objectapp.tests.templatetags import TemplateTagsTestCase  # ~0.4s
 from objectapp.tests.moderator import GbobjectCommentModeratorTestCase  # ~0.1s
 from objectapp.tests.spam_checker import SpamCheckerTestCase
 from objectapp.tests.url_shortener import URLShortenerTestCase
-from objectapp.signals import disconnect_objectapp_signals
+from objectapp.tests.setalgebra import ClassExpressionTestCase
+from objectapp.tests.planner import PlannerTestCase
+from objectapp.tests.gnowql import GnowQLTestCase
+from objectapp.tests.facets import FacetsTestCase
+from objectapp.signals import disconnect_ping_signals
 # TOTAL ~ 6.6s
 
 
@@ -43,7 +47,9 @@ def suite():
                   TemplateTagsTestCase, QuickGbobjectTestCase,
                   URLShortenerTestCase, GbobjectCommentModeratorTestCase,
                   ObjectappCustomDetailViews, SpamCheckerTestCase,
-                  GbobjectAdminTestCase, ObjecttypeAdminTestCase)
+                  GbobjectAdminTestCase, ObjecttypeAdminTestCase,
+                  ClassExpressionTestCase, PlannerTestCase,
+                  GnowQLTestCase, FacetsTestCase)
 
     if 'django_xmlrpc' in settings.INSTALLED_APPS:
         test_cases += (PingBackTestCase, MetaWeblogTestCase)
@@ -54,4 +60,4 @@ def suite():
 
     return suite
 
-disconnect_objectapp_signals()
+disconnect_ping_signals()
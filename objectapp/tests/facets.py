@@ -0,0 +1,124 @@
+"""Test cases for Gstudio's facets"""
+import json
+
+from django.test import TestCase
+from django.contrib.sites.models import Site
+
+from gstudio.models import Relation
+from gstudio.models import Attribute
+from gstudio.models import Objecttype
+from gstudio.models import Relationtype
+from gstudio.models import Attributetype
+from gstudio.managers import PUBLISHED
+from gstudio.facets import ATTRIBUTE
+from gstudio.facets import RELATION
+from gstudio.facets import INVERSE
+from gstudio.facets import OTHER
+from gstudio.facets import get_facets
+from gstudio.facets import top_values
+from gstudio.facets import count_facets
+
+from objectapp.models import Gbobject
+
+
+class FacetsTestCase(TestCase):
+
+    def setUp(self):
+        self.vehicle = Objecttype.objects.create(title='Vehicle',
+                                                 slug='vehicle')
+        self.car = Objecttype.objects.create(title='Car', slug='car',
+                                             parent=self.vehicle)
+        self.country = Objecttype.objects.create(title='Country',
+                                                 slug='country')
+        self.colour = Attributetype.objects.create(
+            title='colour', slug='colour', subjecttype=self.vehicle)
+        self.made = Relationtype.objects.create(
+            title='made in', slug='made-in', inverse='maker of',
+            left_subjecttype=self.vehicle, right_subjecttype=self.country)
+        self.india = self.gbobject('India', self.country)
+        self.japan = self.gbobject('Japan', self.country)
+        self.vehicles = []
+        for title, objecttype, colour, country in (
+            ('Ambassador', self.car, 'white', self.india),
+            ('Nano', self.car, 'red', self.india),
+            ('Prius', self.car, 'red', self.japan),
+            ('Bajaj', self.vehicle, 'red', self.india)):
+            vehicle = self.gbobject(title, objecttype)
+            self.vehicles.append(vehicle)
+            self.attribute(vehicle, colour)
+            Relation.objects.create(
+                title='%s made in %s' % (title, country.title),
+                slug='%s-made-in' % title.lower(), left_subject=vehicle,
+                relationtype=self.made, right_subject=country)
+
+    def gbobject(self, title, *objecttypes):
+        gbobject = Gbobject.objects.create(title=title, content=title,
+                                           slug=title.lower())
+        gbobject.objecttypes.add(*objecttypes)
+        return gbobject
+
+    def attribute(self, subject, value):
+        return Attribute.objects.create(
+            title='colour of %s' % subject.title,
+            slug='colour-of-%s' % subject.slug, subject=subject,
+            attributetype=self.colour, svalue=value)
+
+    def test_counts(self):
+        facets = count_facets(self.vehicle)
+        self.assertEquals(facets['count'], 4)
+        self.assertEquals(facets[ATTRIBUTE][self.colour.pk],
+                          [(u'red', 3), (u'white', 1)])
+        self.assertEquals(facets[RELATION][self.made.pk],
+                          [(self.india.pk, 3), (self.japan.pk, 1)])
+        self.assertEquals(count_facets(self.car)['count'], 3)
+        self.assertEquals(count_facets(self.country)[INVERSE][self.made.pk],
+                          sorted([(vehicle.pk, 1)
+                                  for vehicle in self.vehicles]))
+
+    def test_drill_down(self):
+        facets = count_facets(self.vehicle,
+                              [(RELATION, self.made.pk, self.india.pk)])
+        self.assertEquals(facets['count'], 3)
+        self.assertEquals(facets[ATTRIBUTE][self.colour.pk],
+                          [(u'red', 2), (u'white', 1)])
+        facets = count_facets(self.car,
+                              [(RELATION, self.made.pk, self.india.pk),
+                               (ATTRIBUTE, self.colour.pk, 'red')])
+        self.assertEquals(facets['count'], 1)
+        self.assertRaises(ValueError, get_facets, self.car,
+                          [('colour', self.colour.pk, 'red')])
+
+    def test_cache(self):
+        selected = [(ATTRIBUTE, self.colour.pk, 'red')]
+        get_facets(self.vehicle, selected)
+        self.assertNumQueries(0, lambda: get_facets(self.vehicle, selected))
+        scooter = self.gbobject('Scooter', self.vehicle)
+        self.assertEquals(get_facets(self.vehicle, selected)['count'], 3)
+        self.attribute(scooter, 'red')
+        self.assertEquals(get_facets(self.vehicle, selected)['count'], 4)
+
+    def test_type_invalidation(self):
+        get_facets(self.country)
+        self.attribute(self.vehicles[0], 'blue')
+        self.assertNumQueries(0, lambda: get_facets(self.country))
+        self.assertEquals(get_facets(self.car)[ATTRIBUTE][self.colour.pk],
+                          [(u'red', 2), (u'blue', 1), (u'white', 1)])
+
+    def test_json(self):
+        url = '/graphs/facets_json/%i' % self.vehicle.pk
+        self.assertEquals(self.client.get(url).status_code, 404)
+        site = Site.objects.get_current()
+        Objecttype.objects.filter(pk=self.vehicle.pk).update(
+            status=PUBLISHED)
+        self.vehicle.sites.add(site)
+        self.india.sites.add(site)
+        facets = json.loads(self.client.get(url).content)
+        self.assertEquals(facets['count'], 4)
+        self.assertEquals(facets[RELATION][str(self.made.pk)],
+                          [[self.india.pk, 3]])
+
+    def test_top_values(self):
+        self.assertEquals(top_values([(u'a', 1), (u'b', 3), (u'c', 2)], 2),
+                          [(u'b', 3), (u'c', 2), (OTHER, 1)])
+        self.assertEquals(top_values([(u'a', 1), (u'b', 3)], 2),
+                          [(u'b', 3), (u'a', 1)])
@@ -0,0 +1,125 @@
+"""Test cases for GnowQL, Gstudio's query language"""
+from django.test import TestCase
+
+from gstudio.models import Relation
+from gstudio.models import Attribute
+from gstudio.models import Objecttype
+from gstudio.models import Relationtype
+from gstudio.models import Attributetype
+from gstudio.gnowql import parse
+from gstudio.gnowql import run_query
+from gstudio.gnowql import compile_query
+from gstudio.gnowql import GnowQLError
+from gstudio.gnowql import MEMBERSHIP
+
+from objectapp.models import Gbobject
+
+
+class GnowQLTestCase(TestCase):
+
+    def setUp(self):
+        self.city = Objecttype.objects.create(title='City', slug='city')
+        self.capital = Objecttype.objects.create(title='Capital',
+                                                 slug='capital',
+                                                 parent=self.city)
+        self.country = Objecttype.objects.create(title='Country',
+                                                 slug='country')
+        self.located = Relationtype.objects.create(
+            title='located in', slug='located-in', inverse='location of',
+            left_subjecttype=self.city, right_subjecttype=self.country)
+        self.population = Attributetype.objects.create(
+            title='population', slug='population', subjecttype=self.city,
+            dataType='3')
+        self.india = self.gbobject('India', self.country)
+        self.nepal = self.gbobject('Nepal', self.country)
+        self.delhi = self.gbobject('Delhi', self.capital)
+        self.pune = self.gbobject('Pune', self.city)
+        self.pokhara = self.gbobject('Pokhara', self.city)
+        for city, country, population in (
+            (self.delhi, self.india, '16000000'),
+            (self.pune, self.india, '3100000'),
+            (self.pokhara, self.nepal, '400000')):
+            title = '%s located in %s' % (city.title, country.title)
+            Relation.objects.create(
+                title=title, slug=title.lower().replace(' ', '-'),
+                left_subject=city, relationtype=self.located,
+                right_subject=country)
+            title = 'population of %s' % city.title
+            Attribute.objects.create(
+                title=title, slug=title.lower().replace(' ', '-'),
+                subject=city, attributetype=self.population,
+                svalue=population)
+
+    def gbobject(self, title, *objecttypes):
+        gbobject = Gbobject.objects.create(title=title, content=title,
+                                           slug=title.lower())
+        gbobject.objecttypes.add(*objecttypes)
+        return gbobject
+
+    def assertRows(self, text, rows):
+        """Compare the rows by the pks of their nodes"""
+        def keys(rows):
+            return sorted([sorted([(name, getattr(value, 'pk', value))
+                                   for name, value in row.items()])
+                           for row in rows])
+        self.assertEquals(keys(run_query(text)), keys(rows))
+
+    def test_parse(self):
+        query = parse('SELECT ?city WHERE { ?city a City . '
+                      '?city "located in" #12 . '
+                      'FILTER (?size >= 10) } LIMIT 5')
+        self.assertEquals(query.select, ['city'])
+        self.assertEquals(query.limit, 5)
+        self.assertEquals(len(query.patterns), 2)
+        self.assertEquals(query.patterns[0].predicate.kind, MEMBERSHIP)
+        self.assertEquals(query.patterns[1].object.value, 12)
+        self.assertEquals(query.filters[0].operator, '>=')
+        self.assertRaises(GnowQLError, parse, '{ ?city a }')
+        self.assertRaises(GnowQLError, parse, 'SELECT ?city')
+
+    def test_patterns(self):
+        self.assertRows('{ ?city "located in" India }',
+                        [{'city': self.delhi}, {'city': self.pune}])
+        self.assertRows('{ India "location of" ?city }',
+                        [{'city': self.delhi}, {'city': self.pune}])
+        self.assertRows('{ ?city a City }', [{'city': self.delhi},
+                                             {'city': self.pune},
+                                             {'city': self.pokhara}])
+        self.assertRows('{ ?city a Capital . ?city "located in" ?country }',
+                        [{'city': self.delhi, 'country': self.india}])
+        self.assertRows('{ ?city "located in" #%i }' % self.nepal.pk,
+                        [{'city': self.pokhara}])
+        self.assertRows('{ ?city "located in" Atlantis }', [])
+
+    def test_filters(self):
+        self.assertRows('SELECT ?country WHERE { '
+                        '?city "located in" ?country . '
+                        '?city population ?size . '
+                        'FILTER (?size > 1000000) }',
+                        [{'country': self.india}, {'country': self.india}])
+        self.assertRows('SELECT ?size WHERE { Pokhara population ?size }',
+                        [{'size': '400000'}])
+        self.assertRows('{ ?city population ?size . FILTER (?size ~ 31) }',
+                        [{'city': self.pune, 'size': '3100000'}])
+
+    def test_nodes(self):
+        rows = list(run_query('{ ?city "located in" Nepal }'))
+        self.assertEquals(rows[0]['city'].__class__, Gbobject)
+
+    def test_limit(self):
+        self.assertEquals(len(list(run_query('{ ?city a City } LIMIT 2'))), 2)
+        self.assertEquals(len(list(run_query('{ ?city a City }', 1))), 1)
+
+    def test_errors(self):
+        self.assertRaises(GnowQLError, compile_query, '{ ?city unknown ?x }')
+        self.assertRaises(GnowQLError, compile_query,
+                          '{ ?city population ?size . '
+                          '?size "located in" India }')
+        self.assertRaises(GnowQLError, compile_query,
+                          'SELECT ?country WHERE { ?city a City }')
+        self.assertRaises(GnowQLError, compile_query,
+                          '{ ?city a City . FILTER (?city = 3) }')
+
+    def test_cached_plan(self):
+        text = '{ ?city a City }'
+        self.assertTrue(compile_query(text) is compile_query(text))
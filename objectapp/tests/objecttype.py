@@ -50,3 +50,43 @@ class ObjecttypeTestCase(TestCase):
         self.objecttypes[1].parent = self.objecttypes[0]
         self.objecttypes[1].save()
         self.assertEqual(self.objecttypes[1].tree_path, 'Objecttype-1/Objecttype-2')
+
+    def test_tree_path_cascade(self):
+        child = Objecttype.objects.create(title='Objecttype 3',
+                                          slug='Objecttype-3',
+                                          parent=self.objecttypes[1])
+        grandchild = Objecttype.objects.create(title='Objecttype 4',
+                                               slug='Objecttype-4',
+                                               parent=child)
+        # Moving the tree of Objecttype-2 into the tree of Objecttype-1
+        moved = Objecttype.objects.get(pk=self.objecttypes[1].pk)
+        moved.parent = Objecttype.objects.get(pk=self.objecttypes[0].pk)
+        moved.save()
+        self.assertEqual(Objecttype.objects.get(pk=grandchild.pk).tree_path,
+                         'Objecttype-1/Objecttype-2/Objecttype-3/'
+                         'Objecttype-4')
+        root = Objecttype.objects.get(pk=self.objecttypes[0].pk)
+        root.slug = 'root'
+        root.save()
+        self.assertEqual(Objecttype.objects.get(pk=grandchild.pk).tree_path,
+                         'root/Objecttype-2/Objecttype-3/Objecttype-4')
+        self.assertEqual(Objecttype.objects.get(
+            pk=self.objecttypes[1].pk).tree_path, 'root/Objecttype-2')
+        # Moving Objecttype-3 out to a tree of its own
+        moved = Objecttype.objects.get(pk=child.pk)
+        moved.parent = None
+        moved.save()
+        grandchild = Objecttype.objects.get(pk=grandchild.pk)
+        self.assertEqual(grandchild.tree_path, 'Objecttype-3/Objecttype-4')
+        self.assertNotEqual(grandchild.tree_id, root.tree_id)
+
+    def test_tree_path_length(self):
+        child = Objecttype.objects.create(title='Objecttype 3',
+                                          slug='o' * 200,
+                                          parent=self.objecttypes[1])
+        self.assertRaises(ValueError, Objecttype.objects.create,
+                          title='Objecttype 4', slug='o' * 100,
+                          parent=child)
+        root = Objecttype.objects.get(pk=self.objecttypes[1].pk)
+        root.slug = 'o' * 60
+        self.assertRaises(ValueError, root.save)
@@ -0,0 +1,145 @@
+"""Test cases for the query planner of Gstudio's specifications"""
+from django.test import TestCase
+
+from gstudio.models import Relation
+from gstudio.models import Attribute
+from gstudio.models import Expression
+from gstudio.models import Objecttype
+from gstudio.models import Relationtype
+from gstudio.models import Attributetype
+from gstudio.models import NodeSpecification
+from gstudio.models import RelationSpecification
+from gstudio.models import AttributeSpecification
+from gstudio.planner import run
+from gstudio.planner import plan
+from gstudio.planner import statistics
+from gstudio.planner import node_constraints
+from gstudio.planner import MemberConstraint
+from gstudio.planner import RelationConstraint
+from gstudio.planner import AttributeConstraint
+
+from objectapp.models import Gbobject
+
+
+class PlannerTestCase(TestCase):
+
+    def setUp(self):
+        self.city = Objecttype.objects.create(title='City', slug='city')
+        self.capital = Objecttype.objects.create(title='Capital',
+                                                 slug='capital',
+                                                 parent=self.city)
+        self.country = Objecttype.objects.create(title='Country',
+                                                 slug='country')
+        self.located = Relationtype.objects.create(
+            title='located in', slug='located-in', inverse='location of',
+            left_subjecttype=self.city, right_subjecttype=self.country)
+        self.size = Attributetype.objects.create(
+            title='size', slug='size', subjecttype=self.city)
+        self.india = self.gbobject('India', self.country)
+        self.nepal = self.gbobject('Nepal', self.country)
+        self.delhi = self.gbobject('Delhi', self.capital)
+        self.mumbai = self.gbobject('Mumbai', self.city)
+        self.pune = self.gbobject('Pune', self.city)
+        self.pokhara = self.gbobject('Pokhara', self.city)
+        for city, country in ((self.delhi, self.india),
+                              (self.mumbai, self.india),
+                              (self.pune, self.india),
+                              (self.pokhara, self.nepal)):
+            self.relation(city, self.located, country)
+        for city, size in ((self.delhi, 'large'), (self.mumbai, 'large'),
+                           (self.pune, 'medium'),
+                           (self.pokhara, 'medium')):
+            self.attribute(city, self.size, size)
+
+    def gbobject(self, title, *objecttypes):
+        gbobject = Gbobject.objects.create(title=title, content=title,
+                                           slug=title.lower())
+        gbobject.objecttypes.add(*objecttypes)
+        return gbobject
+
+    def relation(self, left, relationtype, right):
+        title = '%s %s %s' % (left.title, relationtype.title, right.title)
+        return Relation.objects.create(
+            title=title, slug=title.lower().replace(' ', '-'),
+            left_subject=left, relationtype=relationtype,
+            right_subject=right)
+
+    def attribute(self, subject, attributetype, svalue):
+        title = '%s of %s' % (attributetype.title, subject.title)
+        return Attribute.objects.create(
+            title=title, slug=title.lower().replace(' ', '-'),
+            subject=subject, attributetype=attributetype, svalue=svalue)
+
+    def specification(self, subject, relations=(), attributes=()):
+        specification = NodeSpecification.objects.create(
+            title='Specification', slug='specification', subject=subject)
+        specification.relations.add(*relations)
+        specification.attributes.add(*attributes)
+        return specification
+
+    def assertMatches(self, specification, nodes):
+        self.assertEquals(set([nid.pk for nid in specification.get_matches]),
+                          set([node.pk for node in nodes]))
+
+    def test_statistics(self):
+        stats = statistics()
+        self.assertEquals(stats[('relationtype', self.located.pk)], (4, 2))
+        self.assertEquals(stats[('attributetype', self.size.pk)], (4, 2))
+
+    def test_plan(self):
+        constraints = [MemberConstraint([1, 2, 3]),
+                       RelationConstraint(self.located.pk, self.india.pk),
+                       AttributeConstraint(self.size.pk, 'large')]
+        self.assertEquals(plan(constraints), [constraints[1], constraints[2],
+                                              constraints[0]])
+        single = MemberConstraint([1])
+        self.assertEquals(plan(constraints + [single])[0], single)
+
+    def test_node_specification(self):
+        in_india = Relation.objects.get(left_subject=self.pune)
+        large = Attribute.objects.get(subject=self.delhi)
+        self.assertMatches(self.specification(self.city),
+                           [self.delhi, self.mumbai, self.pune, self.pokhara])
+        self.assertMatches(self.specification(self.city, [in_india]),
+                           [self.delhi, self.mumbai, self.pune])
+        specification = self.specification(self.city, [in_india], [large])
+        self.assertEquals(len(node_constraints(specification)), 3)
+        self.assertMatches(specification, [self.delhi, self.mumbai])
+        self.assertMatches(self.specification(self.capital, [], [large]),
+                           [self.delhi])
+        self.assertMatches(self.specification(self.country, [in_india]), [])
+
+    def test_single_query(self):
+        in_india = Relation.objects.get(left_subject=self.pune)
+        large = Attribute.objects.get(subject=self.delhi)
+        constraints = node_constraints(
+            self.specification(self.city, [in_india], [large]))
+        statistics()
+        self.assertNumQueries(1, run, constraints)
+        self.assertEquals(run(constraints),
+                          set([self.delhi.pk, self.mumbai.pk]))
+
+    def test_statistics_invalidation(self):
+        self.relation(self.pune, self.located, self.nepal)
+        self.assertEquals(statistics()[('relationtype', self.located.pk)],
+                          (5, 2))
+
+    def test_specifications(self):
+        in_india = Relation.objects.get(left_subject=self.pune)
+        indian_cities = self.specification(self.city, [in_india])
+        sizes = AttributeSpecification.objects.create(
+            title='Sizes', slug='sizes', attributetype=self.size)
+        sizes.subjects.add(indian_cities)
+        self.assertMatches(sizes, Attribute.objects.exclude(
+            subject=self.pokhara))
+
+        countries = RelationSpecification.objects.create(
+            title='Countries', slug='countries', relationtype=self.located)
+        countries.subjects.add(self.pune, self.pokhara)
+        self.assertMatches(countries, [self.india, self.nepal])
+
+        expression = Expression.objects.create(
+            title='Expression', slug='expression', left_term=indian_cities,
+            relationtype=self.located, right_term=self.india)
+        self.assertMatches(expression, Relation.objects.filter(
+            right_subject=self.india))
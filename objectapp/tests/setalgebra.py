@@ -0,0 +1,104 @@
+"""Test cases for the members of Gstudio's class expressions"""
+from django.test import TestCase
+
+from gstudio.models import Union
+from gstudio.models import Objecttype
+from gstudio.models import Complement
+from gstudio.models import Intersection
+from gstudio import setalgebra
+from gstudio.setalgebra import bitset
+from gstudio.setalgebra import members
+from gstudio.setalgebra import bitset_ids
+from gstudio.setalgebra import bitset_count
+from gstudio.setalgebra import nodetype_bitset
+from gstudio.setalgebra import UNION
+from gstudio.setalgebra import COMPLEMENT
+from gstudio.setalgebra import INTERSECTION
+
+from objectapp.models import Gbobject
+
+
+class ClassExpressionTestCase(TestCase):
+
+    def setUp(self):
+        self.animal = Objecttype.objects.create(title='Animal',
+                                                slug='animal')
+        self.dog = Objecttype.objects.create(title='Dog', slug='dog',
+                                             parent=self.animal)
+        self.pet = Objecttype.objects.create(title='Pet', slug='pet')
+        self.rex = self.gbobject('Rex', self.dog, self.pet)
+        self.tiger = self.gbobject('Tiger', self.animal)
+        self.rock = self.gbobject('Pet rock', self.pet)
+        self.stone = self.gbobject('Stone')
+
+    def gbobject(self, title, *objecttypes):
+        gbobject = Gbobject.objects.create(title=title, content=title,
+                                           slug=title.lower().replace(' ', '-'))
+        gbobject.objecttypes.add(*objecttypes)
+        return gbobject
+
+    def expression(self, model, *nodetypes):
+        expression = model.objects.create(title=model.__name__,
+                                          slug=model.__name__.lower())
+        expression.nodetypes.add(*nodetypes)
+        return expression
+
+    def assertMembers(self, expression, gbobjects):
+        self.assertEquals(set(members(expression)), set(gbobjects))
+
+    def test_bitset(self):
+        bits = bitset([3, 64, 1000])
+        self.assertEquals(bits, (1 << 3) | (1 << 64) | (1 << 1000))
+        self.assertEquals(bitset_ids(bits), [3, 64, 1000])
+        self.assertEquals(bitset_count(bits), 3)
+        self.assertEquals(bitset_ids(bitset([])), [])
+
+    def test_operators(self):
+        self.assertMembers(self.animal, [self.rex, self.tiger])
+        self.assertMembers(self.expression(Union, self.dog, self.pet),
+                           [self.rex, self.rock])
+        self.assertMembers(self.expression(Intersection, self.animal,
+                                           self.pet), [self.rex])
+        self.assertMembers(self.expression(Complement, self.animal),
+                           [self.rock, self.stone])
+
+    def test_nested(self):
+        union = self.expression(Union, self.dog, self.pet)
+        self.assertMembers((INTERSECTION, union,
+                            (COMPLEMENT, self.dog)), [self.rock])
+        self.assertMembers((UNION, (COMPLEMENT, union), self.dog),
+                           [self.rex, self.tiger, self.stone])
+
+    def test_invalidation(self):
+        intersection = self.expression(Intersection, self.animal, self.pet)
+        self.assertMembers(intersection, [self.rex])
+        self.tiger.objecttypes.add(self.pet)
+        self.assertMembers(intersection, [self.rex, self.tiger])
+        intersection.nodetypes.remove(self.pet)
+        self.assertMembers(intersection, [self.rex, self.tiger])
+        self.rex.delete()
+        self.assertMembers(intersection, [self.tiger])
+
+    def test_type_invalidation(self):
+        self.assertMembers(self.dog, [self.rex])
+        self.assertMembers(self.pet, [self.rex, self.rock])
+        self.stone.objecttypes.add(self.pet)
+        self.assertNumQueries(0, nodetype_bitset, self.dog)
+        self.assertMembers(self.pet, [self.rex, self.rock, self.stone])
+        self.stone.objecttypes.add(self.dog)
+        self.assertMembers(self.animal, [self.rex, self.tiger, self.stone])
+        self.stone.delete()
+        self.assertMembers(self.animal, [self.rex, self.tiger])
+        self.assertMembers(self.pet, [self.rex, self.rock])
+
+    def test_chunked_bitset(self):
+        chunk_digits = setalgebra.CHUNK_DIGITS
+        setalgebra.CHUNK_DIGITS = 2
+        try:
+            bits = nodetype_bitset(self.pet)
+            self.assertNumQueries(0, nodetype_bitset, self.pet)
+            self.assertEquals(nodetype_bitset(self.pet), bits)
+            self.assertEquals(bitset_ids(bits),
+                              sorted([self.rex.pk, self.rock.pk]))
+        finally:
+            setalgebra.CHUNK_DIGITS = chunk_digits